@@ -1,5 +1,14 @@
 from rebelist.revelations.application.use_cases.embedding import DataEmbeddingUseCase
 from rebelist.revelations.application.use_cases.extraction import DataExtractionUseCase
 from rebelist.revelations.application.use_cases.inference import InferenceUseCase
+from rebelist.revelations.application.use_cases.reconversion import DataReconversionUseCase
+from rebelist.revelations.application.use_cases.snapshot import DatasetRestoreUseCase, DatasetSnapshotUseCase
 
-__all__ = ['DataExtractionUseCase', 'DataEmbeddingUseCase', 'InferenceUseCase']
+__all__ = [
+    'DataExtractionUseCase',
+    'DataEmbeddingUseCase',
+    'InferenceUseCase',
+    'DataReconversionUseCase',
+    'DatasetSnapshotUseCase',
+    'DatasetRestoreUseCase',
+]
@@ -1,4 +1,5 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
 from typing import Final
 
 from rebelist.revelations.domain import (
@@ -8,6 +9,7 @@ from rebelist.revelations.domain import (
     ChatAdapterPort,
     ContextReaderPort,
     LoggerPort,
+    QuantizationScore,
     RetrievalEvaluator,
 )
 from rebelist.revelations.domain.models import FidelityScore, RetrievalScore
@@ -131,3 +133,60 @@ class BenchmarkUseCase:
             relevance=avg_relevance,
             feedback='The combined average of multiple responses.',
         )
+
+
+class QuantizationBenchmarkUseCase:
+    LIMIT_MAX: Final[int] = 200
+
+    def __init__(self, context_reader: ContextReaderPort, logger: LoggerPort):
+        self.__context_reader = context_reader
+        self.__logger = logger
+
+    def __call__(self, benchmark_cases: list[BenchmarkCase], limit: int) -> QuantizationScore:
+        """Executes the use case.
+
+        Every question is embedded once, then searched over the quantized dense vectors and over the original ones of
+        the same collection, without the sparse search nor any reranking, so only the vector searches are timed. The
+        recall is the share of the documents found with the original vectors also found with the quantized ones. The
+        searches run one at a time, so the latencies are not skewed by concurrency.
+        """
+        if limit > QuantizationBenchmarkUseCase.LIMIT_MAX:
+            raise ValueError(f'Limit value must be ≤ {QuantizationBenchmarkUseCase.LIMIT_MAX}, got {limit}')
+
+        recalls: list[float] = []
+        quantized_seconds = 0.0
+        original_seconds = 0.0
+        total_cases = len(benchmark_cases)
+
+        for count, benchmark_case in enumerate(benchmark_cases, start=1):
+            try:
+                vector = self.__context_reader.embed_query(benchmark_case.question)
+                quantized, quantized_elapsed = self._retrieve(vector, limit, quantized=True)
+                original, original_elapsed = self._retrieve(vector, limit, quantized=False)
+            except Exception as error:
+                self.__logger.error(f'Failed to evaluate case: {error}')
+                continue
+
+            quantized_seconds += quantized_elapsed
+            original_seconds += original_elapsed
+            if original:
+                recalls.append(len(original & quantized) / len(original))
+
+            self.__logger.info(f'Benchmark case completed - {count}/{total_cases}')
+
+        if not recalls:
+            raise ValueError('No quantization scores were provided.')
+
+        return QuantizationScore(
+            recall=sum(recalls) / len(recalls),
+            quantized_latency_ms=quantized_seconds * 1000 / len(recalls),
+            original_latency_ms=original_seconds * 1000 / len(recalls),
+        )
+
+    def _retrieve(self, vector: list[float], limit: int, quantized: bool) -> tuple[set[tuple[str | None, str]], float]:
+        """Retrieves the documents nearest to a vector, identified by url and content, with the elapsed seconds."""
+        started = perf_counter()
+        documents = self.__context_reader.retrieve_dense(vector, limit, quantized=quantized)
+        elapsed = perf_counter() - started
+
+        return {(document.url, document.content) for document in documents}, elapsed
@@ -1,22 +1,71 @@
-from rebelist.revelations.domain import ContextWriterPort, DocumentRepositoryPort
+from contextlib import nullcontext
+from dataclasses import replace
+from typing import Final
+
+from rebelist.revelations.domain import ContextWriterPort, Document, DocumentRepositoryPort
 from rebelist.revelations.domain.services import LoggerPort
 
 
 class DataEmbeddingUseCase:
+    # The raw source payload is never indexed, so it is not even read from the repository
+    INDEXED_FIELDS: Final[tuple[str, ...]] = ('title', 'content', 'modified_at', 'url', 'space', 'content_hash')
+
     def __init__(self, repository: DocumentRepositoryPort, context_writer: ContextWriterPort, logger: LoggerPort):
         self.__repository = repository
         self.__context_writer = context_writer
         self.__logger = logger
 
-    def __call__(self) -> None:
-        """Executes the use case."""
+    def __call__(self, full: bool = False, bulk: bool = False, rebuild: bool = False) -> None:
+        """Executes the use case.
+
+        Only the documents whose content changed since they were last indexed are embedded, unless a full run is
+        requested. In bulk mode the context store defers its indexing work until every document is written.
+
+        A rebuild writes every document to a new collection, which replaces the served one once every document is
+        written, so searches go on meanwhile. A single failure discards the new collection, and documents are only
+        marked indexed once it is served.
+        """
+        if not rebuild:
+            with self.__context_writer.bulk() if bulk else nullcontext():
+                self.__index(full)
+            return
+
+        with self.__context_writer.rebuild():
+            with self.__context_writer.bulk() if bulk else nullcontext():
+                written, failed = self.__index(full=True, deferred=True)
+
+            if failed:
+                raise RuntimeError(f'{failed} documents failed to index, the rebuilt collection is discarded.')
+
+        for document in written:
+            self.__repository.mark_indexed(document)
+
+    def __index(self, full: bool, deferred: bool = False) -> tuple[list[Document], int]:
+        """Writes the documents to the context store, returning the written documents left to mark and the failures.
+
+        Documents are marked indexed as soon as they are written, unless the marking is deferred.
+        """
+        documents = self.__repository.find_all(fields=DataEmbeddingUseCase.INDEXED_FIELDS, unindexed=not full)
+
+        written: list[Document] = []
         count = 0
-        for document in self.__repository.find_all():
+        failed = 0
+        for document, result in self.__context_writer.add_many(documents):
             try:
-                self.__context_writer.add(document)
+                if result is not None:
+                    raise result
+
+                if deferred:
+                    # Marking only needs the content to hash documents saved before content hashes existed
+                    written.append(replace(document, content='') if document.content_hash else document)
+                else:
+                    self.__repository.mark_indexed(document)
                 count += 1
             except Exception as error:
                 # We don't let one document failure stop the batch
+                failed += 1
                 self.__logger.error(f'Error saving document: {error} - [id="{document.id}" - title="{document.title}"]')
 
         self.__logger.info(f'Total documents processed successfully: {count}')
+
+        return written, failed
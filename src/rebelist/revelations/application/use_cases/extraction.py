@@ -1,6 +1,36 @@
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Generator, Iterable
+
 from rebelist.revelations.config.settings import RagSettings
-from rebelist.revelations.domain import ContentProviderPort, Document, DocumentRepositoryPort
-from rebelist.revelations.domain.services import LoggerPort, PdfConverterPort
+from rebelist.revelations.domain import (
+    ContentProviderPort,
+    Document,
+    DocumentRepositoryPort,
+    QuarantinedDocument,
+    QuarantineRepositoryPort,
+    SourceArchiveRepositoryPort,
+    SourceFormat,
+    SyncCheckpoint,
+    Watermark,
+    WatermarkRepositoryPort,
+)
+from rebelist.revelations.domain.exceptions import DocumentConversionAbortedError
+from rebelist.revelations.domain.services import HtmlConverterPort, LoggerPort, PdfConverterPort
+
+
+@dataclass(slots=True)
+class _Run:
+    """State of an extraction run shared by its steps."""
+
+    watermarks: dict[str, datetime]
+    quarantine: dict[str, QuarantinedDocument]
+
+    # Spaces with failed documents keep their watermark, so the failures are retried on the next run
+    failed_spaces: set[str] = field(default_factory=set[str])
+
+    # Converted documents waiting to be saved with the next batch, along with their raw document
+    pending: list[tuple[dict[str, Any], Document]] = field(default_factory=list[tuple[dict[str, Any], Document]])
 
 
 class DataExtractionUseCase:
@@ -8,35 +38,187 @@ class DataExtractionUseCase:
         self,
         content_provider: ContentProviderPort,
         repository: DocumentRepositoryPort,
+        watermark_repository: WatermarkRepositoryPort,
+        quarantine_repository: QuarantineRepositoryPort,
         converter: PdfConverterPort,
+        html_converter: HtmlConverterPort,
         settings: RagSettings,
         logger: LoggerPort,
+        batch_size: int = 100,
+        archive: SourceArchiveRepositoryPort | None = None,
     ):
         self.__content_provider = content_provider
         self.__repository = repository
+        self.__watermark_repository = watermark_repository
+        self.__quarantine_repository = quarantine_repository
         self.__converter = converter
+        self.__html_converter = html_converter
         self.__settings = settings
         self.__logger = logger
+        self.__batch_size = max(batch_size, 1)
+        self.__archive = archive
+
+    def __call__(self, incremental: bool = False) -> None:
+        """Executes the use case.
+
+        In incremental mode only the documents modified after their stored version are downloaded and converted.
+        """
+        stored = {watermark.space: watermark.modified_at for watermark in self.__watermark_repository.find_all()}
+        quarantine = {document.id: document for document in self.__quarantine_repository.find_all()}
+        run = _Run(watermarks=dict(stored), quarantine=quarantine)
+
+        checkpoint = None
+        if incremental:
+            # Quarantined versions count as synchronized, so their pages are not even downloaded again
+            quarantined_versions = {document.id: document.modified_at for document in quarantine.values()}
+            checkpoint = SyncCheckpoint(stored, {**self.__repository.find_versions(), **quarantined_versions})
+
+        documents = self.__content_provider.fetch(checkpoint)
+        conversions = self.__converter.pdf_to_markdown_many(self.__select(documents, run))
 
-    def __call__(self) -> None:
-        """Executes the use case."""
-        documents = self.__content_provider.fetch()
+        # Conversions complete out of order, each document is queued for saving as soon as its conversion is ready
+        for raw_document, markdown in conversions:
+            self.__store(raw_document, markdown, run)
+
+        self.__flush(run)
+        self.__save_watermarks(stored, run)
+
+    def __select(
+        self, documents: Iterable[dict[str, Any]], run: _Run
+    ) -> Generator[tuple[dict[str, Any], bytes], None, None]:
+        """Yields the PDF documents to convert along with their content, tracking the watermark of every space.
+
+        HTML documents are light to convert, so they are converted right away instead of going to the pool. PDF
+        documents are archived first when an archive is configured. Documents that failed to be fetched record their
+        space as failed.
+        """
         for raw_document in documents:
+            if 'error' in raw_document:
+                # The document could not be fetched, its space keeps the watermark so it is fetched again
+                self.__fail(raw_document, run)
+                continue
+
+            space = raw_document.get('space')
+            modified_at = raw_document['modified_at']
+            if space is not None and (space not in run.watermarks or modified_at > run.watermarks[space]):
+                run.watermarks[space] = modified_at
+
             if len(raw_document['content']) < self.__settings.min_content_length:
                 self.__logger.info(f'Skipping short document. [id={raw_document["id"]}]')
                 continue
 
-            try:
-                document = Document(
-                    id=raw_document['id'],
-                    title=raw_document['title'],
-                    content=self.__converter.pdf_to_markdown(raw_document['content']),
-                    modified_at=raw_document['modified_at'],
-                    raw=raw_document['raw'],
-                    url=raw_document['url'],
-                )
+            quarantined = run.quarantine.get(str(raw_document['id']))
+            if quarantined is not None and modified_at <= quarantined.modified_at:
+                self.__logger.info(f'Skipping quarantined document. [id={raw_document["id"]}]')
+                continue
+
+            if raw_document.get('format') == SourceFormat.HTML:
+                self.__store(raw_document, self.__convert_html(raw_document['content']), run)
+                continue
+
+            if self.__archive is not None:
+                self.__archive_source(raw_document, self.__archive)
 
-                self.__repository.save(document)
+            yield raw_document, raw_document['content']
+
+    def __archive_source(self, raw_document: dict[str, Any], archive: SourceArchiveRepositoryPort) -> None:
+        """Archives the PDF of a document, so it can be converted again without downloading it."""
+        try:
+            archive.save(raw_document['id'], raw_document['modified_at'], raw_document['content'])
+        except Exception as error:
+            # A missing archive only prevents reconverting the document later, so the extraction goes on
+            self.__logger.warning(f'Error archiving document. [id={raw_document["id"]}] - {error}')
+
+    def __convert_html(self, content: str) -> str | Exception:
+        """Converts an HTML document, returning the error instead of raising it like the PDF conversions do."""
+        try:
+            return self.__html_converter.html_to_markdown(content)
+        except Exception as error:
+            return error
+
+    def __store(self, raw_document: dict[str, Any], markdown: str | Exception, run: _Run) -> None:
+        """Queues a converted document for saving, recording its space as failed when the conversion failed.
+
+        Documents whose conversion was aborted are quarantined instead.
+        """
+        try:
+            if isinstance(markdown, DocumentConversionAbortedError):
+                self.__quarantine(raw_document, markdown)
+                return
+
+            if isinstance(markdown, Exception):
+                raise markdown
+
+            document = Document(
+                id=raw_document['id'],
+                title=raw_document['title'],
+                content=markdown,
+                modified_at=raw_document['modified_at'],
+                raw=raw_document['raw'],
+                url=raw_document['url'],
+                space=raw_document.get('space', ''),
+            )
+
+        except Exception as error:
+            self.__fail(raw_document, run)
+            self.__logger.error(f'Error saving document. [id={raw_document["id"]}] - {error}')
+            return
+
+        run.pending.append((raw_document, document))
+
+        if len(run.pending) >= self.__batch_size:
+            self.__flush(run)
+
+    def __flush(self, run: _Run) -> None:
+        """Saves the queued documents in one batch, releasing the quarantined ones once saved."""
+        if not run.pending:
+            return
+
+        pending, run.pending = run.pending, []
+
+        try:
+            self.__repository.save_many([document for _, document in pending])
+        except Exception as error:
+            for raw_document, _ in pending:
+                self.__fail(raw_document, run)
+            ids = ', '.join(str(raw_document['id']) for raw_document, _ in pending)
+            self.__logger.error(f'Error saving documents. [ids={ids}] - {error}')
+            return
+
+        for raw_document, _ in pending:
+            document_id = str(raw_document['id'])
+            if document_id in run.quarantine:
+                self.__quarantine_repository.delete(document_id)
+
+    @staticmethod
+    def __fail(raw_document: dict[str, Any], run: _Run) -> None:
+        """Records the space of a failed document."""
+        space = raw_document.get('space')
+        if space is not None:
+            run.failed_spaces.add(space)
+
+    def __quarantine(self, raw_document: dict[str, Any], error: DocumentConversionAbortedError) -> None:
+        """Quarantines a document whose conversion was aborted, until it is modified again."""
+        self.__quarantine_repository.save(
+            QuarantinedDocument(
+                id=str(raw_document['id']),
+                title=raw_document['title'],
+                size=len(raw_document['content']),
+                error=str(error),
+                modified_at=raw_document['modified_at'],
+                quarantined_at=datetime.now(UTC),
+            )
+        )
+        self.__logger.warning(f'Document quarantined. [id={raw_document["id"]}] - {error}')
+
+    def __save_watermarks(self, stored: dict[str, datetime], run: _Run) -> None:
+        """Persists the high-water mark reached by every space synchronized without failures."""
+        for space, modified_at in run.watermarks.items():
+            if stored.get(space) == modified_at:
+                continue
+
+            if space in run.failed_spaces:
+                self.__logger.warning(f'Watermark not advanced due to failed documents. [space={space}]')
+                continue
 
-            except Exception as error:
-                self.__logger.error(f'Error saving document. [id={raw_document["id"]}] - {error}')
+            self.__watermark_repository.save(Watermark(space=space, modified_at=modified_at))
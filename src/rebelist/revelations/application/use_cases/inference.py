@@ -1,7 +1,7 @@
 from typing import Iterator
 
 from rebelist.revelations.config.settings import RagSettings
-from rebelist.revelations.domain import ChatAdapterPort, ContextReaderPort, Response
+from rebelist.revelations.domain import ChatAdapterPort, ContextFilter, ContextReaderPort, Response
 from rebelist.revelations.domain.services import LoggerPort
 
 
@@ -18,10 +18,10 @@ class InferenceUseCase:
         self.__settings = settings
         self.__logger = logger
 
-    def __call__(self, query: str) -> Response[Iterator[str]]:
-        """Executes the use case."""
+    def __call__(self, query: str, context_filter: ContextFilter | None = None) -> Response[Iterator[str]]:
+        """Executes the use case, answering from the documents matching the filter if any."""
         try:
-            documents = self.__context_reader.search(query, self.__settings.retrieval_limit)
+            documents = self.__context_reader.search(query, self.__settings.retrieval_limit, context_filter)
             response = self.__chat_adapter.answer(query, documents[: self.__settings.context_cutoff])
             return response
         except Exception as error:
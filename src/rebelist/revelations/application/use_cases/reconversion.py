@@ -0,0 +1,80 @@
+from dataclasses import replace
+from typing import Final, Generator, Iterable
+
+from rebelist.revelations.domain import Document, DocumentRepositoryPort, SourceArchiveRepositoryPort
+from rebelist.revelations.domain.services import LoggerPort, PdfConverterPort
+
+
+class DataReconversionUseCase:
+    # Every field but the content is kept from the stored document, so the content is not even read
+    KEPT_FIELDS: Final[tuple[str, ...]] = ('title', 'modified_at', 'raw', 'url', 'space')
+
+    def __init__(
+        self,
+        repository: DocumentRepositoryPort,
+        archive: SourceArchiveRepositoryPort,
+        converter: PdfConverterPort,
+        logger: LoggerPort,
+        batch_size: int = 100,
+    ):
+        self.__repository = repository
+        self.__archive = archive
+        self.__converter = converter
+        self.__logger = logger
+        self.__batch_size = max(batch_size, 1)
+
+    def __call__(self) -> None:
+        """Executes the use case.
+
+        The stored documents are converted again from their archived PDF, without downloading anything from the
+        content source. Documents without an archived PDF, or failing to convert, keep their stored content.
+        """
+        documents = self.__repository.find_all(fields=DataReconversionUseCase.KEPT_FIELDS)
+        conversions = self.__converter.pdf_to_markdown_many(self.__load(documents))
+
+        pending: list[Document] = []
+        count = 0
+
+        for document, markdown in conversions:
+            if isinstance(markdown, Exception):
+                self.__logger.error(f'Error reconverting document. [id={document.id}] - {markdown}')
+                continue
+
+            pending.append(replace(document, content=markdown))
+
+            if len(pending) >= self.__batch_size:
+                count += self.__save(pending)
+                pending = []
+
+        count += self.__save(pending)
+
+        self.__logger.info(f'Total documents reconverted successfully: {count}')
+
+    def __load(self, documents: Iterable[Document]) -> Generator[tuple[Document, bytes], None, None]:
+        """Yields the documents along with the archived PDF of their stored version."""
+        for document in documents:
+            try:
+                data = self.__archive.find(document.id, document.modified_at)
+            except Exception as error:
+                self.__logger.error(f'Error reading archived document. [id={document.id}] - {error}')
+                continue
+
+            if data is None:
+                self.__logger.info(f'Skipping document without archive. [id={document.id}]')
+                continue
+
+            yield document, data
+
+    def __save(self, documents: list[Document]) -> int:
+        """Saves a batch of reconverted documents, returning how many were saved."""
+        if not documents:
+            return 0
+
+        try:
+            self.__repository.save_many(documents)
+        except Exception as error:
+            ids = ', '.join(str(document.id) for document in documents)
+            self.__logger.error(f'Error saving documents. [ids={ids}] - {error}')
+            return 0
+
+        return len(documents)
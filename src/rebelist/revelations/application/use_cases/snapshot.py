@@ -0,0 +1,80 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Final
+from zipfile import ZipFile
+
+from rebelist.revelations.domain import DocumentRepositoryPort, SnapshotPort
+from rebelist.revelations.domain.services import LoggerPort
+
+
+class DatasetArchive:
+    """Layout of the archive holding a snapshot of the dataset, a zip file of one entry per store."""
+
+    VERSION: Final[int] = 1
+    MANIFEST: Final[str] = 'manifest.json'
+    DOCUMENTS: Final[str] = 'documents.bson'
+    CONTEXT: Final[str] = 'context.snapshot'
+
+
+class DatasetSnapshotUseCase:
+    def __init__(self, document_snapshot: SnapshotPort, context_snapshot: SnapshotPort, logger: LoggerPort):
+        self.__document_snapshot = document_snapshot
+        self.__context_snapshot = context_snapshot
+        self.__logger = logger
+
+    def __call__(self, path: Path) -> None:
+        """Executes the use case.
+
+        The stored documents and the context collection are written to a single archive, so another deployment can be
+        bootstrapped from a copy of the file, without downloading nor embedding anything.
+        """
+        with ZipFile(path, 'w') as archive:
+            with archive.open(DatasetArchive.DOCUMENTS, 'w', force_zip64=True) as target:
+                self.__document_snapshot.export(target)
+
+            with archive.open(DatasetArchive.CONTEXT, 'w', force_zip64=True) as target:
+                self.__context_snapshot.export(target)
+
+            manifest = {'version': DatasetArchive.VERSION, 'created_at': datetime.now(UTC).isoformat()}
+            archive.writestr(DatasetArchive.MANIFEST, json.dumps(manifest))
+
+        self.__logger.info(f'Dataset snapshot saved. [path={path}]')
+
+
+class DatasetRestoreUseCase:
+    def __init__(
+        self,
+        document_snapshot: SnapshotPort,
+        context_snapshot: SnapshotPort,
+        repository: DocumentRepositoryPort,
+        logger: LoggerPort,
+    ):
+        self.__document_snapshot = document_snapshot
+        self.__context_snapshot = context_snapshot
+        self.__repository = repository
+        self.__logger = logger
+
+    def __call__(self, path: Path) -> None:
+        """Executes the use case.
+
+        The context collection is restored before the documents, so documents are never recorded as indexed in a
+        collection that failed to restore. The restored collection replaces the served one, while the archived
+        documents are merged into the stored ones, so the stored documents are first all recorded as not indexed. The
+        archived documents bring back their own indexed hash, and the others are indexed by the next incremental run.
+        """
+        with ZipFile(path) as archive:
+            manifest = json.loads(archive.read(DatasetArchive.MANIFEST))
+            if manifest.get('version') != DatasetArchive.VERSION:
+                raise ValueError(f'Unsupported dataset snapshot version: {manifest.get("version")}')
+
+            with archive.open(DatasetArchive.CONTEXT) as source:
+                self.__context_snapshot.restore(source)
+
+            reset = self.__repository.unmark_indexed()
+            self.__logger.info(f'Stored documents recorded as not indexed. [count={reset}]')
+
+            with archive.open(DatasetArchive.DOCUMENTS) as source:
+                self.__document_snapshot.restore(source)
+
+        self.__logger.info(f'Dataset snapshot restored. [path={path}, created_at={manifest.get("created_at")}]')
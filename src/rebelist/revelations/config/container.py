@@ -1,14 +1,18 @@
 from __future__ import annotations
 
 import sys
+from functools import partial
+from importlib import metadata
 from pathlib import Path
 from typing import Any, Final, Mapping, cast
 
+import httpx
 import loguru
 from atlassian import Confluence
 from dependency_injector.containers import DeclarativeContainer, WiringConfiguration
 from dependency_injector.providers import Callable, Singleton
-from docling.document_converter import DocumentConverter as DoclingConverter
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter
 from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
 from langchain_text_splitters import MarkdownTextSplitter, TextSplitter
@@ -19,18 +23,48 @@ from sentence_transformers import CrossEncoder
 from transformers import AutoTokenizer
 from transformers.tokenization_utils_fast import PreTrainedTokenizerFast
 
-from rebelist.revelations.application.use_cases import DataEmbeddingUseCase, DataExtractionUseCase, InferenceUseCase
-from rebelist.revelations.application.use_cases.benchmark import BenchmarkUseCase
-from rebelist.revelations.config.settings import RagSettings, load_settings
-from rebelist.revelations.domain import AnswerEvaluatorPort, ChatAdapterPort, RetrievalEvaluator
-from rebelist.revelations.infrastructure.confluence import ConfluenceGateway
-from rebelist.revelations.infrastructure.docling.adapters import PdfConverter
+from rebelist.revelations.application.use_cases import (
+    DataEmbeddingUseCase,
+    DataExtractionUseCase,
+    DataReconversionUseCase,
+    DatasetRestoreUseCase,
+    DatasetSnapshotUseCase,
+    InferenceUseCase,
+)
+from rebelist.revelations.application.use_cases.benchmark import BenchmarkUseCase, QuantizationBenchmarkUseCase
+from rebelist.revelations.config.settings import DoclingSettings, QdrantSettings, RagSettings, load_settings
+from rebelist.revelations.domain import (
+    AnswerEvaluatorPort,
+    ChatAdapterPort,
+    RetrievalEvaluator,
+    SourceArchiveRepositoryPort,
+)
+from rebelist.revelations.infrastructure.confluence import AdaptiveRateLimiter, ConfluenceGateway, RateLimitedSession
+from rebelist.revelations.infrastructure.docling.adapters import (
+    HtmlConverter,
+    ProcessPoolPdfConverter,
+    create_pdf_converter,
+)
 from rebelist.revelations.infrastructure.filesystem import YamlPromptLoader
 from rebelist.revelations.infrastructure.logging import Logger
-from rebelist.revelations.infrastructure.mongo import MongoDocumentRepository
+from rebelist.revelations.infrastructure.mongo import (
+    DocumentCodec,
+    GridFsSourceArchiveRepository,
+    MongoCollectionSnapshot,
+    MongoDocumentRepository,
+    MongoQuarantineRepository,
+    MongoWatermarkRepository,
+)
 from rebelist.revelations.infrastructure.ollama import OllamaMemoryChatAdapter
 from rebelist.revelations.infrastructure.ollama.adapters import OllamaAnswerEvaluator, OllamaStatelessChatAdapter
-from rebelist.revelations.infrastructure.qdrant import QdrantContextReader, QdrantContextWriter
+from rebelist.revelations.infrastructure.qdrant import (
+    QdrantCollectionManager,
+    QdrantCollectionSnapshot,
+    QdrantContextReader,
+    QdrantContextWriter,
+    QdrantStorageInspector,
+)
+from rebelist.revelations.infrastructure.sqlite import SqliteCache
 
 
 class Container(DeclarativeContainer):
@@ -60,6 +94,45 @@ class Container(DeclarativeContainer):
             chunk_overlap=settings.chunk_overlap,
         )
 
+    @staticmethod
+    def _get_embedding_cache(settings: QdrantSettings) -> SqliteCache | None:
+        if settings.embedding_cache_max_size_mb <= 0:
+            return None
+        return SqliteCache(settings.embedding_cache_path, settings.embedding_cache_max_size_mb * 1024 * 1024)
+
+    @staticmethod
+    def _get_embedding_fingerprint(settings: RagSettings) -> str:
+        return f'model={settings.embedding_model};dimension={settings.embedding_dimension}'
+
+    @staticmethod
+    def _get_conversion_cache(settings: DoclingSettings) -> SqliteCache | None:
+        if settings.cache_max_size_mb <= 0:
+            return None
+        return SqliteCache(settings.cache_path, settings.cache_max_size_mb * 1024 * 1024)
+
+    @staticmethod
+    def _get_conversion_fingerprint(settings: DoclingSettings) -> str:
+        profile = settings.model_dump_json(
+            include={
+                'profile',
+                'num_threads',
+                'fast_ocr',
+                'fast_table_mode',
+                'accurate_ocr',
+                'accurate_table_mode',
+                'fallback_min_chars',
+            }
+        )
+        return f'docling={metadata.version("docling")};profile={profile}'
+
+    @staticmethod
+    def _get_qdrant_url(settings: QdrantSettings) -> str:
+        return f'http://{settings.host}:{settings.port}'
+
+    @staticmethod
+    def _get_enabled_archive(enabled: bool, archive: SourceArchiveRepositoryPort) -> SourceArchiveRepositoryPort | None:
+        return archive if enabled else None
+
     ### Configuration ###
 
     wiring_config = WiringConfiguration(auto_wire=True)
@@ -67,14 +140,24 @@ class Container(DeclarativeContainer):
 
     ### Private Services ###
 
+    __confluence_rate_limiter = Singleton(
+        AdaptiveRateLimiter,
+        rate=settings.provided.confluence.rate_limit,
+        min_rate=settings.provided.confluence.min_rate_limit,
+        max_rate=settings.provided.confluence.max_rate_limit,
+    )
+
+    # Pacing and retries are handled by the session, shared by every gateway worker
+    __confluence_session = Singleton(
+        RateLimitedSession, __confluence_rate_limiter, max_retries=settings.provided.confluence.max_retries
+    )
+
     __confluence_client = Singleton(
         Confluence,
         url=settings.provided.confluence.host,
         token=settings.provided.confluence.token,
-        backoff_and_retry=True,
-        retry_status_codes=[413, 429, 500, 503],
-        max_backoff_seconds=30,
-        max_backoff_retries=3,
+        session=__confluence_session,
+        retry_with_header=False,
     )
 
     __embedding = Singleton(
@@ -96,9 +179,23 @@ class Container(DeclarativeContainer):
         local_files_only=True,
     )
 
-    __docling_converter = Singleton(DoclingConverter)
+    # Picklable factory, every conversion worker process builds its own converter with it
+    __pdf_converter_factory = Singleton(partial, create_pdf_converter, settings.provided.docling)
+
+    __pdf_converter = Singleton(
+        ProcessPoolPdfConverter,
+        factory=__pdf_converter_factory,
+        workers=settings.provided.docling.workers,
+        max_in_flight=settings.provided.docling.max_in_flight,
+        split_threshold_pages=settings.provided.docling.split_threshold_pages,
+        split_pages=settings.provided.docling.split_pages,
+        memory_limit_mb=settings.provided.docling.worker_memory_limit_mb,
+        timeout_seconds=settings.provided.docling.timeout_seconds,
+        cache=Singleton(_get_conversion_cache, settings.provided.docling),
+        cache_fingerprint=Callable(_get_conversion_fingerprint, settings.provided.docling),
+    )
 
-    __pdf_converter = Singleton(PdfConverter, __docling_converter)
+    __html_converter = Singleton(HtmlConverter, Singleton(DocumentConverter, allowed_formats=[InputFormat.HTML]))
 
     __prompt_loader = Singleton(
         YamlPromptLoader,
@@ -128,6 +225,17 @@ class Container(DeclarativeContainer):
         sparse_vector_name=settings.provided.qdrant.sparse_vector_name,
     )
 
+    qdrant_collections = Singleton(
+        QdrantCollectionManager,
+        qdrant_client,
+        settings.provided.qdrant,
+        settings.provided.rag.embedding_dimension,
+        logger,
+    )
+
+    # Snapshots are transferred through the REST API, without any timeout as they may take long
+    __qdrant_http = Singleton(httpx.Client, base_url=Callable(_get_qdrant_url, settings.provided.qdrant), timeout=None)
+
     ollama_chat = Singleton(
         ChatOllama,
         model=settings.provided.rag.llm_model,
@@ -147,18 +255,99 @@ class Container(DeclarativeContainer):
 
     ollama_answer_evaluator = Singleton(OllamaAnswerEvaluator, ollama_chat, __benchmark_prompt)
 
-    context_writer = Singleton(QdrantContextWriter, qdrant_vector_store, __document_splitter)
+    context_writer = Singleton(
+        QdrantContextWriter,
+        qdrant_vector_store,
+        __document_splitter,
+        logger,
+        batch_chunks=settings.provided.qdrant.write_batch_chunks,
+        split_workers=settings.provided.qdrant.write_split_workers,
+        dense_workers=settings.provided.qdrant.write_dense_workers,
+        sparse_workers=settings.provided.qdrant.write_sparse_workers,
+        upsert_workers=settings.provided.qdrant.write_upsert_workers,
+        queue_size=settings.provided.qdrant.write_queue_size,
+        cache=Singleton(_get_embedding_cache, settings.provided.qdrant),
+        cache_fingerprint=Callable(_get_embedding_fingerprint, settings.provided.rag),
+        collections=qdrant_collections,
+        bulk_timeout_seconds=settings.provided.qdrant.bulk_timeout_seconds,
+    )
+
+    context_reader = Singleton(
+        QdrantContextReader,
+        qdrant_vector_store,
+        __ranker,
+        oversampling=settings.provided.qdrant.search_oversampling,
+        rescore=settings.provided.qdrant.search_rescore,
+    )
 
-    context_reader = Singleton(QdrantContextReader, qdrant_vector_store, __ranker)
+    storage_inspector = Singleton(
+        QdrantStorageInspector,
+        qdrant_client,
+        settings.provided.qdrant.context_collection,
+        settings.provided.qdrant.vector_name,
+        settings.provided.qdrant.sparse_vector_name,
+    )
 
     confluence_gateway = Singleton(ConfluenceGateway, __confluence_client, settings.provided.confluence, logger)
 
     database = Singleton(_get_mongo_database, mongo_client)
 
-    document_repository = Singleton(MongoDocumentRepository, database, settings.provided.mongo.source_collection)
+    __document_codec = Singleton(
+        DocumentCodec,
+        compress_raw=settings.provided.mongo.compress_raw,
+        compress_content=settings.provided.mongo.compress_content,
+        level=settings.provided.mongo.compression_level,
+    )
+
+    document_repository = Singleton(
+        MongoDocumentRepository,
+        database,
+        settings.provided.mongo.source_collection,
+        batch_size=settings.provided.mongo.write_batch_size,
+        read_batch_size=settings.provided.mongo.read_batch_size,
+        codec=__document_codec,
+    )
+
+    watermark_repository = Singleton(MongoWatermarkRepository, database, settings.provided.mongo.watermark_collection)
+
+    quarantine_repository = Singleton(
+        MongoQuarantineRepository, database, settings.provided.mongo.quarantine_collection
+    )
+
+    source_archive_repository = Singleton(
+        GridFsSourceArchiveRepository, database, settings.provided.mongo.archive_bucket
+    )
+
+    document_snapshot = Singleton(
+        MongoCollectionSnapshot,
+        database,
+        settings.provided.mongo.source_collection,
+        batch_size=settings.provided.mongo.write_batch_size,
+    )
+
+    context_snapshot = Singleton(QdrantCollectionSnapshot, qdrant_client, __qdrant_http, qdrant_collections, logger)
 
     data_extraction_use_case = Singleton(
-        DataExtractionUseCase, confluence_gateway, document_repository, __pdf_converter, settings.provided.rag, logger
+        DataExtractionUseCase,
+        confluence_gateway,
+        document_repository,
+        watermark_repository,
+        quarantine_repository,
+        __pdf_converter,
+        __html_converter,
+        settings.provided.rag,
+        logger,
+        batch_size=settings.provided.mongo.write_batch_size,
+        archive=Singleton(_get_enabled_archive, settings.provided.mongo.archive_sources, source_archive_repository),
+    )
+
+    data_reconversion_use_case = Singleton(
+        DataReconversionUseCase,
+        document_repository,
+        source_archive_repository,
+        __pdf_converter,
+        logger,
+        batch_size=settings.provided.mongo.write_batch_size,
     )
 
     data_embedding_use_case = Singleton(DataEmbeddingUseCase, document_repository, context_writer, logger)
@@ -175,3 +364,11 @@ class Container(DeclarativeContainer):
         ollama_stateless_chat_adapter,
         logger,
     )
+
+    quantization_benchmark_use_case = Singleton(QuantizationBenchmarkUseCase, context_reader, logger)
+
+    dataset_snapshot_use_case = Singleton(DatasetSnapshotUseCase, document_snapshot, context_snapshot, logger)
+
+    dataset_restore_use_case = Singleton(
+        DatasetRestoreUseCase, document_snapshot, context_snapshot, document_repository, logger
+    )
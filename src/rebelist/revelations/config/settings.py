@@ -1,7 +1,7 @@
 from functools import lru_cache
 from importlib import metadata
 from pathlib import Path
-from typing import Annotated, Final
+from typing import Annotated, Final, Literal
 
 from dotenv import load_dotenv
 from pydantic import field_validator
@@ -48,16 +48,22 @@ class ConfluenceSettings(BaseSettings):
     host: str = ''
     token: str = ''
     spaces: Annotated[tuple[str, ...], NoDecode] = ()
+    html_spaces: Annotated[tuple[str, ...], NoDecode] = ()
     max_workers: int = 3
     batch_size: int = 500
-    throttle_delay_seconds: int = 0
-
-    @field_validator('spaces', mode='before')
+    rate_limit: float = 5.0
+    min_rate_limit: float = 0.5
+    max_rate_limit: float = 50.0
+    max_retries: int = 3
+    delta_query: bool = True
+    delta_overlap_hours: int = 24
+
+    @field_validator('spaces', 'html_spaces', mode='before')
     @classmethod
     def parse_spaces(cls, value: str | tuple[str, ...]) -> tuple[str, ...]:
         """Parse comma separated string into tuple of spaces, or return existing tuple."""
         if isinstance(value, str):
-            return tuple(element.strip() for element in value.split(','))
+            return tuple(element.strip() for element in value.split(',') if element.strip())
         return value
 
 
@@ -68,6 +74,15 @@ class MongoSettings(BaseSettings):
 
     uri: str = ''
     source_collection: str = 'source_documents_x'
+    watermark_collection: str = 'source_watermarks'
+    quarantine_collection: str = 'source_quarantine'
+    write_batch_size: int = 200
+    read_batch_size: int = 100
+    compress_raw: bool = False
+    compress_content: bool = False
+    compression_level: int = 3
+    archive_sources: bool = False
+    archive_bucket: str = 'source_archive'
 
 
 class OllamaSettings(BaseSettings):
@@ -89,6 +104,43 @@ class QdrantSettings(BaseSettings):
     sparse_vector_name: str = 'sparse'
     context_collection: str = 'context_documents'
     sparse_embedding: str = 'Qdrant/bm25'
+    write_batch_chunks: int = 256
+    write_split_workers: int = 2
+    write_dense_workers: int = 2
+    write_sparse_workers: int = 1
+    write_upsert_workers: int = 1
+    write_queue_size: int = 8
+    bulk_timeout_seconds: int = 3600
+    embedding_cache_path: str = 'var/cache/embeddings.sqlite3'
+    embedding_cache_max_size_mb: int = 2048
+    quantization: Literal['none', 'scalar', 'binary'] = 'none'
+    quantization_always_ram: bool = True
+    search_oversampling: float = 2.0
+    search_rescore: bool = True
+    profile: Literal['default', 'large_corpus'] = 'default'
+    memmap_threshold_kb: int = 20000
+
+
+class DoclingSettings(BaseSettings):
+    """Configuration settings for Docling integration."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix='DOCLING_')
+
+    workers: int = 2
+    max_in_flight: int = 8
+    cache_path: str = 'var/cache/conversions.sqlite3'
+    cache_max_size_mb: int = 1024
+    profile: Literal['fast', 'accurate'] = 'fast'
+    num_threads: int = 4
+    fast_ocr: bool = False
+    fast_table_mode: Literal['fast', 'accurate'] = 'fast'
+    accurate_ocr: bool = True
+    accurate_table_mode: Literal['fast', 'accurate'] = 'accurate'
+    fallback_min_chars: int = 20
+    split_threshold_pages: int = 100
+    split_pages: int = 50
+    worker_memory_limit_mb: int = 0
+    timeout_seconds: int = 600
 
 
 class Settings(BaseSettings):
@@ -102,6 +154,7 @@ class Settings(BaseSettings):
     mongo: MongoSettings
     ollama: OllamaSettings
     qdrant: QdrantSettings
+    docling: DoclingSettings
 
 
 @lru_cache(maxsize=1)
@@ -123,4 +176,5 @@ def load_settings() -> Settings:
         mongo=MongoSettings(),
         ollama=OllamaSettings(),
         qdrant=QdrantSettings(),
+        docling=DoclingSettings(),
     )
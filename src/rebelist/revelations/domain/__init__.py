@@ -2,12 +2,23 @@ from rebelist.revelations.domain.models import (
     BenchmarkCase,
     BenchmarkScore,
     ContextDocument,
+    ContextFilter,
     Document,
     FidelityScore,
     PromptConfig,
+    QuantizationScore,
+    QuarantinedDocument,
     Response,
+    SourceFormat,
+    SyncCheckpoint,
+    Watermark,
+)
+from rebelist.revelations.domain.repositories import (
+    DocumentRepositoryPort,
+    QuarantineRepositoryPort,
+    SourceArchiveRepositoryPort,
+    WatermarkRepositoryPort,
 )
-from rebelist.revelations.domain.repositories import DocumentRepositoryPort
 from rebelist.revelations.domain.services import (
     AnswerEvaluatorPort,
     ChatAdapterPort,
@@ -16,22 +27,33 @@ from rebelist.revelations.domain.services import (
     ContextWriterPort,
     LoggerPort,
     RetrievalEvaluator,
+    SnapshotPort,
 )
 
 __all__ = [
     'Document',
     'Response',
     'ContextDocument',
+    'ContextFilter',
     'DocumentRepositoryPort',
+    'WatermarkRepositoryPort',
+    'QuarantineRepositoryPort',
+    'SourceArchiveRepositoryPort',
+    'Watermark',
+    'SyncCheckpoint',
+    'QuarantinedDocument',
+    'SourceFormat',
     'ContentProviderPort',
     'ContextWriterPort',
     'ContextReaderPort',
     'ChatAdapterPort',
+    'SnapshotPort',
     'RetrievalEvaluator',
     'AnswerEvaluatorPort',
     'FidelityScore',
     'BenchmarkScore',
     'BenchmarkCase',
+    'QuantizationScore',
     'LoggerPort',
     'PromptConfig',
 ]
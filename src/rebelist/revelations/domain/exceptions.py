@@ -2,3 +2,9 @@ class DocumentConverterError(Exception):
     """Base exception for all document conversion failures."""
 
     ...
+
+
+class DocumentConversionAbortedError(DocumentConverterError):
+    """Raised when a conversion is aborted because it ran past its deadline or crashed its worker."""
+
+    ...
@@ -1,6 +1,7 @@
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Iterable
+from enum import StrEnum
+from typing import Iterable, Mapping
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -13,12 +14,57 @@ class Document:
     modified_at: datetime
     raw: str
     url: str | None
+    # Key of the content source space the document belongs to, empty for documents downloaded before it was stored
+    space: str = ''
+    # Hash of the stored content, and of the content last written to the context store
+    content_hash: str = ''
+    indexed_hash: str = ''
 
     def as_dict(self) -> dict[str, int | str | datetime]:
         """Converts the document to a dictionary."""
         return asdict(self)
 
 
+class SourceFormat(StrEnum):
+    """Format of the content downloaded from the content source."""
+
+    PDF = 'pdf'
+    HTML = 'html'
+
+
+@dataclass(frozen=True, slots=True)
+class Watermark:
+    """High-water mark of the latest modification synchronized from a content space."""
+
+    space: str
+    modified_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class QuarantinedDocument:
+    """Document whose conversion timed out or crashed, skipped until it is modified again."""
+
+    id: str
+    title: str
+    size: int
+    error: str
+    modified_at: datetime
+    quarantined_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class SyncCheckpoint:
+    """Snapshot of the already synchronized content used to fetch only what changed."""
+
+    watermarks: Mapping[str, datetime]
+    versions: Mapping[str, datetime]
+
+    def is_outdated(self, document_id: int | str, modified_at: datetime) -> bool:
+        """Checks whether the given document version is newer than the stored one."""
+        stored_at = self.versions.get(str(document_id))
+        return stored_at is None or modified_at > stored_at
+
+
 @dataclass(frozen=True, slots=True)
 class ContextDocument:
     title: str
@@ -27,6 +73,16 @@ class ContextDocument:
     url: str | None = None
 
 
+@dataclass(frozen=True, slots=True)
+class ContextFilter:
+    """Restricts a context search to the chunks matching every given condition, empty conditions matching all."""
+
+    document_ids: tuple[int, ...] = ()
+    spaces: tuple[str, ...] = ()
+    modified_after: datetime | None = None
+    modified_before: datetime | None = None
+
+
 @dataclass(frozen=True, slots=True)
 class Response[T]:
     answer: T
@@ -107,3 +163,13 @@ class BenchmarkScore(BaseModel):
     fidelity: FidelityScore = Field(description='Overall answer quality metrics.')
 
     model_config = ConfigDict(frozen=True)
+
+
+class QuantizationScore(BaseModel):
+    """Compares the retrieval over the quantized vectors against the retrieval over the original vectors."""
+
+    recall: float = Field(description='Fraction of the documents retrieved with the original vectors also retrieved')
+    quantized_latency_ms: float = Field(description='Mean retrieval latency over the quantized vectors')
+    original_latency_ms: float = Field(description='Mean retrieval latency over the original vectors')
+
+    model_config = ConfigDict(frozen=True)
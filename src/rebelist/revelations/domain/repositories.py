@@ -1,18 +1,99 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+from datetime import datetime
+from typing import Iterable, Mapping
 
-from rebelist.revelations.domain.models import Document
+from rebelist.revelations.domain.models import Document, QuarantinedDocument, Watermark
 
 
 class DocumentRepositoryPort(ABC):
     """Abstract base class for documents repository."""
 
     @abstractmethod
-    def find_all(self) -> Iterable[Document]:
-        """Finds documents that were modified since specific date."""
+    def find_all(
+        self,
+        modified_since: datetime | None = None,
+        ids: Iterable[int | str] | None = None,
+        fields: Iterable[str] | None = None,
+        unindexed: bool = False,
+    ) -> Iterable[Document]:
+        """Finds documents, optionally only the ones modified after a date or with the given ids.
+
+        When fields are given, only those document fields are loaded and the others are left empty. When unindexed is
+        set, only the documents whose content changed since it was last indexed are found.
+        """
+        ...
+
+    @abstractmethod
+    def find_versions(self) -> Mapping[str, datetime]:
+        """Finds the modification date of every stored document, keyed by document id."""
         ...
 
     @abstractmethod
     def save(self, document: Document) -> None:
         """Saves a document."""
         ...
+
+    @abstractmethod
+    def save_many(self, documents: Iterable[Document]) -> None:
+        """Saves many documents in batches, replacing the stored versions of the same documents."""
+        ...
+
+    @abstractmethod
+    def mark_indexed(self, document: Document) -> None:
+        """Records the content hash of a document as indexed."""
+        ...
+
+    @abstractmethod
+    def unmark_indexed(self, indexed_since: datetime | None = None) -> int:
+        """Forgets the indexed content hash of the documents indexed since a date, or of all documents.
+
+        The next incremental indexing indexes these documents again. Returns the number of documents forgotten.
+        """
+        ...
+
+
+class WatermarkRepositoryPort(ABC):
+    """Abstract base class for synchronization watermarks repository."""
+
+    @abstractmethod
+    def find_all(self) -> Iterable[Watermark]:
+        """Finds the watermarks of all synchronized spaces."""
+        ...
+
+    @abstractmethod
+    def save(self, watermark: Watermark) -> None:
+        """Saves a watermark, replacing the previous one of the same space."""
+        ...
+
+
+class QuarantineRepositoryPort(ABC):
+    """Abstract base class for quarantined documents repository."""
+
+    @abstractmethod
+    def find_all(self) -> Iterable[QuarantinedDocument]:
+        """Finds all quarantined documents."""
+        ...
+
+    @abstractmethod
+    def save(self, document: QuarantinedDocument) -> None:
+        """Saves a quarantined document, replacing the previous entry of the same document."""
+        ...
+
+    @abstractmethod
+    def delete(self, document_id: str) -> None:
+        """Releases a document from the quarantine."""
+        ...
+
+
+class SourceArchiveRepositoryPort(ABC):
+    """Abstract base class for the archive of the original source files."""
+
+    @abstractmethod
+    def find(self, document_id: int | str, modified_at: datetime) -> bytes | None:
+        """Finds the archived source file of a document version, if any."""
+        ...
+
+    @abstractmethod
+    def save(self, document_id: int | str, modified_at: datetime, data: bytes) -> None:
+        """Archives the source file of a document version, replacing the older versions of the same document."""
+        ...
@@ -1,16 +1,21 @@
 import math
 import re
 from abc import ABC, abstractmethod
-from typing import Any, Final, Iterable
+from contextlib import contextmanager
+from typing import IO, Any, Final, Generator, Iterable, Iterator
 
-from rebelist.revelations.domain import ContextDocument, Document, Response
-from rebelist.revelations.domain.models import BenchmarkCase, FidelityScore, RetrievalScore
+from rebelist.revelations.domain import ContextDocument, ContextFilter, Document, Response
+from rebelist.revelations.domain.models import BenchmarkCase, FidelityScore, RetrievalScore, SyncCheckpoint
 
 
 class ContentProviderPort(ABC):
     @abstractmethod
-    def fetch(self) -> Iterable[dict[str, Any]]:
-        """Fetches raw content from the content source."""
+    def fetch(self, checkpoint: SyncCheckpoint | None = None) -> Iterable[dict[str, Any]]:
+        """Fetches raw content from the content source.
+
+        When a checkpoint is given, only content that changed since it was taken is fetched. Content that failed to be
+        fetched is yielded as an item holding its `id`, its `space` and an `error` message, so it is fetched again.
+        """
         ...
 
 
@@ -20,11 +25,69 @@ class ContextWriterPort(ABC):
         """Saves a context document."""
         ...
 
+    def add_many(self, documents: Iterable[Document]) -> Iterator[tuple[Document, Exception | None]]:
+        """Saves many context documents, yielding each document with the error that prevented saving it, if any."""
+        for document in documents:
+            try:
+                self.add(document)
+                yield document, None
+            except Exception as error:
+                yield document, error
+
+    @contextmanager
+    def bulk(self) -> Generator[None, None, None]:
+        """Lets the store defer its indexing work while many documents are written, until the block exits."""
+        yield
+
+    @contextmanager
+    def rebuild(self) -> Generator[None, None, None]:
+        """Lets the store write documents to a new collection, replacing the served one once the block exits.
+
+        Stores unable to serve a collection while another is built write the documents in place.
+        """
+        yield
+
 
 class ContextReaderPort(ABC):
     @abstractmethod
-    def search(self, query: str, limit: int) -> list[ContextDocument]:
-        """Searches for context documents based on a query embedding."""
+    def search(self, query: str, limit: int, context_filter: ContextFilter | None = None) -> list[ContextDocument]:
+        """Searches for context documents based on a query embedding, among the ones matching the filter if any."""
+        ...
+
+    @abstractmethod
+    def retrieve(
+        self, query: str, limit: int, quantized: bool = True, context_filter: ContextFilter | None = None
+    ) -> list[ContextDocument]:
+        """Retrieves the candidate context documents of a query, without any reranking.
+
+        Disabling quantized searches the original vectors of the stores keeping quantized ones, stores without
+        quantization ignore it.
+        """
+        ...
+
+    @abstractmethod
+    def embed_query(self, query: str) -> list[float]:
+        """Computes the dense vector of a query."""
+        ...
+
+    @abstractmethod
+    def retrieve_dense(self, vector: list[float], limit: int, quantized: bool = True) -> list[ContextDocument]:
+        """Retrieves the context documents nearest to a dense query vector, without any other retrieval nor reranking.
+
+        Disabling quantized searches the original vectors, like for retrieve.
+        """
+        ...
+
+
+class SnapshotPort(ABC):
+    @abstractmethod
+    def export(self, target: IO[bytes]) -> None:
+        """Writes a copy of the whole store to a binary stream."""
+        ...
+
+    @abstractmethod
+    def restore(self, source: IO[bytes]) -> None:
+        """Loads a copy of a store written by export from a binary stream."""
         ...
 
 
@@ -57,6 +120,20 @@ class PdfConverterPort(ABC):
     def pdf_to_markdown(self, data: bytes) -> str:
         """Converts the raw binary content of a PDF document into a standardized Markdown formatted string."""
 
+    def pdf_to_markdown_many[K](self, items: Iterable[tuple[K, bytes]]) -> Iterator[tuple[K, str | Exception]]:
+        """Converts many PDF documents, yielding each key with its Markdown, or its error, as soon as it is ready."""
+        for key, data in items:
+            try:
+                yield key, self.pdf_to_markdown(data)
+            except Exception as error:
+                yield key, error
+
+
+class HtmlConverterPort(ABC):
+    @abstractmethod
+    def html_to_markdown(self, data: str) -> str:
+        """Converts an HTML document into a standardized Markdown formatted string."""
+
 
 class AnswerEvaluatorPort(ABC):
     HUMAN_TEMPLATE_QUESTION_KEY: Final[str] = 'question'
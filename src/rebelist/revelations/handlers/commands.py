@@ -1,3 +1,4 @@
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Mapping, cast
 
@@ -8,16 +9,15 @@ from prompt_toolkit import prompt
 from prompt_toolkit.formatted_text import HTML
 from pymongo.synchronous.database import Database
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import HnswConfigDiff, OptimizersConfigDiff, SparseIndexParams, SparseVectorParams
 from rich.console import Console
 from rich.live import Live
 from rich.markdown import Markdown
 from rich.table import Table
 
-from rebelist.revelations.domain import BenchmarkScore
+from rebelist.revelations.domain import BenchmarkScore, ContextFilter, QuantizationScore
 from rebelist.revelations.handlers.console import Number
 from rebelist.revelations.infrastructure.filesystem import JsonBenchmarkLoader
+from rebelist.revelations.infrastructure.qdrant import QdrantCollectionManager, StorageUsage
 
 
 @click.command(name='dataset:initialize')
@@ -35,48 +35,26 @@ def dataset_initialize(context: Context, drop: bool) -> None:
 
         # Qdrant
         qdrant: QdrantClient = container.qdrant_client()
-        context_document_collection_name = settings.qdrant.context_collection
+        collections: QdrantCollectionManager = container.qdrant_collections()
 
         message = 'All databases will be ' + click.style('dropped', fg='bright_magenta') + ' Do you want to continue?'
 
         if drop and click.confirm(message):
             mongo.drop_collection(source_document_collection_name)
-            qdrant.delete_collection(context_document_collection_name)
-
-        if not qdrant.collection_exists(context_document_collection_name):
-            hnsw_config = HnswConfigDiff(
-                # m = How many direct connections (or "shortcuts") each point gets on the map.
-                m=32,
-                # ef_construct = determines how thoroughly Qdrant searches for optimal connections when building the
-                # HNSW index, directly influencing the final index quality and the time it takes to build.
-                ef_construct=300,
-            )
-
-            # the minimum number of unindexed vectors a collection segment must accumulate before Qdrant's optimizer
-            # will start the HNSW index building process.
-            optimizers_config = OptimizersConfigDiff(indexing_threshold=200)
-
-            vector_params = VectorParams(
-                size=settings.rag.embedding_dimension,
-                distance=Distance.COSINE,
-                hnsw_config=hnsw_config,
-            )
-
-            sparse_params = SparseVectorParams(
-                index=SparseIndexParams(
-                    on_disk=True,
-                )
-            )
-
-            qdrant.create_collection(
-                collection_name=context_document_collection_name,
-                vectors_config={settings.qdrant.vector_name: vector_params},
-                sparse_vectors_config={settings.qdrant.sparse_vector_name: sparse_params},
-                optimizers_config=optimizers_config,
-            )
+            mongo.drop_collection(settings.mongo.watermark_collection)
+            mongo.drop_collection(settings.mongo.quarantine_collection)
+            mongo.drop_collection(f'{settings.mongo.archive_bucket}.files')
+            mongo.drop_collection(f'{settings.mongo.archive_bucket}.chunks')
+            collections.drop()
+
+        collections.initialize()
 
         mongo_collection = mongo[source_document_collection_name]
         mongo_collection.create_index('id', unique=True)
+        mongo_collection.create_index('modified_at')
+        mongo[settings.mongo.watermark_collection].create_index('space', unique=True)
+        mongo[settings.mongo.quarantine_collection].create_index('id', unique=True)
+        mongo[f'{settings.mongo.archive_bucket}.files'].create_index([('metadata.id', 1), ('metadata.modified_at', 1)])
 
         qdrant.close()
 
@@ -96,8 +74,9 @@ def dataset_initialize(context: Context, drop: bool) -> None:
 
 
 @click.command(name='dataset:download')
+@click.option('--incremental', is_flag=True, help='Only download documents modified since the last synchronization.')
 @click.pass_context
-def dataset_download(context: Context) -> None:
+def dataset_download(context: Context, incremental: bool) -> None:
     """Retrieves and stores documents into the database."""
     try:
         container = context.obj
@@ -106,7 +85,7 @@ def dataset_download(context: Context) -> None:
         console = Console()
 
         with console.status('[bold yellow]Downloading data from the source...[/bold yellow]', spinner='dots'):
-            data_extraction_use_case()
+            data_extraction_use_case(incremental=incremental)
 
         click.secho(
             f'Documents from the spaces "{", ".join(spaces)}" have been successfully pulled from the source.',
@@ -119,9 +98,69 @@ def dataset_download(context: Context) -> None:
         click.secho('Bye!', fg='white')
 
 
+@click.command(name='dataset:reconvert')
+@click.pass_context
+def dataset_reconvert(context: Context) -> None:
+    """Converts the stored documents again from their archived PDF, without downloading them."""
+    try:
+        container = context.obj
+        data_reconversion_use_case = container.data_reconversion_use_case()
+        console = Console()
+
+        with console.status('[bold yellow]Converting archived documents...[/bold yellow]', spinner='dots'):
+            data_reconversion_use_case()
+
+        click.secho('Archived documents have been successfully converted again.', fg='white')
+    except Exception as error:
+        click.secho(f'Error converting archived documents: {error}', fg='red')
+        return
+    finally:
+        click.secho('Bye!', fg='white')
+
+
+@click.command(name='dataset:quarantine')
+@click.pass_context
+def dataset_quarantine(context: Context) -> None:
+    """Lists the documents skipped because their conversion timed out or crashed."""
+    try:
+        container = context.obj
+        quarantine_repository = container.quarantine_repository()
+        documents = sorted(quarantine_repository.find_all(), key=lambda document: document.quarantined_at)
+    except Exception as error:
+        click.secho(f'Error reading the quarantine: {error}', fg='red')
+        return
+
+    if not documents:
+        click.secho('No documents are quarantined.', fg='white')
+        return
+
+    table = Table(title='\nQuarantined documents')
+    table.add_column('Id', justify='left', style='grey70', no_wrap=True)
+    table.add_column('Title', justify='left')
+    table.add_column('Size', justify='right')
+    table.add_column('Modified', justify='left', no_wrap=True)
+    table.add_column('Quarantined', justify='left', no_wrap=True)
+    table.add_column('Error', justify='left')
+
+    for document in documents:
+        table.add_row(
+            document.id,
+            document.title,
+            f'{document.size / 1024:.1f} KiB',
+            f'{document.modified_at:%Y-%m-%d %H:%M}',
+            f'{document.quarantined_at:%Y-%m-%d %H:%M}',
+            document.error,
+        )
+
+    Console().print(table)
+
+
 @click.command(name='dataset:index')
+@click.option('--full', is_flag=True, help='Index every document, including the ones whose content is already indexed.')
+@click.option('--bulk', is_flag=True, help='Defer the vector index build until every document is written.')
+@click.option('--rebuild', is_flag=True, help='Index every document into a new collection, served once complete.')
 @click.pass_context
-def dataset_index(context: Context) -> None:
+def dataset_index(context: Context, full: bool, bulk: bool, rebuild: bool) -> None:
     """Index and structure documents for RAG context retrieval."""
     try:
         container = context.obj
@@ -129,7 +168,7 @@ def dataset_index(context: Context) -> None:
         console = Console()
 
         with console.status('[bold yellow]Saving documents to Qdrant...[/bold yellow]', spinner='dots'):
-            data_embedding_use_case()
+            data_embedding_use_case(full=full, bulk=bulk, rebuild=rebuild)
 
         click.secho('Documents have been successfully saved to qdrant.', fg='white')
     except Exception as error:
@@ -139,13 +178,139 @@ def dataset_index(context: Context) -> None:
         click.secho('Bye!', fg='white')
 
 
+@click.command(name='dataset:rollback')
+@click.pass_context
+def dataset_rollback(context: Context) -> None:
+    """Serves the collection replaced by the last rebuild again."""
+    try:
+        collections: QdrantCollectionManager = context.obj.qdrant_collections()
+        name = collections.rollback()
+        # The documents indexed once the collection was replaced may be missing from it or stale
+        reset = context.obj.document_repository().unmark_indexed(collections.replaced_at(name))
+
+        click.secho(f'The collection "{name}" is served again.', fg='white')
+        click.secho(
+            f'Run dataset:index to index again the {reset} documents indexed since it was replaced.', fg='yellow'
+        )
+    except Exception as error:
+        click.secho(f'Error rolling back the collection: {error}', fg='red')
+        return
+    finally:
+        click.secho('Bye!', fg='white')
+
+
+@click.command(name='dataset:prune')
+@click.option(
+    '--keep',
+    default=1,
+    type=int,
+    show_default=True,
+    help='Number of replaced collections to keep for rollback.',
+)
+@click.pass_context
+def dataset_prune(context: Context, keep: int) -> None:
+    """Deletes the collections replaced by rebuilds, except the most recent ones."""
+    try:
+        collections: QdrantCollectionManager = context.obj.qdrant_collections()
+        pruned = collections.prune(keep)
+
+        click.secho(f'{len(pruned)} collections have been deleted.', fg='white')
+    except Exception as error:
+        click.secho(f'Error pruning collections: {error}', fg='red')
+        return
+    finally:
+        click.secho('Bye!', fg='white')
+
+
+@click.command(name='dataset:snapshot')
+@click.option(
+    '--archive',
+    required=True,
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=Path),
+    help='Path of the archive file to write.',
+)
+@click.pass_context
+def dataset_snapshot(context: Context, archive: Path) -> None:
+    """Saves the stored documents and the context collection to a single archive file."""
+    try:
+        dataset_snapshot_use_case = context.obj.dataset_snapshot_use_case()
+        console = Console()
+
+        with console.status('[bold yellow]Saving the dataset snapshot...[/bold yellow]', spinner='dots'):
+            dataset_snapshot_use_case(archive)
+
+        click.secho(f'The dataset has been successfully saved to "{archive}".', fg='white')
+    except Exception as error:
+        click.secho(f'Error saving the dataset snapshot: {error}', fg='red')
+        return
+    finally:
+        click.secho('Bye!', fg='white')
+
+
+@click.command(name='dataset:restore')
+@click.option(
+    '--archive',
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path),
+    help='Path of an archive file written by dataset:snapshot.',
+)
+@click.pass_context
+def dataset_restore(context: Context, archive: Path) -> None:
+    """Restores the stored documents and the context collection from an archive file."""
+    try:
+        dataset_restore_use_case = context.obj.dataset_restore_use_case()
+        console = Console()
+
+        with console.status('[bold yellow]Restoring the dataset snapshot...[/bold yellow]', spinner='dots'):
+            dataset_restore_use_case(archive)
+
+        click.secho(f'The dataset has been successfully restored from "{archive}".', fg='white')
+    except Exception as error:
+        click.secho(f'Error restoring the dataset snapshot: {error}', fg='red')
+        return
+    finally:
+        click.secho('Bye!', fg='white')
+
+
+@click.command(name='dataset:stats')
+@click.pass_context
+def dataset_stats(context: Context) -> None:
+    """Reports the estimated RAM resident and on-disk storage of the context collection."""
+    try:
+        container = context.obj
+        usages = cast(list[StorageUsage], container.storage_inspector().inspect())
+    except Exception as error:
+        click.secho(f'Error reading collection stats: {error}', fg='red')
+        return
+
+    table = Table(title=f'\nStorage of {container.settings().qdrant.context_collection}', width=70)
+    table.add_column('Component', justify='left', style='grey70', no_wrap=True)
+    table.add_column('Resident', justify='right')
+    table.add_column('On disk', justify='right')
+    for usage in usages:
+        table.add_row(
+            usage.component, Number.humanize_bytes(usage.resident_bytes), Number.humanize_bytes(usage.on_disk_bytes)
+        )
+    table.add_section()
+    table.add_row(
+        'Total',
+        Number.humanize_bytes(sum(usage.resident_bytes for usage in usages)),
+        Number.humanize_bytes(sum(usage.on_disk_bytes for usage in usages)),
+    )
+
+    Console().print(table)
+
+
 @click.command(name='chat')
 @click.option('--evidence', is_flag=True, help='Shows evidence information from the documentation on every answer.')
+@click.option('--space', 'spaces', multiple=True, help='Only answer from the documents of this space, repeatable.')
+@click.option('--since', type=click.DateTime(), help='Only answer from the documents modified after this date.')
 @click.pass_context
-def chat(context: Context, evidence: bool) -> None:
+def chat(context: Context, evidence: bool, spaces: tuple[str, ...], since: datetime | None) -> None:
     """Interactive Q&A RAG to answer questions based on documentation."""
     container = context.obj
     inference_use_case = container.inference_use_case()
+    context_filter = ContextFilter(spaces=spaces, modified_after=since) if spaces or since else None
     click.secho('Welcome to Revelations! Ask questions about the documentation or type "exit" to quit.', fg='white')
     console = Console(highlight=False)
 
@@ -161,7 +326,7 @@ def chat(context: Context, evidence: bool) -> None:
             if not question:
                 continue
 
-            response = inference_use_case(question)
+            response = inference_use_case(question, context_filter)
             answer_buffer = '\n' + style('🤖 ECHO: ', bold=True, fg='yellow')
 
             with Live(console=console, screen=False, refresh_per_second=10) as live:
@@ -211,12 +376,21 @@ def chat(context: Context, evidence: bool) -> None:
     show_default=True,
     help='Number of documents to retrieve from the database.',
 )
+@click.option(
+    '--quantization',
+    is_flag=True,
+    help='Compare the retrieval over the quantized vectors with the retrieval over the original vectors.',
+)
 @click.pass_context
-def benchmark(context: Context, dataset: Path, cutoff: int, limit: int) -> None:
+def benchmark(context: Context, dataset: Path, cutoff: int, limit: int, quantization: bool) -> None:
     """Benchmarks the full retrieval flow to measure how well the current RAG setup performs."""
     console = Console()
     container = context.obj
 
+    if quantization:
+        benchmark_quantization(console, container, dataset, limit)
+        return
+
     try:
         with console.status('[bold yellow]Running benchmark...[/bold yellow]', spinner='dots'):
             benchmark_use_case = container.benchmark_use_case()
@@ -249,3 +423,25 @@ def benchmark(context: Context, dataset: Path, cutoff: int, limit: int) -> None:
 
     console.print(table_restrieval)
     console.print(table_fidelity)
+
+
+def benchmark_quantization(console: Console, container: Any, dataset: Path, limit: int) -> None:
+    """Prints the recall and latency of the retrieval over the quantized vectors against the original vectors."""
+    try:
+        with console.status('[bold yellow]Running quantization benchmark...[/bold yellow]', spinner='dots'):
+            quantization_benchmark_use_case = container.quantization_benchmark_use_case()
+            loader = JsonBenchmarkLoader(dataset)
+            benchmark_cases = list(loader.load())
+            score = cast(QuantizationScore, quantization_benchmark_use_case(benchmark_cases, limit))
+    except Exception as error:
+        click.secho(f'Error running benchmark: {error}', fg='red')
+        return
+
+    table = Table(title='\nQuantization metrics', width=50)
+    table.add_column('Metric', justify='left', style='grey70', no_wrap=True)
+    table.add_column('Score', justify='right')
+    table.add_row('Recall', Number.prettify(score.recall, Number.Scale.ZERO_ONE))
+    table.add_row('Quantized latency (ms)', f'{score.quantized_latency_ms:.1f}')
+    table.add_row('Original latency (ms)', f'{score.original_latency_ms:.1f}')
+
+    console.print(table)
@@ -17,6 +17,17 @@ class Number:
         color = Number._color_from_score(score)
         return f'[{color}]{rounded_value}'
 
+    @staticmethod
+    def humanize_bytes(value: int) -> str:
+        """Format a number of bytes with the largest binary unit keeping it at least one."""
+        size = float(value)
+        for unit in ('B', 'KiB', 'MiB', 'GiB'):
+            if size < 1024:
+                return f'{value} B' if unit == 'B' else f'{size:.1f} {unit}'
+            size /= 1024
+
+        return f'{size:.1f} TiB'
+
     @staticmethod
     def _normalize(value: float | int, scale: 'Number.Scale') -> float:
         """Normalize a value to a 0–1 score based on its scale."""
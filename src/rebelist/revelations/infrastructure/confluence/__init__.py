@@ -1,3 +1,4 @@
 from rebelist.revelations.infrastructure.confluence.adapters import ConfluenceGateway
+from rebelist.revelations.infrastructure.confluence.limiters import AdaptiveRateLimiter, RateLimitedSession
 
-__all__ = ['ConfluenceGateway']
+__all__ = ['ConfluenceGateway', 'AdaptiveRateLimiter', 'RateLimitedSession']
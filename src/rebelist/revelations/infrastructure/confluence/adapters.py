@@ -1,13 +1,11 @@
-import time
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
-from itertools import batched
-from typing import Any, Generator, TypeAlias, Union, cast
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from datetime import UTC, datetime, timedelta
+from typing import Any, Final, Generator, Iterable, TypeAlias, cast
 
 from atlassian import Confluence
 
 from rebelist.revelations.config.settings import ConfluenceSettings
-from rebelist.revelations.domain import ContentProviderPort
+from rebelist.revelations.domain import ContentProviderPort, SourceFormat, SyncCheckpoint
 from rebelist.revelations.domain.services import LoggerPort
 
 Documents: TypeAlias = list[dict[str, Any]]
@@ -17,50 +15,139 @@ Document: TypeAlias = dict[str, Any]
 class ConfluenceGateway(ContentProviderPort):
     """Confluence api gateway."""
 
+    SEARCH_LIMIT: Final[int] = 100
+
     def __init__(self, client: Confluence, settings: ConfluenceSettings, logger: LoggerPort):
         self.__client = client
         self.__settings = settings
         self.__logger = logger
 
-    def fetch(self) -> Generator[dict[str, Any], None, None]:
-        """Finds content pages from confluence spaces."""
-        for space in self.__settings.spaces:
-            yield from self.__fetch_from_space(space)
-
-    def __fetch_from_space(self, space: str) -> Generator[dict[str, Any], None, None]:
-        """Finds content pages from a confluence space using concurrent processing."""
-        documents = cast(
-            Documents,
-            self.__client.get_all_pages_from_space_as_generator(
-                space,
-                expand='body.export_view,history.lastUpdated',
-                status='current',
-            ),
-        )
-
-        batches = batched(documents, self.__settings.batch_size, strict=False)
-
-        for batch in batches:
-            with ThreadPoolExecutor(max_workers=self.__settings.max_workers) as executor:
-                results = executor.map(self.__process_page, batch)
-
-                for result in results:
-                    match result:
-                        case dict() as page:
-                            yield page
-                        case None:
-                            continue
-
-    def __process_page(self, document: dict[str, Any]) -> Union[dict[str, Any], None]:
-        """Worker method running in a separate thread."""
+    def fetch(self, checkpoint: SyncCheckpoint | None = None) -> Generator[dict[str, Any], None, None]:
+        """Finds content pages from confluence spaces.
+
+        Pages from all spaces are streamed into a single bounded pool of workers and yielded as soon as each one is
+        exported, so a slow export never holds back the pages queued after it.
+
+        When a checkpoint is given, pages that are not newer than their stored version are skipped before their PDF
+        is exported, and spaces with a watermark are queried for the pages modified since then only.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.__settings.max_workers)
+        pending: set[Future[Document]] = set()
+
+        try:
+            for space in self.__settings.spaces:
+                for document in self.__list_from_space(space, checkpoint):
+                    # Bounds the pages queued ahead of the workers
+                    if len(pending) >= self.__settings.batch_size:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        yield from self.__collect(done)
+
+                    pending.add(executor.submit(self.__process_page, document, space))
+
+            for future in as_completed(pending):
+                yield from self.__collect({future})
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __list_from_space(self, space: str, checkpoint: SyncCheckpoint | None = None) -> Iterable[Document]:
+        """Lists the content pages of a confluence space."""
+        watermark = checkpoint.watermarks.get(space) if checkpoint is not None else None
+
+        if watermark is not None and self.__settings.delta_query:
+            documents: Iterable[Document] = self.__search_modified_since(space, watermark)
+        else:
+            documents = cast(
+                Documents,
+                self.__client.get_all_pages_from_space_as_generator(
+                    space,
+                    expand='body.export_view,history.lastUpdated',
+                    status='current',
+                ),
+            )
+
+        if checkpoint is not None:
+            documents = self.__skip_unchanged(space, documents, checkpoint)
+
+        return documents
+
+    def __collect(self, futures: Iterable[Future[Document]]) -> Generator[dict[str, Any], None, None]:
+        """Yields the pages of the finished workers, or the failures of the pages that could not be processed."""
+        for future in futures:
+            yield future.result()
+
+    def __search_modified_since(self, space: str, watermark: datetime) -> Generator[Document, None, None]:
+        """Finds the pages of a confluence space modified after the watermark using a CQL search."""
+        # CQL dates have minute precision and are read in the user timezone, the overlap is filtered by page version
+        since = (watermark - timedelta(hours=self.__settings.delta_overlap_hours)).astimezone(UTC)
+        query = f'space = "{space}" and type = page and lastmodified > "{since:%Y-%m-%d %H:%M}"'
+        expand = 'content.history.lastUpdated'
+        if space in self.__settings.html_spaces:
+            expand += ',content.body.export_view'
+
+        start = 0
+
+        while True:
+            response = cast(
+                dict[str, Any],
+                self.__client.cql(
+                    query,
+                    start=start,
+                    limit=ConfluenceGateway.SEARCH_LIMIT,
+                    expand=expand,
+                    excerpt='none',
+                ),
+            )
+            results = cast(Documents, response.get('results', []))
+
+            for result in results:
+                yield result['content']
+
+            if not results or 'next' not in response.get('_links', {}):
+                break
+
+            start += len(results)
+
+    def __skip_unchanged(
+        self, space: str, documents: Iterable[Document], checkpoint: SyncCheckpoint
+    ) -> Generator[Document, None, None]:
+        """Filters out the pages whose last modification is already stored."""
+        skipped = 0
+        for document in documents:
+            try:
+                modified_at = datetime.fromisoformat(document['history']['lastUpdated']['when'])
+            except (KeyError, TypeError, ValueError):
+                # Malformed pages are passed through so the failure is reported while processing them
+                yield document
+                continue
+
+            if checkpoint.is_outdated(document['id'], modified_at):
+                yield document
+            else:
+                skipped += 1
+
+        self.__logger.info(f'Skipped {skipped} unchanged pages. [space={space}]')
+
+    def __process_page(self, document: dict[str, Any], space: str) -> dict[str, Any]:
+        """Worker method running in a separate thread.
+
+        Failures are returned as an item holding the page id, its space and the error, so the caller keeps the
+        watermark of the space and the page is fetched again on the next run.
+        """
         try:
-            time.sleep(self.__settings.throttle_delay_seconds)
-            content_bytes = self.__client.get_page_as_pdf(document['id'])
+            if space in self.__settings.html_spaces:
+                # The export view HTML comes with the listing, so the page is not rendered as PDF
+                source_format = SourceFormat.HTML
+                content: bytes | str = document['body']['export_view']['value']
+            else:
+                source_format = SourceFormat.PDF
+                content = self.__client.get_page_as_pdf(document['id'])
 
             return {
                 'id': document['id'],
                 'title': document['title'],
-                'content': content_bytes,
+                'space': space,
+                'format': source_format,
+                'content': content,
                 'raw': document,
                 'modified_at': datetime.fromisoformat(document['history']['lastUpdated']['when']),
                 'url': self.__client.url + document['_links']['tinyui'],
@@ -68,4 +155,4 @@ class ConfluenceGateway(ContentProviderPort):
 
         except Exception as error:
             self.__logger.error(f'Processing document failed [id={document.get("id")}] - {error}')
-            return None
+            return {'id': document.get('id'), 'space': space, 'error': str(error)}
@@ -0,0 +1,150 @@
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Any, Final, Mapping
+
+from requests import Response, Session
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by all the workers that adapts its rate to the server feedback.
+
+    The rate grows additively on every successful response and is cut multiplicatively whenever the server reports it
+    is overloaded (AIMD). A `Retry-After` header pauses every worker until the given time has elapsed.
+    """
+
+    RATE_INCREASE: Final[float] = 0.1
+    RATE_DECREASE: Final[float] = 0.5
+    OVERLOAD_STATUS_CODES: Final[frozenset[int]] = frozenset({429, 503})
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError(f'Rate limits must satisfy 0 < min ≤ rate ≤ max, got {min_rate}, {rate}, {max_rate}')
+
+        self.__rate = rate
+        self.__min_rate = min_rate
+        self.__max_rate = max_rate
+        self.__tokens = 1.0
+        self.__updated_at = time.monotonic()
+        self.__blocked_until = 0.0
+        self.__lock = Lock()
+
+    @property
+    def rate(self) -> float:
+        """Current number of requests allowed per second."""
+        return self.__rate
+
+    def acquire(self) -> None:
+        """Blocks until the caller is allowed to send a request."""
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__refill(now)
+
+                if now >= self.__blocked_until and self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+
+                delay = max(self.__blocked_until - now, (1 - self.__tokens) / self.__rate)
+
+            time.sleep(delay)
+
+    def observe(self, response: Response) -> None:
+        """Adjusts the rate from the status and rate limit headers of a response."""
+        headers = response.headers
+
+        with self.__lock:
+            now = time.monotonic()
+            self.__refill(now)
+
+            retry_after = self.__parse_retry_after(headers)
+            if retry_after is not None:
+                self.__blocked_until = max(self.__blocked_until, now + retry_after)
+
+            overloaded = (
+                response.status_code in AdaptiveRateLimiter.OVERLOAD_STATUS_CODES
+                or headers.get('X-RateLimit-NearLimit', '').lower() == 'true'
+                or headers.get('X-RateLimit-Remaining') == '0'
+            )
+
+            if overloaded:
+                self.__rate = max(self.__min_rate, self.__rate * AdaptiveRateLimiter.RATE_DECREASE)
+                self.__tokens = min(self.__tokens, 0.0)
+            elif response.ok:
+                self.__rate = min(self.__max_rate, self.__rate + AdaptiveRateLimiter.RATE_INCREASE)
+
+            advertised_rate = self.__parse_advertised_rate(headers)
+            if advertised_rate is not None:
+                self.__rate = max(self.__min_rate, min(self.__rate, advertised_rate))
+
+    def __refill(self, now: float) -> None:
+        """Adds the tokens earned since the last update, up to one second of burst."""
+        capacity = max(1.0, self.__rate)
+        self.__tokens = min(capacity, self.__tokens + (now - self.__updated_at) * self.__rate)
+        self.__updated_at = now
+
+    @staticmethod
+    def __parse_retry_after(headers: Mapping[str, str]) -> float | None:
+        """Reads the `Retry-After` header, given either in seconds or as an HTTP date."""
+        value = headers.get('Retry-After')
+        if value is None:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def __parse_advertised_rate(headers: Mapping[str, str]) -> float | None:
+        """Reads the sustainable rate advertised by the `X-RateLimit-FillRate` and interval headers."""
+        try:
+            fill_rate = float(headers['X-RateLimit-FillRate'])
+            interval = float(headers.get('X-RateLimit-Interval-Seconds', 1))
+        except (KeyError, ValueError):
+            return None
+
+        return fill_rate / interval if interval > 0 else None
+
+
+class RateLimitedSession(Session):
+    """HTTP session that paces every request through a shared rate limiter and retries overloaded requests.
+
+    The limiter slows every worker down on overload responses. Other server errors are retried by the failing worker
+    alone, after an exponential backoff.
+    """
+
+    # A request too large for the server (413) would never fit on retry, so it is not retried
+    RETRY_STATUS_CODES: Final[frozenset[int]] = frozenset({429, 500, 502, 503, 504})
+    BACKOFF_SECONDS: Final[float] = 1.0
+    MAX_BACKOFF_SECONDS: Final[float] = 30.0
+
+    def __init__(self, limiter: AdaptiveRateLimiter, max_retries: int):
+        super().__init__()
+        self.__limiter = limiter
+        self.__max_retries = max_retries
+
+    def request(self, method: str | bytes, url: str | bytes, *args: Any, **kwargs: Any) -> Response:
+        """Sends a request once the limiter allows it, retrying while the server is overloaded."""
+        attempt = 0
+
+        while True:
+            self.__limiter.acquire()
+            response = super().request(method, url, *args, **kwargs)
+            self.__limiter.observe(response)
+
+            if response.status_code not in RateLimitedSession.RETRY_STATUS_CODES or attempt >= self.__max_retries:
+                return response
+
+            attempt += 1
+            response.close()
+
+            if response.status_code not in AdaptiveRateLimiter.OVERLOAD_STATUS_CODES:
+                backoff = RateLimitedSession.BACKOFF_SECONDS * 2 ** (attempt - 1)
+                time.sleep(min(backoff, RateLimitedSession.MAX_BACKOFF_SECONDS))
@@ -1,23 +1,110 @@
+import hashlib
 import io
+import multiprocessing
+import resource
+import time
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import count
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import SimpleQueue
+from typing import Callable, Final, Iterable, Iterator
 
-from docling.document_converter import DocumentConverter
+import pypdfium2 as pdfium
+from docling.datamodel.accelerator_options import AcceleratorOptions
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.document import ConversionResult
+from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, TableStructureOptions
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling_core.types.doc.document import DoclingDocument
 from docling_core.types.io import DocumentStream
 
-from rebelist.revelations.domain.exceptions import DocumentConverterError
-from rebelist.revelations.domain.services import PdfConverterPort
+from rebelist.revelations.config.settings import DoclingSettings
+from rebelist.revelations.domain.exceptions import DocumentConversionAbortedError, DocumentConverterError
+from rebelist.revelations.domain.services import HtmlConverterPort, PdfConverterPort
+from rebelist.revelations.infrastructure.sqlite import SqliteCache
 
 
 class PdfConverter(PdfConverterPort):
-    """PDF to Markdown converter."""
+    """PDF to Markdown converter.
 
-    def __init__(self, converter: DocumentConverter):
+    When a fallback converter is given, the pages whose Markdown has fewer than `min_page_chars` characters are
+    converted again with it, so the expensive models only run on the pages that need them.
+    """
+
+    def __init__(
+        self, converter: DocumentConverter, fallback: DocumentConverter | None = None, min_page_chars: int = 0
+    ):
         self.__converter = converter
+        self.__fallback = fallback
+        self.__min_page_chars = min_page_chars
 
     def pdf_to_markdown(self, data: bytes) -> str:
         """Converts the raw binary content of a PDF document into a standardized Markdown formatted string."""
         try:
-            stream = io.BytesIO(data)
-            doc_stream = DocumentStream(name='Tmp', stream=stream)
+            document = self.__convert(self.__converter, data).document
+
+            if self.__fallback is None or self.__min_page_chars <= 0:
+                markdown = document.export_to_markdown()
+            else:
+                markdown = self.__export_with_fallback(self.__fallback, data, document)
+
+            return markdown.strip()
+
+        except Exception as error:
+            raise DocumentConverterError(f'Failed to convert PDF to Markdown: {error}') from error
+
+    def __export_with_fallback(self, fallback: DocumentConverter, data: bytes, document: DoclingDocument) -> str:
+        """Exports the document, replacing the pages that look empty with their conversion by the fallback."""
+        pages = {page_no: document.export_to_markdown(page_no=page_no).strip() for page_no in sorted(document.pages)}
+        empty_pages = [page_no for page_no, markdown in pages.items() if len(markdown) < self.__min_page_chars]
+
+        if not empty_pages:
+            return document.export_to_markdown()
+
+        for first, last in self.__group_consecutive(empty_pages):
+            fallback_document = self.__convert(fallback, data, page_range=(first, last)).document
+            for page_no in range(first, last + 1):
+                pages[page_no] = fallback_document.export_to_markdown(page_no=page_no).strip()
+
+        return '\n\n'.join(markdown for markdown in pages.values() if markdown)
+
+    @staticmethod
+    def __convert(
+        converter: DocumentConverter, data: bytes, page_range: tuple[int, int] | None = None
+    ) -> ConversionResult:
+        """Runs the docling converter on the PDF content, optionally restricted to a range of pages."""
+        doc_stream = DocumentStream(name='Tmp', stream=io.BytesIO(data))
+        if page_range is None:
+            return converter.convert(doc_stream)
+
+        return converter.convert(doc_stream, page_range=page_range)
+
+    @staticmethod
+    def __group_consecutive(page_numbers: list[int]) -> Iterator[tuple[int, int]]:
+        """Groups sorted page numbers into ranges of consecutive pages."""
+        first = last = page_numbers[0]
+
+        for page_no in page_numbers[1:]:
+            if page_no != last + 1:
+                yield first, last
+                first = page_no
+            last = page_no
+
+        yield first, last
+
+
+class HtmlConverter(HtmlConverterPort):
+    """HTML to Markdown converter."""
+
+    def __init__(self, converter: DocumentConverter):
+        self.__converter = converter
+
+    def html_to_markdown(self, data: str) -> str:
+        """Converts an HTML document into a standardized Markdown formatted string."""
+        try:
+            stream = io.BytesIO(data.encode('utf-8'))
+            doc_stream = DocumentStream(name='Tmp.html', stream=stream)
             result = self.__converter.convert(doc_stream)
 
             markdown = result.document.export_to_markdown()
@@ -25,4 +112,407 @@ class PdfConverter(PdfConverterPort):
             return markdown.strip()
 
         except Exception as error:
-            raise DocumentConverterError(f'Failed to convert PDF to Markdown: {error}') from error
+            raise DocumentConverterError(f'Failed to convert HTML to Markdown: {error}') from error
+
+
+def create_docling_converter(ocr: bool, table_mode: str, num_threads: int) -> DocumentConverter:
+    """Creates a docling converter for PDF documents with the given pipeline options."""
+    options = PdfPipelineOptions(
+        do_ocr=ocr,
+        generate_page_images=False,
+        generate_picture_images=False,
+        table_structure_options=TableStructureOptions(mode=TableFormerMode(table_mode)),
+        accelerator_options=AcceleratorOptions(num_threads=num_threads),
+    )
+
+    return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=options)})
+
+
+def create_pdf_converter(settings: DoclingSettings) -> PdfConverterPort:
+    """Creates a PDF converter backed by its own docling converters, following the configured profile."""
+    accurate = create_docling_converter(settings.accurate_ocr, settings.accurate_table_mode, settings.num_threads)
+
+    if settings.profile == 'accurate':
+        converter: PdfConverterPort = PdfConverter(accurate)
+    else:
+        fast = create_docling_converter(settings.fast_ocr, settings.fast_table_mode, settings.num_threads)
+        converter = PdfConverter(fast, accurate, settings.fallback_min_chars)
+
+    return converter
+
+
+def split_pdf(data: bytes, threshold_pages: int, pages_per_part: int) -> list[bytes]:
+    """Splits a PDF document with more than `threshold_pages` pages into documents of `pages_per_part` pages.
+
+    Documents that are small enough, or that cannot be read, are returned whole.
+    """
+    if threshold_pages <= 0 or pages_per_part <= 0:
+        return [data]
+
+    try:
+        document = pdfium.PdfDocument(data)
+    except pdfium.PdfiumError:
+        return [data]
+
+    try:
+        page_count = len(document)
+        if page_count <= threshold_pages:
+            return [data]
+
+        parts: list[bytes] = []
+        for first in range(0, page_count, pages_per_part):
+            part = pdfium.PdfDocument.new()
+            try:
+                part.import_pages(document, list(range(first, min(first + pages_per_part, page_count))))
+                buffer = io.BytesIO()
+                part.save(buffer)
+                parts.append(buffer.getvalue())
+            finally:
+                part.close()
+
+        return parts
+
+    finally:
+        document.close()
+
+
+# Converter owned by each worker process of the pool, and queue on which it reports the parts it starts
+_worker_converter: PdfConverterPort | None = None
+_worker_started: SimpleQueue[int] | None = None
+
+# Reported instead of a part when a worker fails to create its converter
+_INITIALIZER_FAILED: Final[int] = -1
+
+
+def _initialize_worker(
+    factory: Callable[[], PdfConverterPort], memory_limit_mb: int = 0, started: SimpleQueue[int] | None = None
+) -> None:
+    """Creates the converter of the current worker process, capping its memory when a limit is given.
+
+    A failure is reported on the queue before being raised, so the pool does not blame the documents it was given.
+    """
+    global _worker_converter, _worker_started
+
+    try:
+        if memory_limit_mb > 0:
+            # Exceeding the cap raises a MemoryError in the worker instead of getting the host OOM killed
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+        _worker_converter = factory()
+
+    except Exception:
+        if started is not None:
+            started.put(_INITIALIZER_FAILED)
+        raise
+
+    _worker_started = started
+
+
+def _convert_in_worker(data: bytes, token: int | None = None) -> str:
+    """Converts a PDF document with the converter of the current worker process."""
+    if _worker_converter is None:
+        raise DocumentConverterError('The worker converter has not been initialized.')
+
+    if token is not None and _worker_started is not None:
+        _worker_started.put(token)
+
+    return _worker_converter.pdf_to_markdown(data)
+
+
+@dataclass(slots=True)
+class _Conversion[K]:
+    """Progress of a document whose parts are converted by the pool."""
+
+    key: K
+    parts: list[str]
+    remaining: int
+    error: Exception | None = None
+
+
+@dataclass(eq=False, slots=True)
+class _Part[K]:
+    """Part of a document submitted to the pool."""
+
+    conversion: _Conversion[K]
+    index: int
+    data: bytes
+    token: int = 0
+    attempts: int = 0
+    started_at: float | None = None
+
+
+class _PoolRun[K]:
+    """Conversions running on a pool of worker processes that is killed and replaced when a worker hangs or crashes.
+
+    Workers report every part they start, so the timeout only runs from the actual start of a part. Parts running
+    past the timeout are failed. Parts running when a worker crashes are retried once, since the pool cannot tell
+    which of them caused the crash. When no part was running, or a worker could not create its converter, the pool
+    itself is broken, so the pending parts fail with a plain `DocumentConverterError` instead of being aborted.
+    """
+
+    POLL_INTERVAL: Final[float] = 0.1
+    CRASH_ATTEMPTS: Final[int] = 2
+
+    def __init__(self, create_executor: Callable[[SimpleQueue[int]], ProcessPoolExecutor], timeout_seconds: float):
+        self.__create_executor = create_executor
+        self.__timeout_seconds = timeout_seconds
+        self.__tokens = count()
+        self.__pending: dict[Future[str], _Part[K]] = {}
+        self.__converted = False
+        self.__initializer_failed = False
+        self.__started, self.__executor = self.__start_pool()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of parts submitted to the pool and not yet collected."""
+        return len(self.__pending)
+
+    def submit(self, part: _Part[K]) -> None:
+        """Submits a part to the workers."""
+        part.token = next(self.__tokens)
+        part.started_at = None
+        self.__pending[self.__executor.submit(_convert_in_worker, part.data, part.token)] = part
+
+    def collect(self) -> Iterator[tuple[K, str | Exception]]:
+        """Waits a little for parts to finish and yields the documents whose parts are all finished."""
+        done, _ = wait(self.__pending, timeout=_PoolRun.POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        self.__track_started()
+        crashed = False
+
+        for future in done:
+            if self.__is_interrupted(future):
+                crashed = True
+                continue
+
+            yield from self.__finish(self.__pending.pop(future), self.__result(future))
+
+        if crashed:
+            yield from self.__recover_from_crash()
+            return
+
+        if self.__timeout_seconds > 0:
+            now = time.monotonic()
+            overdue = [
+                part
+                for part in self.__pending.values()
+                if part.started_at is not None and now - part.started_at >= self.__timeout_seconds
+            ]
+            if overdue:
+                error = DocumentConversionAbortedError(f'Conversion timed out after {self.__timeout_seconds} seconds.')
+                yield from self.__restart(overdue, error)
+
+    def close(self) -> None:
+        """Shuts the pool down, killing the workers if conversions are still running."""
+        if self.__pending:
+            self.__terminate()
+        else:
+            self.__executor.shutdown(wait=True)
+
+        self.__started.close()
+
+    def __start_pool(self) -> tuple[SimpleQueue[int], ProcessPoolExecutor]:
+        """Creates a pool of workers along with the queue on which they report the parts they start."""
+        # Every pool gets its own queue, since a worker killed while writing may leave the queue locked
+        started: SimpleQueue[int] = multiprocessing.get_context('spawn').SimpleQueue()
+        self.__initializer_failed = False
+        return started, self.__create_executor(started)
+
+    def __track_started(self) -> None:
+        """Records the start time of the parts reported by the workers since the last check."""
+        now = time.monotonic()
+        parts = {part.token: part for part in self.__pending.values()}
+
+        while not self.__started.empty():
+            token = self.__started.get()
+            if token == _INITIALIZER_FAILED:
+                self.__initializer_failed = True
+                continue
+
+            part = parts.get(token)
+            if part is not None and part.started_at is None:
+                part.started_at = now
+
+    def __recover_from_crash(self) -> Iterator[tuple[K, str | Exception]]:
+        """Restarts the pool after a worker crash, failing the parts that already crashed it before."""
+        suspects = [part for part in self.__pending.values() if part.started_at is not None]
+
+        if self.__initializer_failed or not suspects:
+            # Workers that cannot start would fail any document, so none of them is aborted
+            error = DocumentConverterError('The conversion workers could not start.')
+            yield from self.__restart(list(self.__pending.values()), error)
+            return
+
+        for part in suspects:
+            part.attempts += 1
+
+        blamed = [part for part in self.__pending.values() if part.attempts >= _PoolRun.CRASH_ATTEMPTS]
+        yield from self.__restart(blamed, DocumentConversionAbortedError('The conversion worker crashed.'))
+
+    def __restart(self, blamed: list[_Part[K]], error: Exception) -> Iterator[tuple[K, str | Exception]]:
+        """Kills the workers, fails the blamed parts and resubmits the other unfinished parts to a new pool."""
+        self.__terminate()
+        self.__started.close()
+        pending, self.__pending = self.__pending, {}
+        self.__started, self.__executor = self.__start_pool()
+
+        for future, part in pending.items():
+            if part in blamed:
+                yield from self.__finish(part, error)
+            elif self.__is_interrupted(future):
+                self.submit(part)
+            else:
+                yield from self.__finish(part, self.__result(future))
+
+    def __terminate(self) -> None:
+        """Kills the worker processes and shuts the pool down."""
+        # ProcessPoolExecutor has no public way of killing its workers before Python 3.14
+        processes: dict[int, BaseProcess] = getattr(self.__executor, '_processes', None) or {}
+        for process in list(processes.values()):
+            process.kill()
+
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def __is_interrupted(future: Future[str]) -> bool:
+        """Checks whether the future was cancelled or broken by the loss of its pool, rather than converted."""
+        return future.cancelled() or (future.done() and isinstance(future.exception(), BrokenExecutor))
+
+    def __result(self, future: Future[str]) -> str | Exception:
+        """Reads the Markdown of a finished part, or its error."""
+        try:
+            markdown = future.result()
+        except DocumentConverterError as error:
+            return error
+        except MemoryError as error:
+            if not self.__converted:
+                # Until a conversion succeeds, the memory limit may be too low for any document
+                return DocumentConverterError(f'Conversion worker ran out of memory: {error}')
+            return DocumentConversionAbortedError(f'Conversion worker ran out of memory: {error}')
+        except Exception as error:
+            return DocumentConverterError(f'Conversion worker failed: {error}')
+
+        self.__converted = True
+        return markdown
+
+    @staticmethod
+    def __finish(part: _Part[K], result: str | Exception) -> Iterator[tuple[K, str | Exception]]:
+        """Records the result of a part, yielding its document once all of its parts are finished."""
+        conversion = part.conversion
+        conversion.remaining -= 1
+
+        if isinstance(result, Exception):
+            conversion.error = result
+        else:
+            conversion.parts[part.index] = result
+
+        if conversion.remaining > 0:
+            return
+
+        if conversion.error is not None:
+            yield conversion.key, conversion.error
+        else:
+            yield conversion.key, '\n\n'.join(markdown for markdown in conversion.parts if markdown)
+
+
+class ProcessPoolPdfConverter(PdfConverterPort):
+    """PDF to Markdown converter that spreads the conversions over a pool of worker processes.
+
+    Every worker process builds its own converter with the given factory, which must be picklable. Documents with
+    more than `split_threshold_pages` pages are split into parts of `split_pages` pages that are converted in
+    parallel and stitched back in order. Parts running longer than `timeout_seconds` or crashing their worker fail
+    with a `DocumentConversionAbortedError`.
+
+    When a cache is given, the Markdown of the documents is cached by the SHA-256 of their whole content and of the
+    fingerprint of the conversion settings, before they are split, since the parts of a document differ on every split.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], PdfConverterPort],
+        workers: int,
+        max_in_flight: int,
+        split_threshold_pages: int = 0,
+        split_pages: int = 0,
+        memory_limit_mb: int = 0,
+        timeout_seconds: float = 0,
+        cache: SqliteCache | None = None,
+        cache_fingerprint: str = '',
+    ):
+        self.__factory = factory
+        self.__workers = workers
+        self.__max_in_flight = max(max_in_flight, workers)
+        self.__split_threshold_pages = split_threshold_pages
+        self.__split_pages = split_pages
+        self.__memory_limit_mb = memory_limit_mb
+        self.__timeout_seconds = timeout_seconds
+        self.__cache = cache
+        self.__cache_fingerprint = hashlib.sha256(cache_fingerprint.encode('utf-8')).hexdigest()
+
+    def pdf_to_markdown(self, data: bytes) -> str:
+        """Converts the raw binary content of a PDF document into a standardized Markdown formatted string."""
+        for _, markdown in self.pdf_to_markdown_many([(None, data)]):
+            if isinstance(markdown, Exception):
+                raise markdown
+            return markdown
+
+        raise DocumentConverterError('The conversion did not produce any result.')
+
+    def pdf_to_markdown_many[K](self, items: Iterable[tuple[K, bytes]]) -> Iterator[tuple[K, str | Exception]]:
+        """Converts many PDF documents in parallel, yielding each key with its Markdown as soon as it is ready.
+
+        Items are consumed lazily, with at most `max_in_flight` documents or parts submitted to the workers at a time.
+        Cached documents are yielded without reaching the workers.
+        """
+        # Conversions are keyed by the item key along with its cache key, to cache their Markdown once finished
+        run: _PoolRun[tuple[K, str]] = _PoolRun(self.__create_executor, self.__timeout_seconds)
+
+        try:
+            for key, data in items:
+                cache_key = self.__cache_key(data)
+                cached = self.__cache.get(cache_key) if self.__cache is not None else None
+                if cached is not None:
+                    yield key, cached.decode('utf-8')
+                    continue
+
+                parts = split_pdf(data, self.__split_threshold_pages, self.__split_pages)
+                conversion = _Conversion((key, cache_key), [''] * len(parts), len(parts))
+
+                for index, part in enumerate(parts):
+                    while run.in_flight >= self.__max_in_flight:
+                        yield from self.__save_cached(run.collect())
+
+                    run.submit(_Part(conversion, index, part))
+
+            while run.in_flight:
+                yield from self.__save_cached(run.collect())
+
+        finally:
+            run.close()
+
+    def __cache_key(self, data: bytes) -> str:
+        """Builds the cache key of the Markdown of a whole PDF document."""
+        if self.__cache is None:
+            return ''
+
+        return f'{hashlib.sha256(data).hexdigest()}:{self.__cache_fingerprint}'
+
+    def __save_cached[K](
+        self, results: Iterable[tuple[tuple[K, str], str | Exception]]
+    ) -> Iterator[tuple[K, str | Exception]]:
+        """Caches the Markdown of the finished documents, never their errors, and yields them by item key."""
+        for (key, cache_key), markdown in results:
+            if self.__cache is not None and not isinstance(markdown, Exception):
+                self.__cache.set(cache_key, markdown.encode('utf-8'))
+
+            yield key, markdown
+
+    def __create_executor(self, started: SimpleQueue[int]) -> ProcessPoolExecutor:
+        """Creates a pool of worker processes reporting the parts they start on the given queue."""
+        # Spawned workers do not inherit the threads and locks of the parent process
+        return ProcessPoolExecutor(
+            max_workers=self.__workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_initialize_worker,
+            initargs=(self.__factory, self.__memory_limit_mb, started),
+        )
@@ -1,3 +1,17 @@
-from rebelist.revelations.infrastructure.mongo.repositories import MongoDocumentRepository
+from rebelist.revelations.infrastructure.mongo.codecs import DocumentCodec
+from rebelist.revelations.infrastructure.mongo.repositories import (
+    GridFsSourceArchiveRepository,
+    MongoDocumentRepository,
+    MongoQuarantineRepository,
+    MongoWatermarkRepository,
+)
+from rebelist.revelations.infrastructure.mongo.snapshots import MongoCollectionSnapshot
 
-__all__ = ['MongoDocumentRepository']
+__all__ = [
+    'DocumentCodec',
+    'MongoDocumentRepository',
+    'MongoWatermarkRepository',
+    'MongoQuarantineRepository',
+    'GridFsSourceArchiveRepository',
+    'MongoCollectionSnapshot',
+]
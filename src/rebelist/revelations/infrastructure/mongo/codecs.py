@@ -0,0 +1,66 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Mapping
+
+from bson import Binary
+from zstandard import ZstdCompressor, ZstdDecompressor
+
+from rebelist.revelations.domain.models import Document
+
+
+class DocumentCodec:
+    """Converts documents to and from their Mongo representation, optionally zstd compressing the bulky fields.
+
+    Compressed fields are stored as binary, which is how they are recognized when decoding, so a collection holding
+    both formats stays readable. Fields missing from a projected item are left empty.
+
+    The content hash is computed from the content on every encoding, while the indexed hash is left out of the item so
+    saving a document never overwrites it.
+    """
+
+    def __init__(self, compress_raw: bool = False, compress_content: bool = False, level: int = 3):
+        self.__compress_raw = compress_raw
+        self.__compress_content = compress_content
+        self.__compressor = ZstdCompressor(level=level)
+        self.__decompressor = ZstdDecompressor()
+
+    def encode(self, document: Document) -> dict[str, Any]:
+        """Converts a document into a Mongo item."""
+        item: dict[str, Any] = document.as_dict()
+        item['content_hash'] = DocumentCodec.hash_content(document.content)
+        del item['indexed_hash']
+
+        if self.__compress_raw:
+            item['raw'] = Binary(self.__compressor.compress(json.dumps(document.raw).encode('utf-8')))
+        if self.__compress_content:
+            item['content'] = Binary(self.__compressor.compress(document.content.encode('utf-8')))
+
+        return item
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """Computes the hash identifying a document content."""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def decode(self, item: Mapping[str, Any]) -> Document:
+        """Converts a Mongo item into a document, decompressing its compressed fields."""
+        raw = item.get('raw', '')
+        if isinstance(raw, bytes):
+            raw = json.loads(self.__decompressor.decompress(raw))
+
+        content = item.get('content', '')
+        if isinstance(content, bytes):
+            content = self.__decompressor.decompress(content).decode('utf-8')
+
+        return Document(
+            id=item['id'],
+            title=item.get('title', ''),
+            content=content,
+            modified_at=item.get('modified_at', datetime.min),
+            raw=raw,
+            url=item.get('url'),
+            space=item.get('space', ''),
+            content_hash=item.get('content_hash', ''),
+            indexed_hash=item.get('indexed_hash', ''),
+        )
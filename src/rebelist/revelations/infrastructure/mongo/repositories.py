@@ -1,10 +1,22 @@
-from typing import Any, Generator, Mapping, TypeAlias
+from dataclasses import asdict
+from datetime import UTC, datetime
+from io import BytesIO
+from itertools import batched
+from typing import Any, Generator, Iterable, Mapping, TypeAlias
 
+from gridfs import GridFSBucket
+from pymongo import UpdateOne
 from pymongo.synchronous.collection import Collection as MongoCollection
 from pymongo.synchronous.database import Database as MongoDatabase
 
-from rebelist.revelations.domain.models import Document
-from rebelist.revelations.domain.repositories import DocumentRepositoryPort
+from rebelist.revelations.domain.models import Document, QuarantinedDocument, Watermark
+from rebelist.revelations.domain.repositories import (
+    DocumentRepositoryPort,
+    QuarantineRepositoryPort,
+    SourceArchiveRepositoryPort,
+    WatermarkRepositoryPort,
+)
+from rebelist.revelations.infrastructure.mongo.codecs import DocumentCodec
 
 Collection: TypeAlias = MongoCollection[Mapping[str, Any]]
 Database: TypeAlias = MongoDatabase[Mapping[str, Any]]
@@ -13,29 +25,191 @@ Database: TypeAlias = MongoDatabase[Mapping[str, Any]]
 class MongoDocumentRepository(DocumentRepositoryPort):
     """Repository for accessing documents from Mongo."""
 
-    def __init__(self, database: Database, collection_name: str) -> None:
+    def __init__(
+        self,
+        database: Database,
+        collection_name: str,
+        batch_size: int = 500,
+        read_batch_size: int = 100,
+        codec: DocumentCodec | None = None,
+    ) -> None:
         self.__collection: Collection = database.get_collection(collection_name)
+        self.__codec = codec or DocumentCodec()
+        self.__batch_size = max(batch_size, 1)
+        self.__read_batch_size = max(read_batch_size, 1)
 
     def save(self, document: Document) -> None:
         """Saves a document."""
-        self.__collection.delete_one({'id': document.id})
-        self.__collection.insert_one(document.as_dict())
+        self.__collection.update_one({'id': document.id}, {'$set': self.__codec.encode(document)}, upsert=True)
+
+    def save_many(self, documents: Iterable[Document]) -> None:
+        """Saves many documents in batches, replacing the stored versions of the same documents."""
+        for batch in batched(documents, self.__batch_size, strict=False):
+            # Unordered writes are applied in parallel by the server and do not stop at the first error
+            requests: list[UpdateOne] = [
+                UpdateOne({'id': document.id}, {'$set': self.__codec.encode(document)}, upsert=True)
+                for document in batch
+            ]
+            self.__collection.bulk_write(requests, ordered=False)
+
+    def mark_indexed(self, document: Document) -> None:
+        """Records the content hash of a document as indexed."""
+        indexed_at = datetime.now(UTC)
+        if document.content_hash:
+            self.__collection.update_one(
+                {'id': document.id}, {'$set': {'indexed_hash': document.content_hash, 'indexed_at': indexed_at}}
+            )
+            return
+
+        # Documents saved before content hashes existed get the hash of the indexed content, unless saved meanwhile
+        content_hash = DocumentCodec.hash_content(document.content)
+        self.__collection.update_one(
+            {'id': document.id, 'content_hash': {'$exists': False}},
+            {'$set': {'content_hash': content_hash, 'indexed_hash': content_hash, 'indexed_at': indexed_at}},
+        )
+
+    def unmark_indexed(self, indexed_since: datetime | None = None) -> int:
+        """Forgets the indexed content hash of the documents indexed since a date, or of all documents.
+
+        Documents marked before the indexing date was recorded are always forgotten, since they may be indexed since.
+        """
+        query: dict[str, Any] = {'indexed_hash': {'$exists': True}}
+        if indexed_since is not None:
+            query['$or'] = [{'indexed_at': {'$gte': indexed_since}}, {'indexed_at': {'$exists': False}}]
+
+        result = self.__collection.update_many(query, {'$unset': {'indexed_hash': '', 'indexed_at': ''}})
+
+        return result.modified_count
+
+    def find_versions(self) -> dict[str, datetime]:
+        """Finds the modification date of every stored document, keyed by document id."""
+        cursor = self.__collection.find({}, {'_id': False, 'id': True, 'modified_at': True})
+
+        try:
+            return {str(item['id']): item['modified_at'] for item in cursor}
+        finally:
+            cursor.close()
 
-    def find_all(self) -> Generator[Document, None, None]:
-        """Finds all documents."""
+    def find_all(
+        self,
+        modified_since: datetime | None = None,
+        ids: Iterable[int | str] | None = None,
+        fields: Iterable[str] | None = None,
+        unindexed: bool = False,
+    ) -> Generator[Document, None, None]:
+        """Finds documents, optionally only the ones modified after a date or with the given ids.
+
+        When fields are given, only those document fields are loaded and the others are left empty. When unindexed is
+        set, only the documents whose content changed since it was last indexed are found.
+        """
+        query: dict[str, Any] = {}
+        if modified_since is not None:
+            query['modified_at'] = {'$gt': modified_since}
+        if ids is not None:
+            query['id'] = {'$in': list(ids)}
+        if unindexed:
+            # Documents saved before content hashes existed have none, so they are always indexed
+            query['$or'] = [
+                {'content_hash': {'$exists': False}},
+                {'$expr': {'$ne': ['$content_hash', '$indexed_hash']}},
+            ]
+
+        projection: dict[str, bool] | None = None
+        if fields is not None:
+            projection = {'_id': False, 'id': True} | dict.fromkeys(fields, True)
+
+        cursor = self.__collection.find(query, projection, batch_size=self.__read_batch_size)
+
+        try:
+            for item in cursor:
+                yield self.__codec.decode(item)
+        finally:
+            cursor.close()
+
+
+class MongoWatermarkRepository(WatermarkRepositoryPort):
+    """Repository for accessing synchronization watermarks from Mongo."""
+
+    def __init__(self, database: Database, collection_name: str) -> None:
+        self.__collection: Collection = database.get_collection(collection_name)
+
+    def find_all(self) -> Generator[Watermark, None, None]:
+        """Finds the watermarks of all synchronized spaces."""
         cursor = self.__collection.find({})
 
         try:
             for item in cursor:
-                document = Document(
+                yield Watermark(space=item['space'], modified_at=item['modified_at'])
+        finally:
+            cursor.close()
+
+    def save(self, watermark: Watermark) -> None:
+        """Saves a watermark, replacing the previous one of the same space."""
+        self.__collection.replace_one({'space': watermark.space}, asdict(watermark), upsert=True)
+
+
+class MongoQuarantineRepository(QuarantineRepositoryPort):
+    """Repository for accessing quarantined documents from Mongo."""
+
+    def __init__(self, database: Database, collection_name: str) -> None:
+        self.__collection: Collection = database.get_collection(collection_name)
+
+    def find_all(self) -> Generator[QuarantinedDocument, None, None]:
+        """Finds all quarantined documents."""
+        cursor = self.__collection.find({}, {'_id': False})
+
+        try:
+            for item in cursor:
+                yield QuarantinedDocument(
                     id=item['id'],
                     title=item['title'],
-                    content=item['content'],
+                    size=item['size'],
+                    error=item['error'],
                     modified_at=item['modified_at'],
-                    raw=item['raw'],
-                    url=item['url'],
+                    quarantined_at=item['quarantined_at'],
                 )
-
-                yield document
         finally:
             cursor.close()
+
+    def save(self, document: QuarantinedDocument) -> None:
+        """Saves a quarantined document, replacing the previous entry of the same document."""
+        self.__collection.replace_one({'id': document.id}, asdict(document), upsert=True)
+
+    def delete(self, document_id: str) -> None:
+        """Releases a document from the quarantine."""
+        self.__collection.delete_one({'id': document_id})
+
+
+class GridFsSourceArchiveRepository(SourceArchiveRepositoryPort):
+    """Repository archiving the original source files of the documents in Mongo GridFS."""
+
+    def __init__(self, database: Database, bucket_name: str) -> None:
+        self.__bucket = GridFSBucket(database, bucket_name=bucket_name)
+        # The file versions are looked up by their metadata in the files collection of the bucket
+        self.__files: Collection = database.get_collection(f'{bucket_name}.files')
+
+    def find(self, document_id: int | str, modified_at: datetime) -> bytes | None:
+        """Finds the archived source file of a document version, if any."""
+        item = self.__files.find_one(
+            {'metadata.id': str(document_id), 'metadata.modified_at': modified_at}, {'_id': True}
+        )
+        if item is None:
+            return None
+
+        buffer = BytesIO()
+        self.__bucket.download_to_stream(item['_id'], buffer)
+
+        return buffer.getvalue()
+
+    def save(self, document_id: int | str, modified_at: datetime, data: bytes) -> None:
+        """Archives the source file of a document version, replacing the older versions of the same document."""
+        document_id = str(document_id)
+        metadata = {'id': document_id, 'modified_at': modified_at}
+
+        if self.__files.find_one({'metadata.id': document_id, 'metadata.modified_at': modified_at}) is None:
+            self.__bucket.upload_from_stream(document_id, data, metadata=metadata)
+
+        # Older versions are deleted once the new one is stored, so a document is never left without an archive
+        query = {'metadata.id': document_id, 'metadata.modified_at': {'$lt': modified_at}}
+        for item in list(self.__files.find(query, {'_id': True})):
+            self.__bucket.delete(item['_id'])
@@ -0,0 +1,38 @@
+from itertools import batched
+from typing import IO, Any, Mapping
+
+import bson
+from pymongo import ReplaceOne
+
+from rebelist.revelations.domain.services import SnapshotPort
+from rebelist.revelations.infrastructure.mongo.repositories import Database
+
+
+class MongoCollectionSnapshot(SnapshotPort):
+    """Copies the items of a Mongo collection as a stream of BSON documents, the format of mongodump.
+
+    Items are copied as stored, so compressed fields and content hashes are kept as is. Restoring replaces the items
+    with the same id and keeps the others.
+    """
+
+    def __init__(self, database: Database, collection_name: str, batch_size: int = 1000):
+        self.__collection = database[collection_name]
+        self.__batch_size = max(batch_size, 1)
+
+    def export(self, target: IO[bytes]) -> None:
+        """Writes every item of the collection to a binary stream."""
+        cursor = self.__collection.find({}, {'_id': False}, batch_size=self.__batch_size)
+
+        try:
+            for item in cursor:
+                target.write(bson.encode(item))
+        finally:
+            cursor.close()
+
+    def restore(self, source: IO[bytes]) -> None:
+        """Saves every item of a binary stream written by export, replacing the stored items with the same id."""
+        for items in batched(bson.decode_file_iter(source), self.__batch_size, strict=False):
+            requests: list[ReplaceOne[Mapping[str, Any]]] = [
+                ReplaceOne({'id': item['id']}, item, upsert=True) for item in items
+            ]
+            self.__collection.bulk_write(requests, ordered=False)
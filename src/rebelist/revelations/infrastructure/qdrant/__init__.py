@@ -1,3 +1,13 @@
 from rebelist.revelations.infrastructure.qdrant.adapters import QdrantContextReader, QdrantContextWriter
+from rebelist.revelations.infrastructure.qdrant.collections import QdrantCollectionManager
+from rebelist.revelations.infrastructure.qdrant.snapshots import QdrantCollectionSnapshot
+from rebelist.revelations.infrastructure.qdrant.stats import QdrantStorageInspector, StorageUsage
 
-__all__ = ['QdrantContextReader', 'QdrantContextWriter']
+__all__ = [
+    'QdrantCollectionManager',
+    'QdrantCollectionSnapshot',
+    'QdrantContextReader',
+    'QdrantContextWriter',
+    'QdrantStorageInspector',
+    'StorageUsage',
+]
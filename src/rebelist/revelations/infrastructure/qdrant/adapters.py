@@ -1,51 +1,443 @@
+import hashlib
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Final, Iterable, cast
+from threading import Lock
+from typing import Final, Generator, Iterable, Iterator, cast
+from uuid import NAMESPACE_URL, UUID, uuid5
 
 from langchain_core.documents import Document as InputDocument
 from langchain_qdrant import QdrantVectorStore
 from langchain_text_splitters import TextSplitter
-from qdrant_client.models import SearchParams
+from qdrant_client.models import (
+    CollectionStatus,
+    DatetimeRange,
+    ExtendedPointId,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    MatchAny,
+    OptimizersConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+    SparseVector,
+)
 from sentence_transformers import CrossEncoder
 
-from rebelist.revelations.domain import ContextDocument, ContextReaderPort, ContextWriterPort, Document
+from rebelist.revelations.domain import ContextDocument, ContextFilter, ContextReaderPort, ContextWriterPort, Document
+from rebelist.revelations.domain.services import LoggerPort
+from rebelist.revelations.infrastructure.qdrant.collections import QdrantCollectionManager
+from rebelist.revelations.infrastructure.qdrant.pipelines import Pipeline, Stage
+from rebelist.revelations.infrastructure.sqlite import SqliteCache
+
+
+@dataclass(slots=True)
+class _Batch:
+    """Documents indexed together, along with their chunks and embeddings as they go through the pipeline."""
+
+    documents: list[Document]
+    chunks: list[InputDocument] = field(default_factory=list[InputDocument])
+    dense: list[list[float]] = field(default_factory=list[list[float]])
+    sparse: list[SparseVector] = field(default_factory=list[SparseVector])
+    error: Exception | None = None
+
+
+class _Batcher:
+    """Merges the batches of single documents coming out of the splitters up to a chunk budget."""
+
+    def __init__(self, budget: int):
+        self.__budget = budget
+        self.__pending: _Batch | None = None
+
+    def add(self, batch: _Batch) -> list[_Batch]:
+        """Adds a document batch, returning the merged batch that would exceed the budget with it."""
+        if batch.error is not None:
+            return [batch]
+
+        ready: list[_Batch] = []
+        if self.__pending is not None and len(self.__pending.chunks) + len(batch.chunks) > self.__budget:
+            ready.append(self.__pending)
+            self.__pending = None
+
+        if self.__pending is None:
+            self.__pending = batch
+        else:
+            self.__pending.documents.extend(batch.documents)
+            self.__pending.chunks.extend(batch.chunks)
+
+        return ready
+
+    def flush(self) -> list[_Batch]:
+        """Returns the batch still being merged, if any."""
+        pending, self.__pending = self.__pending, None
+        return [pending] if pending is not None else []
 
 
 class QdrantContextWriter(ContextWriterPort):
-    """Vector writer adapter."""
+    """Vector writer adapter.
 
-    def __init__(self, store: QdrantVectorStore, splitter: TextSplitter):
+    Chunk point ids are derived from the document id, the chunk position and the chunk content, so writing a document
+    again overwrites its unchanged chunks in place, and the chunks left from its previous content are deleted.
+
+    When a cache is given, dense vectors are stored as float32 blobs addressed by the SHA-256 of the chunk text and of
+    the fingerprint of the embedding model, so rebuilding a collection only embeds the chunks never seen before.
+    """
+
+    CHUNK_NAMESPACE: Final[UUID] = uuid5(NAMESPACE_URL, 'rebelist:revelations:chunk')
+    BULK_POLL_INTERVAL: Final[float] = 1.0
+    BULK_PROGRESS_INTERVAL: Final[float] = 30.0
+
+    def __init__(
+        self,
+        store: QdrantVectorStore,
+        splitter: TextSplitter,
+        logger: LoggerPort,
+        batch_chunks: int = 256,
+        split_workers: int = 2,
+        dense_workers: int = 2,
+        sparse_workers: int = 1,
+        upsert_workers: int = 1,
+        queue_size: int = 8,
+        cache: SqliteCache | None = None,
+        cache_fingerprint: str = '',
+        collections: QdrantCollectionManager | None = None,
+        bulk_timeout_seconds: float = 0,
+    ):
         self.__store = store
         self.__splitter = splitter
+        self.__logger = logger
+        self.__batch_chunks = max(batch_chunks, 1)
+        self.__split_workers = split_workers
+        self.__dense_workers = dense_workers
+        self.__sparse_workers = sparse_workers
+        self.__upsert_workers = upsert_workers
+        self.__queue_size = queue_size
+        self.__cache = cache
+        self.__cache_fingerprint = hashlib.sha256(cache_fingerprint.encode('utf-8')).hexdigest()
+        self.__cache_lock = Lock()
+        self.__cache_hits = 0
+        self.__cache_misses = 0
+        self.__collections = collections
+        self.__bulk_timeout_seconds = bulk_timeout_seconds
+        # Collection written instead of the served one while a rebuild is in progress
+        self.__rebuilt_collection: str | None = None
+
+    def __collection_name(self) -> str:
+        """Name of the collection documents are written to."""
+        return self.__rebuilt_collection or self.__store.collection_name
 
     def add(self, document: Document) -> None:
         """Saves a context document."""
-        input_document = InputDocument(
-            page_content=document.content,
-            metadata={
-                'id': str(document.id),
-                'title': document.title,
-                'modified_at': document.modified_at.isoformat(),
-                'url': document.url,
-            },
+        for _, error in self.add_many([document]):
+            if error is not None:
+                raise error
+
+    def add_many(self, documents: Iterable[Document]) -> Iterator[tuple[Document, Exception | None]]:
+        """Saves many context documents, yielding each document with the error that prevented saving it, if any.
+
+        Documents go through a pipeline of splitting, dense embedding, sparse embedding and upserting stages, each with
+        its own pool of workers, so Ollama, FastEmbed and Qdrant work at the same time. The chunks of several documents
+        are gathered up to the chunk budget, so each batch is embedded with one dense and one sparse embedding call and
+        written with one upsert. Documents are yielded once their batch is written.
+        """
+        with self.__cache_lock:
+            self.__cache_hits = self.__cache_misses = 0
+
+        batcher = _Batcher(self.__batch_chunks)
+        pipeline = Pipeline(
+            [
+                Stage('split', self.__split, self.__split_workers),
+                Stage('batch', batcher.add, flush=batcher.flush),
+                Stage('dense', self.__embed_dense, self.__dense_workers),
+                Stage('sparse', self.__embed_sparse, self.__sparse_workers),
+                Stage('upsert', self.__upsert, self.__upsert_workers),
+            ],
+            self.__queue_size,
+        )
+
+        for batch in pipeline.run(documents):
+            for document in batch.documents:
+                yield document, batch.error
+
+        utilization = ', '.join(f'{name}={share:.0%}' for name, share in pipeline.utilization.items())
+        self.__logger.info(f'Indexing stage utilization. [{utilization}]')
+
+        if self.__cache is not None:
+            lookups = max(self.__cache_hits + self.__cache_misses, 1)
+            self.__logger.info(
+                f'Embedding cache hit rate: {self.__cache_hits / lookups:.0%} '
+                f'[hits={self.__cache_hits}, misses={self.__cache_misses}]'
+            )
+
+    @contextmanager
+    def bulk(self) -> Generator[None, None, None]:
+        """Disables the indexing of the collection while documents are written, then builds the index at once.
+
+        The configured indexing threshold is restored when the block exits, and the build is awaited unless the block
+        raised. Waiting longer than the bulk timeout, when set, raises.
+        """
+        client = self.__store.client
+        collection_name = self.__collection_name()
+        # Indexing left disabled by an interrupted bulk load, or an unset threshold, fall back to the default threshold
+        threshold = (
+            client.get_collection(collection_name).config.optimizer_config.indexing_threshold
+            or QdrantCollectionManager.INDEXING_THRESHOLD
+        )
+
+        client.update_collection(collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=0))
+        self.__logger.info(f'Indexing disabled for the bulk load. [collection={collection_name}]')
+
+        try:
+            yield
+        finally:
+            client.update_collection(
+                collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+            )
+
+        started = time.perf_counter()
+        self.__wait_for_index()
+        self.__logger.info(
+            f'Index built in {time.perf_counter() - started:.1f} seconds. [collection={collection_name}]'
         )
 
-        chunks = self.__splitter.split_documents([input_document])
-        self.__store.add_documents(chunks)
+    @contextmanager
+    def rebuild(self) -> Generator[None, None, None]:
+        """Writes documents to a new version of the collection, served in place of the current one once the block exits.
+
+        The served version keeps answering searches during the rebuild and is kept for rollback afterwards. The new
+        version is deleted when the block raises. Without a collection manager, documents are written in place.
+        """
+        if self.__collections is None:
+            yield
+            return
+
+        self.__rebuilt_collection = self.__collections.create_version()
+
+        try:
+            yield
+        except BaseException:
+            self.__collections.delete_version(self.__rebuilt_collection)
+            raise
+        else:
+            self.__collections.switch(self.__rebuilt_collection)
+        finally:
+            self.__rebuilt_collection = None
+
+    def __wait_for_index(self) -> None:
+        """Waits until the optimizer of the collection has nothing left to do, logging its progress meanwhile."""
+        client = self.__store.client
+        collection_name = self.__collection_name()
+        started = logged = time.monotonic()
+
+        while True:
+            time.sleep(QdrantContextWriter.BULK_POLL_INTERVAL)
+            info = client.get_collection(collection_name)
+
+            match info.status:
+                case CollectionStatus.GREEN:
+                    return
+                case CollectionStatus.RED:
+                    raise RuntimeError(f'The index of the collection failed to build. [collection={collection_name}]')
+                case CollectionStatus.GREY:
+                    # Pending optimizations only start with an update of the collection
+                    client.update_collection(collection_name, optimizers_config=OptimizersConfigDiff())
+                case _:
+                    pass
+
+            now = time.monotonic()
+            if 0 < self.__bulk_timeout_seconds <= now - started:
+                raise RuntimeError(
+                    f'The index of the collection was not built after {self.__bulk_timeout_seconds} seconds. '
+                    f'[collection={collection_name}, status={info.status.value}]'
+                )
+
+            if now - logged >= QdrantContextWriter.BULK_PROGRESS_INTERVAL:
+                logged = now
+                self.__logger.info(
+                    f'Waiting for the index build. [collection={collection_name}, status={info.status.value}, '
+                    f'indexed_vectors={info.indexed_vectors_count}, points={info.points_count}]'
+                )
+
+    def __split(self, document: Document) -> list[_Batch]:
+        """Splits a context document into the chunks to embed."""
+        batch = _Batch(documents=[document])
+
+        try:
+            input_document = InputDocument(
+                page_content=document.content,
+                metadata={
+                    'id': str(document.id),
+                    'title': document.title,
+                    'modified_at': document.modified_at.isoformat(),
+                    'url': document.url,
+                    'space': document.space,
+                },
+            )
+
+            batch.chunks = self.__splitter.split_documents([input_document])
+
+            for index, chunk in enumerate(batch.chunks):
+                content_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
+                chunk.id = str(uuid5(QdrantContextWriter.CHUNK_NAMESPACE, f'{document.id}:{index}:{content_hash}'))
+        except Exception as error:
+            batch.error = error
+
+        return [batch]
+
+    def __embed_dense(self, batch: _Batch) -> list[_Batch]:
+        """Computes the dense vectors of the chunks of a batch in one call."""
+        if batch.error is not None or not batch.chunks:
+            return [batch]
+
+        try:
+            embeddings = self.__store.embeddings
+            if embeddings is None:
+                raise ValueError('Dense embeddings are required to index documents.')
+
+            texts = [chunk.page_content for chunk in batch.chunks]
+            vectors = self.__find_cached(texts)
+            missing = [index for index, vector in enumerate(vectors) if vector is None]
+
+            if missing:
+                embedded = embeddings.embed_documents([texts[index] for index in missing])
+                for index, vector in zip(missing, embedded, strict=True):
+                    vectors[index] = vector
+                self.__save_cached([texts[index] for index in missing], embedded)
+
+            with self.__cache_lock:
+                self.__cache_hits += len(texts) - len(missing)
+                self.__cache_misses += len(missing)
+
+            batch.dense = [vector for vector in vectors if vector is not None]
+        except Exception as error:
+            batch.error = error
+
+        return [batch]
+
+    def __cache_key(self, text: str) -> str:
+        """Builds the cache key of the dense vector of a chunk text."""
+        return f'{hashlib.sha256(text.encode("utf-8")).hexdigest()}:{self.__cache_fingerprint}'
+
+    def __find_cached(self, texts: list[str]) -> list[list[float] | None]:
+        """Finds the cached dense vectors of chunk texts with one cache read, None for the texts not cached."""
+        if self.__cache is None:
+            return [None] * len(texts)
+
+        keys = [self.__cache_key(text) for text in texts]
+        cached = self.__cache.get_many(keys)
+        vectors: list[list[float] | None] = []
+
+        for key in keys:
+            data = cached.get(key)
+            if data is None:
+                vectors.append(None)
+                continue
+
+            vector = array('f')
+            vector.frombytes(data)
+            vectors.append(vector.tolist())
+
+        return vectors
+
+    def __save_cached(self, texts: list[str], vectors: list[list[float]]) -> None:
+        """Caches the dense vectors of chunk texts with one cache write."""
+        if self.__cache is not None:
+            self.__cache.set_many(
+                {
+                    self.__cache_key(text): array('f', vector).tobytes()
+                    for text, vector in zip(texts, vectors, strict=True)
+                }
+            )
+
+    def __embed_sparse(self, batch: _Batch) -> list[_Batch]:
+        """Computes the sparse vectors of the chunks of a batch in one call."""
+        if batch.error is not None or not batch.chunks:
+            return [batch]
+
+        try:
+            vectors = self.__store.sparse_embeddings.embed_documents([chunk.page_content for chunk in batch.chunks])
+            batch.sparse = [SparseVector(indices=vector.indices, values=vector.values) for vector in vectors]
+        except Exception as error:
+            batch.error = error
+
+        return [batch]
+
+    def __upsert(self, batch: _Batch) -> list[_Batch]:
+        """Deletes the outdated chunks of the documents of a batch, then writes their current chunks in one request."""
+        if batch.error is not None:
+            return [batch]
+
+        try:
+            ids = [cast(str, chunk.id) for chunk in batch.chunks]
+            stale = Filter(
+                must=[
+                    FieldCondition(
+                        key=f'{self.__store.metadata_payload_key}.id',
+                        match=MatchAny(any=[str(document.id) for document in batch.documents]),
+                    )
+                ],
+                must_not=[HasIdCondition(has_id=list[ExtendedPointId](ids))],
+            )
+            self.__store.client.delete(self.__collection_name(), points_selector=FilterSelector(filter=stale))
+
+            points = [
+                PointStruct(
+                    id=point_id,
+                    vector={self.__store.vector_name: dense, self.__store.sparse_vector_name: sparse},
+                    payload={
+                        self.__store.content_payload_key: chunk.page_content,
+                        self.__store.metadata_payload_key: chunk.metadata,
+                    },
+                )
+                for point_id, chunk, dense, sparse in zip(ids, batch.chunks, batch.dense, batch.sparse, strict=True)
+            ]
+            if points:
+                self.__store.client.upsert(self.__collection_name(), points=points)
+        except Exception as error:
+            batch.error = error
+
+        return [batch]
 
 
 class QdrantContextReader(ContextReaderPort):
-    """Vector reader adapter."""
+    """Vector reader adapter.
+
+    On quantized collections, the candidates found with the quantized vectors are oversampled and rescored with the
+    original vectors.
+    """
 
     SEARCH_EFFORT: Final[int] = 400
 
-    def __init__(self, store: QdrantVectorStore, ranker: CrossEncoder):
+    def __init__(self, store: QdrantVectorStore, ranker: CrossEncoder, oversampling: float = 2.0, rescore: bool = True):
         self.__store = store
         self.__ranker = ranker
+        self.__oversampling = oversampling
+        self.__rescore = rescore
+
+    def search(self, query: str, limit: int, context_filter: ContextFilter | None = None) -> list[ContextDocument]:
+        """Searches for context documents based on a query embedding, among the ones matching the filter if any."""
+        documents = self.retrieve(query, limit, context_filter=context_filter)
+
+        if len(documents) > 1:
+            documents = self.rerank(query, documents)
+
+        return documents
 
-    def search(self, query: str, limit: int) -> list[ContextDocument]:
-        """Searches for context documents based on a query embedding."""
-        search_params = SearchParams(hnsw_ef=QdrantContextReader.SEARCH_EFFORT, exact=False)
-        items = self.__store.similarity_search(query, k=limit, search_params=search_params)
+    def retrieve(
+        self, query: str, limit: int, quantized: bool = True, context_filter: ContextFilter | None = None
+    ) -> list[ContextDocument]:
+        """Retrieves the candidate context documents of a query, without any reranking.
+
+        The filter is applied by Qdrant while traversing the HNSW graph, relying on the payload indexes of its fields.
+        """
+        query_filter = self.__to_filter(context_filter) if context_filter is not None else None
+        items = self.__store.similarity_search(
+            query, k=limit, filter=query_filter, search_params=self.__search_params(quantized)
+        )
         documents: list[ContextDocument] = []
 
         for item in items:
@@ -55,11 +447,70 @@ class QdrantContextReader(ContextReaderPort):
 
             documents.append(ContextDocument(title=title, content=item.page_content, modified_at=modified_at, url=url))
 
-        if len(documents) > 1:
-            documents = self.rerank(query, documents)
+        return documents
+
+    def embed_query(self, query: str) -> list[float]:
+        """Computes the dense vector of a query."""
+        embeddings = self.__store.embeddings
+        if embeddings is None:
+            raise ValueError('Dense embeddings are required to embed queries.')
+
+        return embeddings.embed_query(query)
+
+    def retrieve_dense(self, vector: list[float], limit: int, quantized: bool = True) -> list[ContextDocument]:
+        """Retrieves the context documents nearest to a dense query vector, without any other retrieval nor reranking.
+
+        The query runs on the dense vectors alone, so neither the sparse search nor the fusion of both are involved.
+        """
+        response = self.__store.client.query_points(
+            self.__store.collection_name,
+            query=vector,
+            using=self.__store.vector_name,
+            limit=limit,
+            search_params=self.__search_params(quantized),
+            with_payload=True,
+        )
+        documents: list[ContextDocument] = []
+
+        for point in response.points:
+            payload = point.payload or {}
+            metadata = cast(dict[str, str], payload.get(self.__store.metadata_payload_key) or {})
+            documents.append(
+                ContextDocument(
+                    title=metadata.get('title', ''),
+                    content=cast(str, payload.get(self.__store.content_payload_key, '')),
+                    modified_at=datetime.fromisoformat(metadata['modified_at']),
+                    url=metadata.get('url'),
+                )
+            )
 
         return documents
 
+    def __search_params(self, quantized: bool) -> SearchParams:
+        """Builds the search parameters, searching the original vectors when quantized is disabled."""
+        quantization = QuantizationSearchParams(
+            ignore=not quantized, rescore=self.__rescore, oversampling=self.__oversampling
+        )
+        return SearchParams(hnsw_ef=QdrantContextReader.SEARCH_EFFORT, exact=False, quantization=quantization)
+
+    def __to_filter(self, context_filter: ContextFilter) -> Filter | None:
+        """Converts a context filter into the Qdrant filter on the chunk metadata, None when it has no condition."""
+        key = self.__store.metadata_payload_key
+        conditions: list[FieldCondition] = []
+
+        if context_filter.document_ids:
+            ids = [str(document_id) for document_id in context_filter.document_ids]
+            conditions.append(FieldCondition(key=f'{key}.id', match=MatchAny(any=ids)))
+
+        if context_filter.spaces:
+            conditions.append(FieldCondition(key=f'{key}.space', match=MatchAny(any=list(context_filter.spaces))))
+
+        if context_filter.modified_after is not None or context_filter.modified_before is not None:
+            period = DatetimeRange(gt=context_filter.modified_after, lt=context_filter.modified_before)
+            conditions.append(FieldCondition(key=f'{key}.modified_at', range=period))
+
+        return Filter(must=list(conditions)) if conditions else None
+
     def rerank(self, query: str, documents: Iterable[ContextDocument]) -> list[ContextDocument]:
         """Re-ranks documents by relevance to the query using a cross-encoder model."""
         pairs = [(query, document.content) for document in documents]
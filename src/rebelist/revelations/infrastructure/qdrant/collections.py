@@ -0,0 +1,238 @@
+import re
+from datetime import UTC, datetime
+from typing import Final
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    AliasOperations,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadSchemaType,
+    QuantizationConfig,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseIndexParams,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from rebelist.revelations.config.settings import QdrantSettings
+from rebelist.revelations.domain.services import LoggerPort
+
+
+class QdrantCollectionManager:
+    """Manages the versioned collections served under the context collection alias.
+
+    Each version is a collection named after the alias and its creation time. Switching the alias to another version is
+    atomic, so searches never see a half built collection, and the previous versions are kept for rollback until they
+    are pruned. A collection created before versioning, named after the alias itself, is served as is until the first
+    switch replaces it.
+    """
+
+    # Searches can be restricted by document, space and modification time, and outdated chunks are deleted by document
+    # id when a document is indexed again. Filtered searches without these indexes scan the payloads.
+    PAYLOAD_INDEXES: Final[dict[str, PayloadSchemaType]] = {
+        'metadata.id': PayloadSchemaType.KEYWORD,
+        'metadata.space': PayloadSchemaType.KEYWORD,
+        'metadata.modified_at': PayloadSchemaType.DATETIME,
+    }
+
+    # Minimum number of unindexed vectors a collection segment must accumulate before Qdrant's optimizer starts
+    # building its HNSW index.
+    INDEXING_THRESHOLD: Final[int] = 200
+
+    def __init__(self, client: QdrantClient, settings: QdrantSettings, embedding_dimension: int, logger: LoggerPort):
+        self.__client = client
+        self.__settings = settings
+        self.__embedding_dimension = embedding_dimension
+        self.__logger = logger
+        self.__alias = settings.context_collection
+        self.__version_pattern = re.compile(rf'{re.escape(self.__alias)}_\d{{14}}')
+
+    @property
+    def alias(self) -> str:
+        """Name the context collection is served under."""
+        return self.__alias
+
+    def initialize(self) -> None:
+        """Creates a first version served under the alias unless the alias is already served, then indexes payloads."""
+        if self.resolve() is None and not self.__client.collection_exists(self.__alias):
+            self.switch(self.create_version())
+
+        self.__create_payload_indexes(self.resolve() or self.__alias)
+
+    def drop(self) -> None:
+        """Deletes the alias along with every version, and the collection created before versioning if any."""
+        self.__client.update_collection_aliases(
+            [DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.__alias))]
+        )
+
+        for name in [*self.versions(), self.__alias]:
+            self.__client.delete_collection(name)
+
+    def resolve(self) -> str | None:
+        """Returns the name of the version served under the alias, None when the alias does not exist."""
+        for alias in self.__client.get_aliases().aliases:
+            if alias.alias_name == self.__alias:
+                return alias.collection_name
+
+        return None
+
+    def versions(self) -> list[str]:
+        """Returns the names of every version, from the oldest to the newest."""
+        names = (collection.name for collection in self.__client.get_collections().collections)
+        return sorted(name for name in names if self.__version_pattern.fullmatch(name))
+
+    def version_name(self) -> str:
+        """Returns the name of a version created now, newer than every existing version."""
+        return f'{self.__alias}_{datetime.now(UTC):%Y%m%d%H%M%S}'
+
+    def replaced_at(self, name: str) -> datetime | None:
+        """Returns when the version after the given one was created, None when the given version is the newest.
+
+        Documents indexed from then on may have been written to the newer versions only.
+        """
+        newer = [version for version in self.versions() if version > name]
+        if not newer:
+            return None
+
+        return datetime.strptime(newer[0].removeprefix(f'{self.__alias}_'), '%Y%m%d%H%M%S').replace(tzinfo=UTC)
+
+    def create_version(self) -> str:
+        """Creates a new empty version configured from the current settings, without serving it."""
+        name = self.version_name()
+        self.__create_collection(name)
+        self.__create_payload_indexes(name)
+        self.__logger.info(f'Collection created. [collection={name}]')
+
+        return name
+
+    def delete_version(self, name: str) -> None:
+        """Deletes a version, unless it is the served one."""
+        if name == self.resolve():
+            raise ValueError(f'The served collection cannot be deleted. [collection={name}]')
+
+        self.__client.delete_collection(name)
+        self.__logger.info(f'Collection deleted. [collection={name}]')
+
+    def switch(self, name: str) -> str | None:
+        """Serves a version under the alias in one atomic operation, returning the previously served collection."""
+        previous = self.resolve()
+        operations: list[AliasOperations] = [
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.__alias)),
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=name, alias_name=self.__alias)),
+        ]
+
+        if previous is None and self.__client.collection_exists(self.__alias):
+            # The collection created before versioning holds the alias name, which is only freed by deleting it
+            self.__logger.warning(
+                f'Deleting the unversioned collection to create the alias. [collection={self.__alias}]'
+            )
+            self.__client.delete_collection(self.__alias)
+
+        self.__client.update_collection_aliases(operations)
+        self.__logger.info(f'Collection alias switched. [alias={self.__alias}, collection={name}, previous={previous}]')
+
+        return previous
+
+    def rollback(self) -> str:
+        """Serves the newest version older than the served one again, returning its name."""
+        current = self.resolve()
+        older = [name for name in self.versions() if current is None or name < current]
+        if not older:
+            raise ValueError(f'No previous collection to roll back to. [alias={self.__alias}]')
+
+        self.switch(older[-1])
+
+        return older[-1]
+
+    def prune(self, keep: int = 1) -> list[str]:
+        """Deletes the versions older than the served one, except the newest ones kept for rollback."""
+        current = self.resolve()
+        older = [name for name in self.versions() if current is not None and name < current]
+        pruned = older[: max(len(older) - max(keep, 0), 0)]
+
+        for name in pruned:
+            self.delete_version(name)
+
+        return pruned
+
+    def __create_collection(self, name: str) -> None:
+        """Creates an empty collection with the dense and sparse vectors configured by the settings."""
+        # The large corpus profile memory-maps the dense vectors, the HNSW graph and the payloads, so the operating
+        # system only keeps their most read pages in RAM.
+        large_corpus = self.__settings.profile == 'large_corpus'
+
+        hnsw_config = HnswConfigDiff(
+            # m = How many direct connections (or "shortcuts") each point gets on the map.
+            m=32,
+            # ef_construct = determines how thoroughly Qdrant searches for optimal connections when building the
+            # HNSW index, directly influencing the final index quality and the time it takes to build.
+            ef_construct=300,
+            on_disk=large_corpus,
+        )
+
+        # memmap_threshold = the size in kilobytes above which a segment is memory-mapped rather than loaded in RAM.
+        optimizers_config = OptimizersConfigDiff(
+            indexing_threshold=QdrantCollectionManager.INDEXING_THRESHOLD,
+            memmap_threshold=self.__settings.memmap_threshold_kb if large_corpus else None,
+        )
+
+        quantization_config = self.__quantization_config()
+
+        vector_params = VectorParams(
+            size=self.__embedding_dimension,
+            distance=Distance.COSINE,
+            hnsw_config=hnsw_config,
+            quantization_config=quantization_config,
+            on_disk=large_corpus or quantization_config is not None,
+        )
+
+        sparse_params = SparseVectorParams(
+            index=SparseIndexParams(
+                on_disk=True,
+            )
+        )
+
+        self.__client.create_collection(
+            collection_name=name,
+            vectors_config={self.__settings.vector_name: vector_params},
+            sparse_vectors_config={self.__settings.sparse_vector_name: sparse_params},
+            optimizers_config=optimizers_config,
+            on_disk_payload=large_corpus,
+        )
+
+    def __quantization_config(self) -> QuantizationConfig | None:
+        """Configures the quantized copy of the dense vector, None when the dense vector is not quantized.
+
+        The quantized copy is searched in RAM, while the original vectors stay on disk and are only read to rescore the
+        best candidates.
+        """
+        match self.__settings.quantization:
+            case 'scalar':
+                # int8 quantization, 4 times smaller, clipping the 1% most extreme values to keep the precision
+                return ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8, quantile=0.99, always_ram=self.__settings.quantization_always_ram
+                    )
+                )
+            case 'binary':
+                # 1 bit per dimension, 32 times smaller, only accurate enough on high dimensional embeddings
+                return BinaryQuantization(
+                    binary=BinaryQuantizationConfig(always_ram=self.__settings.quantization_always_ram)
+                )
+            case _:
+                return None
+
+    def __create_payload_indexes(self, name: str) -> None:
+        """Indexes the chunk metadata fields used by filters."""
+        for field_name, field_schema in QdrantCollectionManager.PAYLOAD_INDEXES.items():
+            self.__client.create_payload_index(name, field_name, field_schema=field_schema)
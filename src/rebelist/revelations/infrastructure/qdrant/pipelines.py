@@ -0,0 +1,167 @@
+from dataclasses import dataclass, field
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Any, Callable, Final, Generator, Iterable
+
+
+class _Done:
+    """Marks the end of the items flowing through a queue."""
+
+
+_DONE: Final[_Done] = _Done()
+
+
+@dataclass(slots=True)
+class Stage:
+    """Step of a pipeline, applied to every item by a pool of worker threads.
+
+    Each item may produce any number of output items. The flush function, if any, is called once every item went
+    through the stage, to release the outputs held back by a stateful stage, which must then run a single worker.
+    """
+
+    name: str
+    function: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+    flush: Callable[[], Iterable[Any]] | None = None
+
+    # Time spent by all the workers applying the function
+    busy_seconds: float = field(default=0.0, init=False)
+
+
+class Pipeline:
+    """Runs items through stages of worker threads connected by bounded queues.
+
+    A stage slower than the previous ones fills its input queue and blocks them, so memory stays bounded whatever the
+    bottleneck. The reading of the input items is a stage of its own, named read. Errors raised by a stage function
+    stop the pipeline and are raised to the consumer, so stages are expected to turn item failures into items.
+    """
+
+    POLL_INTERVAL: Final[float] = 0.1
+    READ_STAGE: Final[str] = 'read'
+
+    def __init__(self, stages: list[Stage], queue_size: int = 8):
+        self.__stages = stages
+        self.__queue_size = max(queue_size, 1)
+        self.__utilization: dict[str, float] = {}
+
+    @property
+    def utilization(self) -> dict[str, float]:
+        """Share of the last run each stage spent working, averaged over its workers and keyed by stage name."""
+        return dict(self.__utilization)
+
+    def run(self, items: Iterable[Any]) -> Generator[Any, None, None]:
+        """Yields the outputs of the last stage as soon as they are ready, in no particular order."""
+        reader = Stage(Pipeline.READ_STAGE, lambda item: (item,))
+        stages = [reader, *self.__stages]
+        queues: list[Queue[Any]] = [Queue(self.__queue_size) for _ in stages]
+        stop = Event()
+        errors: list[BaseException] = []
+        started = perf_counter()
+
+        threads = [Thread(target=self.__read, args=(items, reader, queues[0], stop, errors), daemon=True)]
+        for stage, inbox, outbox in zip(self.__stages, queues[:-1], queues[1:], strict=True):
+            remaining = [max(stage.workers, 1)]
+            lock = Lock()
+            threads += [
+                Thread(target=self.__work, args=(stage, inbox, outbox, remaining, lock, stop, errors), daemon=True)
+                for _ in range(remaining[0])
+            ]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while (item := Pipeline.__take(queues[-1], stop)) is not _DONE:
+                yield item
+
+            if errors:
+                raise errors[0]
+        finally:
+            # Also reached when the consumer stops early, the workers notice it within a poll interval
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+            elapsed = max(perf_counter() - started, 1e-9)
+            self.__utilization = {
+                stage.name: min(stage.busy_seconds / (elapsed * max(stage.workers, 1)), 1.0) for stage in stages
+            }
+
+    @staticmethod
+    def __read(
+        items: Iterable[Any], reader: Stage, outbox: Queue[Any], stop: Event, errors: list[BaseException]
+    ) -> None:
+        """Feeds the input items to the first stage."""
+        try:
+            iterator = iter(items)
+            while not stop.is_set():
+                started = perf_counter()
+                item = next(iterator, _DONE)
+                reader.busy_seconds += perf_counter() - started
+
+                Pipeline.__put(outbox, item, stop)
+                if item is _DONE:
+                    break
+        except BaseException as error:
+            errors.append(error)
+            stop.set()
+
+    @staticmethod
+    def __work(
+        stage: Stage,
+        inbox: Queue[Any],
+        outbox: Queue[Any],
+        remaining: list[int],
+        lock: Lock,
+        stop: Event,
+        errors: list[BaseException],
+    ) -> None:
+        """Applies a stage to the items of its input queue, until the end of the items is reached."""
+        busy_seconds = 0.0
+
+        try:
+            while (item := Pipeline.__take(inbox, stop)) is not _DONE:
+                started = perf_counter()
+                outputs = list(stage.function(item))
+                busy_seconds += perf_counter() - started
+
+                for output in outputs:
+                    Pipeline.__put(outbox, output, stop)
+
+            # Passes the end mark on to the sibling workers still waiting for items
+            Pipeline.__put(inbox, _DONE, stop)
+
+            with lock:
+                stage.busy_seconds += busy_seconds
+                remaining[0] -= 1
+                last = remaining[0] == 0
+
+            if last and not stop.is_set():
+                for output in stage.flush() if stage.flush is not None else ():
+                    Pipeline.__put(outbox, output, stop)
+                Pipeline.__put(outbox, _DONE, stop)
+        except BaseException as error:
+            errors.append(error)
+            stop.set()
+
+    @staticmethod
+    def __take(queue: Queue[Any], stop: Event) -> Any:
+        """Waits for the next item of a queue, or for the end mark once the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                return queue.get(timeout=Pipeline.POLL_INTERVAL)
+            except Empty:
+                continue
+
+        return _DONE
+
+    @staticmethod
+    def __put(queue: Queue[Any], item: Any, stop: Event) -> None:
+        """Waits for room in a queue to add an item, unless the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=Pipeline.POLL_INTERVAL)
+                return
+            except Full:
+                continue
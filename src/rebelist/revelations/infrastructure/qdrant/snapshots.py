@@ -0,0 +1,58 @@
+from typing import IO, Final
+
+import httpx
+from qdrant_client import QdrantClient
+from qdrant_client.models import SnapshotDescription
+
+from rebelist.revelations.domain.services import LoggerPort, SnapshotPort
+from rebelist.revelations.infrastructure.qdrant.collections import QdrantCollectionManager
+
+
+class QdrantCollectionSnapshot(SnapshotPort):
+    """Copies the served context collection with the snapshot API of Qdrant.
+
+    Snapshots are created and streamed through the REST API, as the client times out on large collections and loads
+    the snapshots in memory. A restored snapshot becomes a new version of the collection, served in place of the
+    current one, which is kept for rollback.
+    """
+
+    CHUNK_SIZE: Final[int] = 1024 * 1024
+
+    def __init__(
+        self, client: QdrantClient, http: httpx.Client, collections: QdrantCollectionManager, logger: LoggerPort
+    ):
+        self.__client = client
+        self.__http = http
+        self.__collections = collections
+        self.__logger = logger
+
+    def export(self, target: IO[bytes]) -> None:
+        """Writes a snapshot of the served collection to a binary stream, deleting it from the Qdrant node after."""
+        collection_name = self.__collections.resolve() or self.__collections.alias
+        response = self.__http.post(f'/collections/{collection_name}/snapshots', params={'wait': 'true'})
+        response.raise_for_status()
+        snapshot = SnapshotDescription.model_validate(response.json()['result'])
+
+        try:
+            url = f'/collections/{collection_name}/snapshots/{snapshot.name}'
+            with self.__http.stream('GET', url) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(QdrantCollectionSnapshot.CHUNK_SIZE):
+                    target.write(chunk)
+        finally:
+            self.__client.delete_snapshot(collection_name, snapshot.name)
+
+        self.__logger.info(f'Collection snapshot exported. [collection={collection_name}, size={snapshot.size}]')
+
+    def restore(self, source: IO[bytes]) -> None:
+        """Uploads a snapshot written by export into a new version of the collection, then serves it."""
+        collection_name = self.__collections.version_name()
+        response = self.__http.post(
+            f'/collections/{collection_name}/snapshots/upload',
+            params={'wait': 'true', 'priority': 'snapshot'},
+            files={'snapshot': (f'{collection_name}.snapshot', source)},
+        )
+        response.raise_for_status()
+
+        self.__logger.info(f'Collection snapshot restored. [collection={collection_name}]')
+        self.__collections.switch(collection_name)
@@ -0,0 +1,118 @@
+import json
+from dataclasses import dataclass
+from math import ceil
+from typing import Final
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    CollectionInfo,
+    ScalarQuantization,
+    SparseVector,
+    VectorParams,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class StorageUsage:
+    """Estimated size of a part of a collection, split between RAM resident and on-disk (memory-mapped) bytes."""
+
+    component: str
+    resident_bytes: int
+    on_disk_bytes: int
+
+
+class QdrantStorageInspector:
+    """Estimates where the storage of a collection lives, from its configuration and a sample of its points.
+
+    Memory-mapped storage is reported on disk, although the operating system caches its most read pages in RAM.
+    """
+
+    PAYLOAD_SAMPLE_SIZE: Final[int] = 256
+    # Each HNSW link is a 4 bytes point offset, the base layer holding twice m links per point
+    LINK_BYTES: Final[int] = 4
+    # Each sparse vector entry is a 4 bytes dimension index and a 4 bytes weight
+    SPARSE_ENTRY_BYTES: Final[int] = 8
+
+    def __init__(self, client: QdrantClient, collection_name: str, vector_name: str, sparse_vector_name: str):
+        self.__client = client
+        self.__collection_name = collection_name
+        self.__vector_name = vector_name
+        self.__sparse_vector_name = sparse_vector_name
+
+    def inspect(self) -> list[StorageUsage]:
+        """Returns the estimated storage of every part of the collection, from the vectors to the payloads."""
+        info = self.__client.get_collection(self.__collection_name)
+        points = info.points_count or 0
+        vectors = info.config.params.vectors
+        params = vectors.get(self.__vector_name) if isinstance(vectors, dict) else vectors
+        if params is None:
+            raise ValueError(f'Vector "{self.__vector_name}" not found. [collection={self.__collection_name}]')
+
+        payload_bytes, sparse_bytes = self.__sample(points)
+        vectors_on_disk = bool(params.on_disk)
+        sparse_params = (info.config.params.sparse_vectors or {}).get(self.__sparse_vector_name)
+        sparse_on_disk = bool(sparse_params and sparse_params.index and sparse_params.index.on_disk)
+
+        usages = [
+            self.__usage('Dense vectors', points * params.size * 4, vectors_on_disk),
+            self.__usage('HNSW graph', self.__graph_bytes(info, params, points), self.__graph_on_disk(info, params)),
+            self.__usage('Sparse vectors', sparse_bytes, sparse_on_disk),
+            self.__usage('Payloads', payload_bytes, bool(info.config.params.on_disk_payload)),
+        ]
+
+        quantization = params.quantization_config or info.config.quantization_config
+        if isinstance(quantization, ScalarQuantization):
+            always_ram = bool(quantization.scalar.always_ram)
+            usages.insert(
+                1, self.__usage('Quantized vectors', points * params.size, vectors_on_disk and not always_ram)
+            )
+        elif isinstance(quantization, BinaryQuantization):
+            always_ram = bool(quantization.binary.always_ram)
+            size = points * ceil(params.size / 8)
+            usages.insert(1, self.__usage('Quantized vectors', size, vectors_on_disk and not always_ram))
+
+        return usages
+
+    def __sample(self, points: int) -> tuple[int, int]:
+        """Extrapolates the payload and sparse vector bytes of the collection from the first points."""
+        if not points:
+            return 0, 0
+
+        records, _ = self.__client.scroll(
+            self.__collection_name,
+            limit=QdrantStorageInspector.PAYLOAD_SAMPLE_SIZE,
+            with_payload=True,
+            with_vectors=[self.__sparse_vector_name],
+        )
+        if not records:
+            return 0, 0
+
+        payload_bytes = 0
+        sparse_bytes = 0
+        for record in records:
+            payload_bytes += len(json.dumps(record.payload or {}).encode())
+            sparse = record.vector.get(self.__sparse_vector_name) if isinstance(record.vector, dict) else None
+            if isinstance(sparse, SparseVector):
+                sparse_bytes += len(sparse.indices) * QdrantStorageInspector.SPARSE_ENTRY_BYTES
+
+        return payload_bytes * points // len(records), sparse_bytes * points // len(records)
+
+    @staticmethod
+    def __graph_bytes(info: CollectionInfo, params: VectorParams, points: int) -> int:
+        """Estimates the size of the base layer of the HNSW graph, which holds nearly all of its links."""
+        m = (params.hnsw_config.m if params.hnsw_config else None) or info.config.hnsw_config.m
+        return points * 2 * m * QdrantStorageInspector.LINK_BYTES
+
+    @staticmethod
+    def __graph_on_disk(info: CollectionInfo, params: VectorParams) -> bool:
+        """Tells whether the HNSW graph is memory-mapped, the vector settings overriding the collection ones."""
+        if params.hnsw_config and params.hnsw_config.on_disk is not None:
+            return params.hnsw_config.on_disk
+
+        return bool(info.config.hnsw_config.on_disk)
+
+    @staticmethod
+    def __usage(component: str, size: int, on_disk: bool) -> StorageUsage:
+        """Assigns the whole size of a component to the storage it lives in."""
+        return StorageUsage(component, 0 if on_disk else size, size if on_disk else 0)
@@ -0,0 +1,3 @@
+from rebelist.revelations.infrastructure.sqlite.caches import SqliteCache
+
+__all__ = ['SqliteCache']
@@ -0,0 +1,131 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import batched
+from pathlib import Path
+from threading import Lock
+from typing import Final, Generator, Iterable, Mapping
+
+
+class SqliteCache:
+    """Size bounded key-value store on disk that evicts the least recently used entries.
+
+    The store runs in WAL mode, so it can be shared by several processes. The total size of the entries is kept up to
+    date by every write, so writes only evict when the maximum size is exceeded, and only read the oldest entries.
+    """
+
+    # Keys per statement, below the default limit of bound parameters of older SQLite versions
+    KEYS_PER_QUERY: Final[int] = 500
+
+    def __init__(self, path: str, max_size_bytes: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.__max_size_bytes = max_size_bytes
+        self.__lock = Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+
+        with self.__transaction():
+            self.__connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            # Stores created before the total was tracked get it computed once
+            self.__connection.execute(
+                "INSERT OR IGNORE INTO meta (name, value) SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries"
+            )
+
+    def get(self, key: str) -> bytes | None:
+        """Finds the value stored under a key, marking it as recently used."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        """Finds the values stored under many keys, marking the found ones as recently used in one write."""
+        found: dict[str, bytes] = {}
+
+        with self.__lock:
+            for chunk in batched(dict.fromkeys(keys), SqliteCache.KEYS_PER_QUERY, strict=False):
+                placeholders = ', '.join('?' * len(chunk))
+                rows = self.__connection.execute(
+                    f'SELECT key, value FROM entries WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                found.update((key, bytes(value)) for key, value in rows)
+
+            if found:
+                accessed_at = time.time()
+                with self.__transaction():
+                    self.__connection.executemany(
+                        'UPDATE entries SET accessed_at = ? WHERE key = ?', ((accessed_at, key) for key in found)
+                    )
+
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        """Stores a value under a key, evicting the least recently used entries beyond the maximum size."""
+        self.set_many({key: value})
+
+    def set_many(self, values: Mapping[str, bytes]) -> None:
+        """Stores many values in one transaction, evicting the least recently used entries beyond the maximum size."""
+        if not values:
+            return
+
+        with self.__lock, self.__transaction():
+            growth = 0
+            accessed_at = time.time()
+
+            for key, value in values.items():
+                row = self.__connection.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+                self.__connection.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, value, len(value), accessed_at),
+                )
+                growth += len(value) - (row[0] if row is not None else 0)
+
+            self.__connection.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (growth,))
+            total_size = self.__connection.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+            if total_size > self.__max_size_bytes:
+                self.__evict(total_size - self.__max_size_bytes)
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        with self.__lock:
+            self.__connection.close()
+
+    def __evict(self, excess: int) -> None:
+        """Deletes the least recently used entries until at least the given number of bytes is freed."""
+        freed = 0
+
+        while freed < excess:
+            # Walks the accessed_at index from the oldest entry, so only the evicted entries are read
+            rows = self.__connection.execute(
+                'SELECT key, size FROM entries ORDER BY accessed_at LIMIT ?', (SqliteCache.KEYS_PER_QUERY,)
+            ).fetchall()
+            if not rows:
+                break
+
+            evicted: list[str] = []
+            for key, size in rows:
+                if freed >= excess:
+                    break
+                evicted.append(key)
+                freed += size
+
+            self.__connection.executemany('DELETE FROM entries WHERE key = ?', ((key,) for key in evicted))
+
+        self.__connection.execute("UPDATE meta SET value = value - ? WHERE name = 'total_size'", (freed,))
+
+    @contextmanager
+    def __transaction(self) -> Generator[None, None, None]:
+        """Runs the statements of the block in one write transaction, rolled back when the block raises."""
+        self.__connection.execute('BEGIN IMMEDIATE')
+
+        try:
+            yield
+        except BaseException:
+            self.__connection.execute('ROLLBACK')
+            raise
+
+        self.__connection.execute('COMMIT')
@@ -12,6 +12,13 @@ from rebelist.revelations.handlers.commands import (
     dataset_download,
     dataset_index,
     dataset_initialize,
+    dataset_prune,
+    dataset_quarantine,
+    dataset_reconvert,
+    dataset_restore,
+    dataset_rollback,
+    dataset_snapshot,
+    dataset_stats,
 )
 
 # Disable Logging
@@ -39,6 +46,13 @@ def console(context: Context) -> None:
 
 console.add_command(cast(Command, dataset_initialize))
 console.add_command(cast(Command, dataset_download))
+console.add_command(cast(Command, dataset_quarantine))
+console.add_command(cast(Command, dataset_reconvert))
 console.add_command(cast(Command, dataset_index))
+console.add_command(cast(Command, dataset_rollback))
+console.add_command(cast(Command, dataset_prune))
+console.add_command(cast(Command, dataset_stats))
+console.add_command(cast(Command, dataset_snapshot))
+console.add_command(cast(Command, dataset_restore))
 console.add_command(cast(Command, chat))
 console.add_command(cast(Command, benchmark))
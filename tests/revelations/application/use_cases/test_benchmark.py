@@ -1,14 +1,16 @@
+from datetime import datetime
 from typing import cast
-from unittest.mock import MagicMock, create_autospec
+from unittest.mock import MagicMock, call, create_autospec
 
 import pytest
 
-from rebelist.revelations.application.use_cases.benchmark import BenchmarkUseCase
+from rebelist.revelations.application.use_cases.benchmark import BenchmarkUseCase, QuantizationBenchmarkUseCase
 from rebelist.revelations.domain import (
     AnswerEvaluatorPort,
     BenchmarkCase,
     BenchmarkScore,
     ChatAdapterPort,
+    ContextDocument,
     ContextReaderPort,
     LoggerPort,
     RetrievalEvaluator,
@@ -200,3 +202,70 @@ class TestBenchmarkUseCase:
             use_case(benchmark_cases, cutoff=10, limit=20)
 
         assert cast(MagicMock, mock_logger.error).call_count == 3
+
+
+class TestQuantizationBenchmarkUseCase:
+    """Test suite for the QuantizationBenchmarkUseCase class."""
+
+    @staticmethod
+    def _document(url: str) -> ContextDocument:
+        return ContextDocument(title=url, content=f'Content of {url}', modified_at=datetime(2024, 1, 1), url=url)
+
+    @pytest.fixture
+    def benchmark_cases(self) -> list[BenchmarkCase]:
+        """Create benchmark case fixtures."""
+        return [
+            BenchmarkCase(question='What is AI?', answer='Something magical.', keywords={'ai'}),
+            BenchmarkCase(question='What is ML?', answer='Something old.', keywords={'ml'}),
+        ]
+
+    def test_call_compares_quantized_with_original_retrieval(self, benchmark_cases: list[BenchmarkCase]) -> None:
+        """Tests the recall is the share of the original documents also retrieved over the quantized vectors."""
+        mock_context_reader = create_autospec(ContextReaderPort, instance=True)
+        mock_logger = create_autospec(LoggerPort, instance=True)
+
+        def embed_query(question: str) -> list[float]:
+            return [1.0, 0.0] if question == 'What is AI?' else [0.0, 1.0]
+
+        def retrieve_dense(vector: list[float], limit: int, quantized: bool = True) -> list[ContextDocument]:
+            if quantized and vector == [1.0, 0.0]:
+                return [self._document('a'), self._document('x')]
+            return [self._document('a'), self._document('b')]
+
+        mock_context_reader.embed_query.side_effect = embed_query
+        mock_context_reader.retrieve_dense.side_effect = retrieve_dense
+
+        score = QuantizationBenchmarkUseCase(mock_context_reader, mock_logger)(benchmark_cases, limit=2)
+
+        assert score.recall == 0.75
+        assert score.quantized_latency_ms >= 0
+        assert score.original_latency_ms >= 0
+        assert mock_context_reader.embed_query.call_args_list == [call('What is AI?'), call('What is ML?')]
+        assert mock_context_reader.retrieve_dense.call_args_list == [
+            call([1.0, 0.0], 2, quantized=True),
+            call([1.0, 0.0], 2, quantized=False),
+            call([0.0, 1.0], 2, quantized=True),
+            call([0.0, 1.0], 2, quantized=False),
+        ]
+        mock_context_reader.search.assert_not_called()
+        mock_context_reader.retrieve.assert_not_called()
+
+    def test_call_raises_when_every_case_fails(self, benchmark_cases: list[BenchmarkCase]) -> None:
+        """Tests failing cases are logged, and an error is raised when none succeeded."""
+        mock_context_reader = create_autospec(ContextReaderPort, instance=True)
+        mock_context_reader.retrieve_dense.side_effect = RuntimeError('Boom')
+        mock_logger = create_autospec(LoggerPort, instance=True)
+
+        with pytest.raises(ValueError, match='No quantization scores were provided.'):
+            QuantizationBenchmarkUseCase(mock_context_reader, mock_logger)(benchmark_cases, limit=2)
+
+        assert cast(MagicMock, mock_logger.error).call_count == 2
+
+    def test_call_raises_when_limit_is_too_high(self, benchmark_cases: list[BenchmarkCase]) -> None:
+        """Tests that a ValueError is raised when limit exceeds the maximum."""
+        use_case = QuantizationBenchmarkUseCase(
+            create_autospec(ContextReaderPort, instance=True), create_autospec(LoggerPort, instance=True)
+        )
+
+        with pytest.raises(ValueError, match='Limit value must be'):
+            use_case(benchmark_cases, limit=QuantizationBenchmarkUseCase.LIMIT_MAX + 1)
@@ -1,5 +1,6 @@
 from datetime import datetime
-from unittest.mock import MagicMock
+from typing import Iterable, Iterator
+from unittest.mock import MagicMock, call
 
 import pytest
 from pytest_mock import MockerFixture
@@ -48,7 +49,13 @@ class TestDataEmbeddingUseCase:
     @pytest.fixture
     def context_writer(self, mocker: MockerFixture) -> MagicMock:
         """Create context writer fixture."""
-        return mocker.create_autospec(ContextWriterPort, instance=True)
+        context_writer = mocker.create_autospec(ContextWriterPort, instance=True)
+
+        def add_many(documents: Iterable[Document]) -> Iterator[tuple[Document, Exception | None]]:
+            return ((document, None) for document in documents)
+
+        context_writer.add_many.side_effect = add_many
+        return context_writer
 
     @pytest.fixture
     def logger(self, mocker: MockerFixture) -> MagicMock:
@@ -78,9 +85,81 @@ class TestDataEmbeddingUseCase:
         """Ensures all retrieved documents are passed to the context writer for vectorization."""
         use_case()
 
-        assert context_writer.add.call_count == len(documents)
-        for document in documents:
-            context_writer.add.assert_any_call(document)
+        context_writer.add_many.assert_called_once()
+        assert list(context_writer.add_many.call_args[0][0]) == documents
+
+    def test_raw_payload_is_not_loaded(self, use_case: DataEmbeddingUseCase, repository: MagicMock) -> None:
+        """Ensures only the indexed fields of the documents not indexed yet are read from the repository."""
+        use_case()
+
+        repository.find_all.assert_called_once_with(fields=DataEmbeddingUseCase.INDEXED_FIELDS, unindexed=True)
+        assert 'raw' not in DataEmbeddingUseCase.INDEXED_FIELDS
+
+    def test_full_run_reads_every_document(self, use_case: DataEmbeddingUseCase, repository: MagicMock) -> None:
+        """Ensures a full run reads the documents whose content is already indexed too."""
+        use_case(full=True)
+
+        repository.find_all.assert_called_once_with(fields=DataEmbeddingUseCase.INDEXED_FIELDS, unindexed=False)
+
+    def test_bulk_run_indexes_inside_the_bulk_block(
+        self, use_case: DataEmbeddingUseCase, context_writer: MagicMock, repository: MagicMock
+    ) -> None:
+        """Ensures the documents are written while the context store defers its indexing."""
+        use_case(full=True, bulk=True)
+
+        context_writer.bulk.assert_called_once()
+        context_writer.bulk.return_value.__enter__.assert_called_once()
+        context_writer.add_many.assert_called_once()
+
+    def test_rebuild_marks_documents_once_the_new_collection_is_served(
+        self,
+        use_case: DataEmbeddingUseCase,
+        context_writer: MagicMock,
+        repository: MagicMock,
+        documents: list[Document],
+    ) -> None:
+        """Ensures every document is written to the rebuilt collection, and marked indexed once it is served."""
+        events: list[str] = []
+
+        def switch(*_: object) -> None:
+            events.append('switch')
+
+        def mark(document: Document) -> None:
+            events.append(f'mark {document.id}')
+
+        context_writer.rebuild.return_value.__exit__.side_effect = switch
+        repository.mark_indexed.side_effect = mark
+
+        use_case(rebuild=True)
+
+        repository.find_all.assert_called_once_with(fields=DataEmbeddingUseCase.INDEXED_FIELDS, unindexed=False)
+        context_writer.bulk.assert_not_called()
+        assert events == ['switch', 'mark 100', 'mark 200']
+
+    def test_rebuild_with_failures_discards_the_new_collection(
+        self, use_case: DataEmbeddingUseCase, context_writer: MagicMock, repository: MagicMock
+    ) -> None:
+        """Ensures a rebuild missing documents raises inside the rebuild block, without marking anything."""
+
+        def add_many(documents: Iterable[Document]) -> Iterator[tuple[Document, Exception | None]]:
+            return ((document, RuntimeError('Boom')) for document in documents)
+
+        context_writer.add_many.side_effect = add_many
+
+        with pytest.raises(RuntimeError, match='2 documents failed to index'):
+            use_case(rebuild=True)
+
+        exit_args = context_writer.rebuild.return_value.__exit__.call_args.args
+        assert isinstance(exit_args[1], RuntimeError)
+        repository.mark_indexed.assert_not_called()
+
+    def test_indexed_documents_are_marked(
+        self, use_case: DataEmbeddingUseCase, repository: MagicMock, documents: list[Document]
+    ) -> None:
+        """Ensures the content of every vectorized document is recorded as indexed."""
+        use_case()
+
+        repository.mark_indexed.assert_has_calls([call(document) for document in documents])
 
     def test_error_in_repository_is_raised(
         self,
@@ -111,7 +190,11 @@ class TestDataEmbeddingUseCase:
         repository.find_all.return_value = documents
 
         context_writer = mocker.create_autospec(ContextWriterPort, instance=True)
-        context_writer.add.side_effect = Exception('Writer error')
+
+        def add_many(documents: Iterable[Document]) -> Iterator[tuple[Document, Exception | None]]:
+            return ((document, Exception('Writer error')) for document in documents)
+
+        context_writer.add_many.side_effect = add_many
 
         logger = mocker.create_autospec(LoggerPort)
 
@@ -124,3 +207,4 @@ class TestDataEmbeddingUseCase:
         use_case()
 
         logger.error.assert_called_with('Error saving document: Writer error - [id="200" - title="Second Doc"]')
+        repository.mark_indexed.assert_not_called()
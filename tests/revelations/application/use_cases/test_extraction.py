@@ -1,14 +1,29 @@
+from dataclasses import replace
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Iterator
 from unittest.mock import MagicMock
 
 import pytest
+from atlassian import Confluence
 from pytest_mock import MockerFixture
 
 from rebelist.revelations.application.use_cases.extraction import DataExtractionUseCase
-from rebelist.revelations.config.settings import RagSettings
-from rebelist.revelations.domain import ContentProviderPort, Document, DocumentRepositoryPort
-from rebelist.revelations.domain.services import LoggerPort, PdfConverterPort
+from rebelist.revelations.config.settings import ConfluenceSettings, RagSettings
+from rebelist.revelations.domain import (
+    ContentProviderPort,
+    Document,
+    DocumentRepositoryPort,
+    QuarantinedDocument,
+    QuarantineRepositoryPort,
+    SourceArchiveRepositoryPort,
+    SourceFormat,
+    SyncCheckpoint,
+    Watermark,
+    WatermarkRepositoryPort,
+)
+from rebelist.revelations.domain.exceptions import DocumentConversionAbortedError, DocumentConverterError
+from rebelist.revelations.domain.services import HtmlConverterPort, LoggerPort, PdfConverterPort
+from rebelist.revelations.infrastructure.confluence.adapters import ConfluenceGateway
 
 
 class TestDataExtractionUseCase:
@@ -18,6 +33,7 @@ class TestDataExtractionUseCase:
         return {
             'id': 'abc-123',
             'title': 'Mocked Document',
+            'space': 'DOCS',
             'content': '# This is a title',
             'modified_at': datetime.fromisoformat('2020-11-12T09:04:47.054+01:00'),
             'raw': '<p>Hello, world!</p>',
@@ -34,13 +50,54 @@ class TestDataExtractionUseCase:
     @pytest.fixture
     def repository(self, mocker: MockerFixture) -> MagicMock:
         """Mocks the document repository."""
-        return mocker.create_autospec(DocumentRepositoryPort, instance=True)
+        repository = mocker.create_autospec(DocumentRepositoryPort, instance=True)
+        repository.find_versions.return_value = {'abc-123': datetime.fromisoformat('2020-01-01T00:00:00+01:00')}
+        return repository
+
+    @pytest.fixture
+    def watermark_repository(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the watermark repository."""
+        repository = mocker.create_autospec(WatermarkRepositoryPort, instance=True)
+        repository.find_all.return_value = [
+            Watermark(space='DOCS', modified_at=datetime.fromisoformat('2020-01-01T00:00:00+01:00'))
+        ]
+        return repository
+
+    @pytest.fixture
+    def quarantine_repository(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks an empty quarantine repository."""
+        repository = mocker.create_autospec(QuarantineRepositoryPort, instance=True)
+        repository.find_all.return_value = []
+        return repository
+
+    @pytest.fixture
+    def quarantined_fixture(self, document_fixture: dict[str, Any]) -> QuarantinedDocument:
+        """Provides the quarantine entry of the current version of the fixture document."""
+        return QuarantinedDocument(
+            id=document_fixture['id'],
+            title=document_fixture['title'],
+            size=len(document_fixture['content']),
+            error='Conversion timed out after 5 seconds.',
+            modified_at=document_fixture['modified_at'],
+            quarantined_at=datetime.fromisoformat('2021-01-01T00:00:00+00:00'),
+        )
 
     @pytest.fixture
     def pdf_converter(self, mocker: MockerFixture) -> MagicMock:
         """Mocks PDF conversion into Markdown."""
         converter = mocker.create_autospec(PdfConverterPort, instance=True)
-        converter.pdf_to_markdown.return_value = '# This is a title'
+
+        def convert(items: Iterable[tuple[Any, bytes]]) -> Iterator[tuple[Any, str]]:
+            return ((key, '# This is a title') for key, _ in items)
+
+        converter.pdf_to_markdown_many.side_effect = convert
+        return converter
+
+    @pytest.fixture
+    def html_converter(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks HTML conversion into Markdown."""
+        converter = mocker.create_autospec(HtmlConverterPort, instance=True)
+        converter.html_to_markdown.return_value = '# This is an HTML title'
         return converter
 
     @pytest.fixture
@@ -58,7 +115,10 @@ class TestDataExtractionUseCase:
         self,
         content_provider: MagicMock,
         repository: MagicMock,
+        watermark_repository: MagicMock,
+        quarantine_repository: MagicMock,
         pdf_converter: MagicMock,
+        html_converter: MagicMock,
         settings: RagSettings,
         logger: MagicMock,
     ) -> DataExtractionUseCase:
@@ -66,7 +126,10 @@ class TestDataExtractionUseCase:
         return DataExtractionUseCase(
             content_provider=content_provider,
             repository=repository,
+            watermark_repository=watermark_repository,
+            quarantine_repository=quarantine_repository,
             converter=pdf_converter,
+            html_converter=html_converter,
             settings=settings,
             logger=logger,
         )
@@ -80,21 +143,25 @@ class TestDataExtractionUseCase:
         """Ensures fetched documents are converted into domain Documents and persisted."""
         use_case()
 
-        repository.save.assert_called_once()
-        saved_document: Document = repository.save.call_args[0][0]
+        repository.save_many.assert_called_once()
+        saved_document: Document = repository.save_many.call_args[0][0][0]
 
         assert saved_document.id == document_fixture['id']
         assert saved_document.title == document_fixture['title']
         assert saved_document.content == document_fixture['content']
         assert saved_document.raw == document_fixture['raw']
         assert saved_document.url == document_fixture['url']
+        assert saved_document.space == document_fixture['space']
         assert isinstance(saved_document.modified_at, datetime)
 
     def test_exception_in_content_provider_is_propagated(
         self,
         mocker: MockerFixture,
         repository: MagicMock,
+        watermark_repository: MagicMock,
+        quarantine_repository: MagicMock,
         pdf_converter: MagicMock,
+        html_converter: MagicMock,
         settings: RagSettings,
         logger: MagicMock,
     ) -> None:
@@ -105,7 +172,10 @@ class TestDataExtractionUseCase:
         use_case = DataExtractionUseCase(
             content_provider=provider,
             repository=repository,
+            watermark_repository=watermark_repository,
+            quarantine_repository=quarantine_repository,
             converter=pdf_converter,
+            html_converter=html_converter,
             settings=settings,
             logger=logger,
         )
@@ -120,8 +190,352 @@ class TestDataExtractionUseCase:
         logger: MagicMock,
     ) -> None:
         """Ensures repository failures are logged with document context."""
-        repository.save.side_effect = Exception('Repository error')
+        repository.save_many.side_effect = Exception('Repository error')
+
+        use_case()
+
+        logger.error.assert_called_once_with('Error saving documents. [ids=abc-123] - Repository error')
+
+    def test_documents_are_saved_in_batches(
+        self,
+        content_provider: MagicMock,
+        repository: MagicMock,
+        watermark_repository: MagicMock,
+        quarantine_repository: MagicMock,
+        pdf_converter: MagicMock,
+        html_converter: MagicMock,
+        settings: RagSettings,
+        logger: MagicMock,
+        document_fixture: dict[str, Any],
+    ) -> None:
+        """Ensures converted documents are buffered and written in batches of the configured size."""
+        content_provider.fetch.return_value = [{**document_fixture, 'id': f'id-{index}'} for index in range(5)]
+        use_case = DataExtractionUseCase(
+            content_provider=content_provider,
+            repository=repository,
+            watermark_repository=watermark_repository,
+            quarantine_repository=quarantine_repository,
+            converter=pdf_converter,
+            html_converter=html_converter,
+            settings=settings,
+            logger=logger,
+            batch_size=2,
+        )
+
+        use_case()
 
+        batches = [[document.id for document in call.args[0]] for call in repository.save_many.call_args_list]
+        assert batches == [['id-0', 'id-1'], ['id-2', 'id-3'], ['id-4']]
+
+    def test_full_download_fetches_without_checkpoint(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        repository: MagicMock,
+    ) -> None:
+        """Ensures a full download does not restrict the content provider."""
         use_case()
 
-        logger.error.assert_called_once_with('Error saving document. [id=abc-123] - Repository error')
+        content_provider.fetch.assert_called_once_with(None)
+        repository.find_versions.assert_not_called()
+
+    def test_incremental_download_fetches_with_checkpoint(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        repository: MagicMock,
+    ) -> None:
+        """Ensures an incremental download passes the stored watermarks and versions to the content provider."""
+        use_case(incremental=True)
+
+        checkpoint: SyncCheckpoint = content_provider.fetch.call_args[0][0]
+
+        assert checkpoint.watermarks == {'DOCS': datetime.fromisoformat('2020-01-01T00:00:00+01:00')}
+        assert checkpoint.versions == repository.find_versions.return_value
+
+    def test_watermark_is_advanced_to_latest_modification(
+        self,
+        use_case: DataExtractionUseCase,
+        watermark_repository: MagicMock,
+        document_fixture: dict[str, Any],
+    ) -> None:
+        """Ensures the space watermark is moved to the newest synchronized document."""
+        use_case()
+
+        watermark_repository.save.assert_called_once_with(
+            Watermark(space='DOCS', modified_at=document_fixture['modified_at'])
+        )
+
+    def test_watermark_is_kept_when_a_document_fails(
+        self,
+        use_case: DataExtractionUseCase,
+        repository: MagicMock,
+        watermark_repository: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """Ensures spaces with failed documents keep their watermark so the failures are retried."""
+        repository.save_many.side_effect = Exception('Repository error')
+
+        use_case()
+
+        watermark_repository.save.assert_not_called()
+        logger.warning.assert_called_once_with('Watermark not advanced due to failed documents. [space=DOCS]')
+
+    def test_watermark_is_kept_when_a_document_fails_to_be_fetched(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        document_fixture: dict[str, Any],
+        repository: MagicMock,
+        watermark_repository: MagicMock,
+    ) -> None:
+        """Ensures a document the provider failed to fetch keeps the watermark of its space, so it is fetched again."""
+        content_provider.fetch.return_value = [
+            {'id': 'abc-456', 'space': 'DOCS', 'error': 'Export failed'},
+            document_fixture,
+        ]
+
+        use_case()
+
+        repository.save_many.assert_called_once()
+        watermark_repository.save.assert_not_called()
+
+    def test_export_failure_of_an_older_page_keeps_the_watermark(
+        self,
+        mocker: MockerFixture,
+        repository: MagicMock,
+        watermark_repository: MagicMock,
+        quarantine_repository: MagicMock,
+        pdf_converter: MagicMock,
+        html_converter: MagicMock,
+        settings: RagSettings,
+        logger: MagicMock,
+    ) -> None:
+        """Ensures a page whose PDF export fails is retried although a newer page of its space succeeded."""
+        pages = [
+            {
+                'id': str(page_id),
+                'title': f'Page {page_id}',
+                'history': {'lastUpdated': {'when': when}},
+                '_links': {'tinyui': f'/{page_id}'},
+            }
+            for page_id, when in ((1, '2024-01-01T00:00:00+00:00'), (2, '2024-02-01T00:00:00+00:00'))
+        ]
+
+        def get_page_as_pdf(page_id: str) -> bytes:
+            if page_id == '1':
+                raise ConnectionError('Export failed')
+            return b'%PDF page'
+
+        client = mocker.Mock(spec=Confluence)
+        client.url = 'https://example.com'
+        client.get_all_pages_from_space_as_generator.return_value = pages
+        client.get_page_as_pdf.side_effect = get_page_as_pdf
+        gateway = ConfluenceGateway(client, ConfluenceSettings(spaces=('DOCS',)), logger)
+
+        DataExtractionUseCase(
+            gateway,
+            repository,
+            watermark_repository,
+            quarantine_repository,
+            pdf_converter,
+            html_converter,
+            settings,
+            logger,
+        )()
+
+        saved = [document.id for document in repository.save_many.call_args.args[0]]
+        assert saved == ['2']
+        watermark_repository.save.assert_not_called()
+        logger.warning.assert_called_once_with('Watermark not advanced due to failed documents. [space=DOCS]')
+
+    def test_conversion_error_is_logged(
+        self,
+        use_case: DataExtractionUseCase,
+        repository: MagicMock,
+        pdf_converter: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """Ensures conversion failures are logged and the document is not saved."""
+
+        def convert(items: Iterable[tuple[Any, bytes]]) -> Iterator[tuple[Any, Exception]]:
+            return ((key, DocumentConverterError('Broken PDF')) for key, _ in items)
+
+        pdf_converter.pdf_to_markdown_many.side_effect = convert
+
+        use_case()
+
+        repository.save_many.assert_not_called()
+        logger.error.assert_called_once_with('Error saving document. [id=abc-123] - Broken PDF')
+
+    def test_short_documents_are_not_converted(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        document_fixture: dict[str, Any],
+        repository: MagicMock,
+        pdf_converter: MagicMock,
+    ) -> None:
+        """Ensures documents below the minimum content length are never sent to the converter."""
+        content_provider.fetch.return_value = [{**document_fixture, 'content': b'#'}]
+
+        use_case()
+
+        assert list(pdf_converter.pdf_to_markdown_many.call_args[0][0]) == []
+        repository.save_many.assert_not_called()
+
+    def test_html_documents_bypass_the_pdf_converter(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        document_fixture: dict[str, Any],
+        repository: MagicMock,
+        pdf_converter: MagicMock,
+        html_converter: MagicMock,
+    ) -> None:
+        """Ensures HTML documents are converted with the HTML converter and never reach the PDF converter."""
+        content_provider.fetch.return_value = [
+            {**document_fixture, 'format': SourceFormat.HTML, 'content': '<h1>This is an HTML title</h1>'}
+        ]
+
+        use_case()
+
+        assert list(pdf_converter.pdf_to_markdown_many.call_args[0][0]) == []
+        html_converter.html_to_markdown.assert_called_once_with('<h1>This is an HTML title</h1>')
+        saved_document: Document = repository.save_many.call_args[0][0][0]
+        assert saved_document.content == '# This is an HTML title'
+
+    def test_html_conversion_error_keeps_the_watermark(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        document_fixture: dict[str, Any],
+        watermark_repository: MagicMock,
+        html_converter: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """Ensures a failed HTML conversion is logged and holds back the watermark of its space."""
+        content_provider.fetch.return_value = [
+            {**document_fixture, 'format': SourceFormat.HTML, 'content': '<h1>This is an HTML title</h1>'}
+        ]
+        html_converter.html_to_markdown.side_effect = DocumentConverterError('Broken HTML')
+
+        use_case()
+
+        logger.error.assert_called_once_with('Error saving document. [id=abc-123] - Broken HTML')
+        watermark_repository.save.assert_not_called()
+
+    def test_aborted_conversion_is_quarantined(
+        self,
+        use_case: DataExtractionUseCase,
+        quarantine_repository: MagicMock,
+        watermark_repository: MagicMock,
+        pdf_converter: MagicMock,
+        repository: MagicMock,
+        logger: MagicMock,
+        quarantined_fixture: QuarantinedDocument,
+    ) -> None:
+        """Ensures timed out documents are quarantined without holding back the watermark of their space."""
+
+        def convert(items: Iterable[tuple[Any, bytes]]) -> Iterator[tuple[Any, Exception]]:
+            return ((key, DocumentConversionAbortedError(quarantined_fixture.error)) for key, _ in items)
+
+        pdf_converter.pdf_to_markdown_many.side_effect = convert
+
+        use_case()
+
+        quarantined: QuarantinedDocument = quarantine_repository.save.call_args[0][0]
+        assert quarantined.id == quarantined_fixture.id
+        assert quarantined.size == quarantined_fixture.size
+        assert quarantined.error == quarantined_fixture.error
+        assert quarantined.modified_at == quarantined_fixture.modified_at
+        repository.save_many.assert_not_called()
+        watermark_repository.save.assert_called_once()
+        logger.warning.assert_called_once_with(
+            'Document quarantined. [id=abc-123] - Conversion timed out after 5 seconds.'
+        )
+
+    def test_quarantined_documents_are_skipped_until_modified(
+        self,
+        use_case: DataExtractionUseCase,
+        quarantine_repository: MagicMock,
+        pdf_converter: MagicMock,
+        repository: MagicMock,
+        quarantined_fixture: QuarantinedDocument,
+    ) -> None:
+        """Ensures the quarantined version of a document is never converted again."""
+        quarantine_repository.find_all.return_value = [quarantined_fixture]
+
+        use_case()
+
+        assert list(pdf_converter.pdf_to_markdown_many.call_args[0][0]) == []
+        repository.save_many.assert_not_called()
+
+    def test_modified_quarantined_documents_are_released(
+        self,
+        use_case: DataExtractionUseCase,
+        quarantine_repository: MagicMock,
+        repository: MagicMock,
+        quarantined_fixture: QuarantinedDocument,
+    ) -> None:
+        """Ensures a quarantined document is converted again once modified, and released when saved."""
+        quarantine_repository.find_all.return_value = [
+            replace(quarantined_fixture, modified_at=datetime.fromisoformat('2020-01-01T00:00:00+01:00'))
+        ]
+
+        use_case()
+
+        repository.save_many.assert_called_once()
+        quarantine_repository.delete.assert_called_once_with('abc-123')
+
+    def test_incremental_download_treats_quarantined_versions_as_synchronized(
+        self,
+        use_case: DataExtractionUseCase,
+        content_provider: MagicMock,
+        quarantine_repository: MagicMock,
+        quarantined_fixture: QuarantinedDocument,
+    ) -> None:
+        """Ensures the content provider is told to skip the quarantined versions."""
+        quarantine_repository.find_all.return_value = [quarantined_fixture]
+
+        use_case(incremental=True)
+
+        checkpoint: SyncCheckpoint = content_provider.fetch.call_args[0][0]
+        assert checkpoint.versions['abc-123'] == quarantined_fixture.modified_at
+
+    def test_pdf_documents_are_archived_when_configured(
+        self,
+        mocker: MockerFixture,
+        content_provider: MagicMock,
+        repository: MagicMock,
+        watermark_repository: MagicMock,
+        quarantine_repository: MagicMock,
+        pdf_converter: MagicMock,
+        html_converter: MagicMock,
+        settings: RagSettings,
+        logger: MagicMock,
+        document_fixture: dict[str, Any],
+    ) -> None:
+        """Ensures the downloaded PDF is archived by document version, and archive failures do not stop the run."""
+        archive = mocker.create_autospec(SourceArchiveRepositoryPort, instance=True)
+        archive.save.side_effect = Exception('Archive error')
+
+        use_case = DataExtractionUseCase(
+            content_provider=content_provider,
+            repository=repository,
+            watermark_repository=watermark_repository,
+            quarantine_repository=quarantine_repository,
+            converter=pdf_converter,
+            html_converter=html_converter,
+            settings=settings,
+            logger=logger,
+            archive=archive,
+        )
+
+        use_case()
+
+        archive.save.assert_called_once_with(
+            document_fixture['id'], document_fixture['modified_at'], document_fixture['content']
+        )
+        logger.warning.assert_called_once_with('Error archiving document. [id=abc-123] - Archive error')
+        repository.save_many.assert_called_once()
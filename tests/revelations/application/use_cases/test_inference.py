@@ -6,7 +6,7 @@ import pytest
 
 from rebelist.revelations.application.use_cases.inference import InferenceUseCase
 from rebelist.revelations.config.settings import RagSettings
-from rebelist.revelations.domain import ChatAdapterPort, ContextDocument, ContextReaderPort, Response
+from rebelist.revelations.domain import ChatAdapterPort, ContextDocument, ContextFilter, ContextReaderPort, Response
 from rebelist.revelations.domain.services import LoggerPort
 
 
@@ -69,11 +69,28 @@ class TestInferenceUseCase:
 
         result = use_case(query)
 
-        cast(MagicMock, mock_context_reader.search).assert_called_once_with(query, 20)
+        cast(MagicMock, mock_context_reader.search).assert_called_once_with(query, 20, None)
         cast(MagicMock, mock_chat_adapter.answer).assert_called_once_with(query, document_fixtures)
 
         assert result is response_fixture
 
+    def test_call_passes_filter_to_context_reader(
+        self,
+        rag_settings_fixture: RagSettings,
+        mock_context_reader: ContextReaderPort,
+        mock_chat_adapter: ChatAdapterPort[Iterator[str]],
+    ) -> None:
+        """Tests that the search is restricted to the documents matching the filter."""
+        mock_logger = create_autospec(LoggerPort)
+        use_case = InferenceUseCase(mock_context_reader, mock_chat_adapter, rag_settings_fixture, mock_logger)
+        context_filter = ContextFilter(spaces=('DOCS',))
+
+        use_case('What is quantum entanglement?', context_filter)
+
+        cast(MagicMock, mock_context_reader.search).assert_called_once_with(
+            'What is quantum entanglement?', 20, context_filter
+        )
+
     def test_error_in_context_reader_is_handled(
         self,
         mock_chat_adapter: ChatAdapterPort[Iterator[str]],
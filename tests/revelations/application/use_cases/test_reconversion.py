@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from rebelist.revelations.application.use_cases.reconversion import DataReconversionUseCase
+from rebelist.revelations.domain import Document, DocumentRepositoryPort, SourceArchiveRepositoryPort
+from rebelist.revelations.domain.exceptions import DocumentConverterError
+from rebelist.revelations.domain.services import LoggerPort, PdfConverterPort
+
+
+class TestDataReconversionUseCase:
+    @pytest.fixture
+    def documents_fixture(self) -> list[Document]:
+        """Provides stored documents loaded without their content."""
+        return [
+            Document(
+                id=index,
+                title=f'Document {index}',
+                content='',
+                modified_at=datetime.fromisoformat('2020-11-12T09:04:47.054+01:00'),
+                raw='{}',
+                url=f'https://example.com/{index}',
+            )
+            for index in range(1, 4)
+        ]
+
+    @pytest.fixture
+    def repository(self, mocker: MockerFixture, documents_fixture: list[Document]) -> MagicMock:
+        """Mocks the document repository."""
+        repository = mocker.create_autospec(DocumentRepositoryPort, instance=True)
+        repository.find_all.return_value = documents_fixture
+        return repository
+
+    @pytest.fixture
+    def archive(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the source archive, holding the PDF of every document but the last one."""
+        archive = mocker.create_autospec(SourceArchiveRepositoryPort, instance=True)
+
+        def find(document_id: int | str, modified_at: datetime) -> bytes | None:
+            return None if document_id == 3 else f'%PDF {document_id}'.encode()
+
+        archive.find.side_effect = find
+        return archive
+
+    @pytest.fixture
+    def pdf_converter(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks PDF conversion into Markdown."""
+        converter = mocker.create_autospec(PdfConverterPort, instance=True)
+
+        def convert(items: Iterable[tuple[Any, bytes]]) -> Iterator[tuple[Any, str]]:
+            return ((key, f'# {data.decode()}') for key, data in items)
+
+        converter.pdf_to_markdown_many.side_effect = convert
+        return converter
+
+    @pytest.fixture
+    def logger(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the logger used by the use case."""
+        return mocker.create_autospec(LoggerPort, instance=True)
+
+    @pytest.fixture
+    def use_case(
+        self, repository: MagicMock, archive: MagicMock, pdf_converter: MagicMock, logger: MagicMock
+    ) -> DataReconversionUseCase:
+        """Creates the DataReconversionUseCase with all dependencies wired."""
+        return DataReconversionUseCase(repository, archive, pdf_converter, logger)
+
+    def test_archived_documents_are_converted_and_saved(
+        self, use_case: DataReconversionUseCase, repository: MagicMock, logger: MagicMock
+    ) -> None:
+        """Ensures the stored documents get the content converted from their archived PDF."""
+        use_case()
+
+        repository.find_all.assert_called_once_with(fields=DataReconversionUseCase.KEPT_FIELDS)
+        saved: list[Document] = repository.save_many.call_args[0][0]
+        assert [(document.id, document.content) for document in saved] == [(1, '# %PDF 1'), (2, '# %PDF 2')]
+        assert saved[0].title == 'Document 1'
+        logger.info.assert_any_call('Skipping document without archive. [id=3]')
+        logger.info.assert_any_call('Total documents reconverted successfully: 2')
+
+    def test_documents_are_saved_in_batches(
+        self, repository: MagicMock, archive: MagicMock, pdf_converter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Ensures reconverted documents are written in batches of the configured size."""
+        DataReconversionUseCase(repository, archive, pdf_converter, logger, batch_size=1)()
+
+        assert repository.save_many.call_count == 2
+
+    def test_conversion_errors_keep_the_stored_content(
+        self, use_case: DataReconversionUseCase, repository: MagicMock, pdf_converter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Ensures documents failing to convert are logged and not saved."""
+
+        def convert(items: Iterable[tuple[Any, bytes]]) -> Iterator[tuple[Any, str | Exception]]:
+            return ((key, DocumentConverterError('Broken PDF')) for key, _ in items)
+
+        pdf_converter.pdf_to_markdown_many.side_effect = convert
+
+        use_case()
+
+        repository.save_many.assert_not_called()
+        logger.error.assert_any_call('Error reconverting document. [id=1] - Broken PDF')
@@ -0,0 +1,151 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import IO
+from unittest.mock import MagicMock
+from zipfile import ZipFile
+
+import pytest
+from pytest_mock import MockerFixture
+
+from rebelist.revelations.application.use_cases import DatasetRestoreUseCase, DatasetSnapshotUseCase
+from rebelist.revelations.application.use_cases.snapshot import DatasetArchive
+from rebelist.revelations.domain import DocumentRepositoryPort, SnapshotPort
+from rebelist.revelations.domain.services import LoggerPort
+
+
+@pytest.fixture
+def logger(mocker: MockerFixture) -> MagicMock:
+    """Mocks the logger."""
+    return mocker.create_autospec(LoggerPort, instance=True)
+
+
+@pytest.fixture
+def repository(mocker: MockerFixture) -> MagicMock:
+    """Mocks the repository of the stored documents."""
+    repository = mocker.create_autospec(DocumentRepositoryPort, instance=True)
+    repository.unmark_indexed.return_value = 0
+    return repository
+
+
+@pytest.fixture
+def document_snapshot(mocker: MockerFixture) -> MagicMock:
+    """Mocks the snapshot of the stored documents, exporting fixed bytes."""
+    snapshot = mocker.create_autospec(SnapshotPort, instance=True)
+
+    def export(target: IO[bytes]) -> None:
+        target.write(b'documents')
+
+    snapshot.export.side_effect = export
+    return snapshot
+
+
+@pytest.fixture
+def context_snapshot(mocker: MockerFixture) -> MagicMock:
+    """Mocks the snapshot of the context collection, exporting fixed bytes."""
+    snapshot = mocker.create_autospec(SnapshotPort, instance=True)
+
+    def export(target: IO[bytes]) -> None:
+        target.write(b'context')
+
+    snapshot.export.side_effect = export
+    return snapshot
+
+
+class TestDatasetSnapshotUseCase:
+    def test_writes_every_store_to_archive(
+        self, tmp_path: Path, document_snapshot: MagicMock, context_snapshot: MagicMock, logger: MagicMock
+    ) -> None:
+        """It should write one archive entry per store along with a versioned manifest."""
+        path = tmp_path / 'dataset.zip'
+
+        DatasetSnapshotUseCase(document_snapshot, context_snapshot, logger)(path)
+
+        with ZipFile(path) as archive:
+            assert archive.read(DatasetArchive.DOCUMENTS) == b'documents'
+            assert archive.read(DatasetArchive.CONTEXT) == b'context'
+            assert json.loads(archive.read(DatasetArchive.MANIFEST))['version'] == DatasetArchive.VERSION
+        logger.info.assert_called_once()
+
+
+class TestDatasetRestoreUseCase:
+    def test_restores_context_before_documents(
+        self,
+        tmp_path: Path,
+        document_snapshot: MagicMock,
+        context_snapshot: MagicMock,
+        repository: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """It should restore each store from its archive entry, the context collection first."""
+        path = tmp_path / 'dataset.zip'
+        DatasetSnapshotUseCase(document_snapshot, context_snapshot, logger)(path)
+        restored: list[tuple[str, bytes]] = []
+
+        def restore_context(source: IO[bytes]) -> None:
+            restored.append(('context', source.read()))
+
+        def restore_documents(source: IO[bytes]) -> None:
+            restored.append(('documents', source.read()))
+
+        context_snapshot.restore.side_effect = restore_context
+        document_snapshot.restore.side_effect = restore_documents
+
+        DatasetRestoreUseCase(document_snapshot, context_snapshot, repository, logger)(path)
+
+        assert restored == [('context', b'context'), ('documents', b'documents')]
+
+    def test_stored_documents_are_unmarked_before_archived_ones_are_restored(
+        self,
+        tmp_path: Path,
+        document_snapshot: MagicMock,
+        context_snapshot: MagicMock,
+        repository: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """It should forget the indexed hashes of the stored documents once the collection is replaced.
+
+        Stored documents missing from the archive are then indexed again, while the archived ones bring back their own.
+        """
+        path = tmp_path / 'dataset.zip'
+        DatasetSnapshotUseCase(document_snapshot, context_snapshot, logger)(path)
+        steps: list[str] = []
+
+        def restore_context(source: IO[bytes]) -> None:
+            steps.append('context')
+
+        def unmark_indexed(indexed_since: datetime | None = None) -> int:
+            steps.append('unmark')
+            return 5
+
+        def restore_documents(source: IO[bytes]) -> None:
+            steps.append('documents')
+
+        context_snapshot.restore.side_effect = restore_context
+        repository.unmark_indexed.side_effect = unmark_indexed
+        document_snapshot.restore.side_effect = restore_documents
+
+        DatasetRestoreUseCase(document_snapshot, context_snapshot, repository, logger)(path)
+
+        assert steps == ['context', 'unmark', 'documents']
+        repository.unmark_indexed.assert_called_once_with()
+
+    def test_rejects_unsupported_version(
+        self,
+        tmp_path: Path,
+        document_snapshot: MagicMock,
+        context_snapshot: MagicMock,
+        repository: MagicMock,
+        logger: MagicMock,
+    ) -> None:
+        """It should refuse an archive of another version without restoring anything."""
+        path = tmp_path / 'dataset.zip'
+        with ZipFile(path, 'w') as archive:
+            archive.writestr(DatasetArchive.MANIFEST, json.dumps({'version': DatasetArchive.VERSION + 1}))
+
+        with pytest.raises(ValueError, match='Unsupported dataset snapshot version'):
+            DatasetRestoreUseCase(document_snapshot, context_snapshot, repository, logger)(path)
+
+        context_snapshot.restore.assert_not_called()
+        repository.unmark_indexed.assert_not_called()
+        document_snapshot.restore.assert_not_called()
@@ -2,7 +2,7 @@ from datetime import datetime
 
 import pytest
 
-from rebelist.revelations.domain.models import ContextDocument, Document
+from rebelist.revelations.domain.models import ContextDocument, Document, SyncCheckpoint
 
 
 class TestDocument:
@@ -71,3 +71,14 @@ class TestContextDocument:
         assert document.title == 'Test Context'
         assert document.content == 'Test Content'
         assert document.modified_at == modified_at
+
+
+class TestSyncCheckpoint:
+    def test_is_outdated(self) -> None:
+        """Test documents are outdated when missing or older than the given version."""
+        stored_at = datetime(2024, 2, 15, 10, 30, 0)
+        checkpoint = SyncCheckpoint(watermarks={}, versions={'1': stored_at})
+
+        assert checkpoint.is_outdated(1, datetime(2024, 2, 16)) is True
+        assert checkpoint.is_outdated('1', stored_at) is False
+        assert checkpoint.is_outdated(2, stored_at) is True
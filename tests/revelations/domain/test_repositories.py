@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Iterable
+from typing import Iterable, Mapping
 
 import pytest
 
@@ -24,12 +24,30 @@ class TestDocumentRepositoryPort:
         """Tests that the find_all abstract method correctly returns an iterable of documents."""
 
         class MockDocumentRepository(DocumentRepositoryPort):
-            def find_all(self) -> Iterable[Document]:
+            def find_all(
+                self,
+                modified_since: datetime | None = None,
+                ids: Iterable[int | str] | None = None,
+                fields: Iterable[str] | None = None,
+                unindexed: bool = False,
+            ) -> Iterable[Document]:
                 return [mock_document]
 
+            def find_versions(self) -> Mapping[str, datetime]:
+                return {}
+
             def save(self, document: Document) -> None:
                 pass
 
+            def save_many(self, documents: Iterable[Document]) -> None:
+                pass
+
+            def mark_indexed(self, document: Document) -> None:
+                pass
+
+            def unmark_indexed(self, indexed_since: datetime | None = None) -> int:
+                return 0
+
         repository = MockDocumentRepository()
         result = list(repository.find_all())
 
@@ -42,11 +60,29 @@ class TestDocumentRepositoryPort:
         """Tests that the save abstract method can be called without raising exceptions."""
 
         class MockDocumentRepository(DocumentRepositoryPort):
-            def find_all(self) -> Iterable[Document]:
+            def find_all(
+                self,
+                modified_since: datetime | None = None,
+                ids: Iterable[int | str] | None = None,
+                fields: Iterable[str] | None = None,
+                unindexed: bool = False,
+            ) -> Iterable[Document]:
                 return []
 
+            def find_versions(self) -> Mapping[str, datetime]:
+                return {}
+
             def save(self, document: Document) -> None:
                 pass
 
+            def save_many(self, documents: Iterable[Document]) -> None:
+                pass
+
+            def mark_indexed(self, document: Document) -> None:
+                pass
+
+            def unmark_indexed(self, indexed_since: datetime | None = None) -> int:
+                return 0
+
         repository = MockDocumentRepository()
         repository.save(mock_document)
@@ -44,3 +44,11 @@ class TestNumber:
         result = Number.prettify(100, Number.Scale.PERCENT)
 
         assert result == '[green]100'
+
+    @pytest.mark.parametrize(
+        'value, expected',
+        [(0, '0 B'), (1023, '1023 B'), (1536, '1.5 KiB'), (5 * 1024**3, '5.0 GiB'), (2 * 1024**4, '2.0 TiB')],
+    )
+    def test_humanize_bytes_picks_largest_unit(self, value: int, expected: str) -> None:
+        """Tests that byte counts are formatted with the largest binary unit keeping them at least one."""
+        assert Number.humanize_bytes(value) == expected
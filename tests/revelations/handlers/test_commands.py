@@ -1,3 +1,5 @@
+from datetime import UTC, datetime
+from pathlib import Path
 from types import SimpleNamespace
 from typing import cast
 from unittest.mock import patch
@@ -7,14 +9,28 @@ from click import Command
 from click.testing import CliRunner
 from pytest_mock import MockerFixture
 
-from rebelist.revelations.domain.models import BenchmarkScore, FidelityScore, RetrievalScore
+from rebelist.revelations.domain.models import (
+    BenchmarkScore,
+    ContextFilter,
+    FidelityScore,
+    QuantizationScore,
+    QuarantinedDocument,
+    RetrievalScore,
+)
 from rebelist.revelations.handlers.commands import (
     benchmark,
     chat,
     dataset_download,
     dataset_index,
     dataset_initialize,
+    dataset_prune,
+    dataset_quarantine,
+    dataset_restore,
+    dataset_rollback,
+    dataset_snapshot,
+    dataset_stats,
 )
+from rebelist.revelations.infrastructure.qdrant import StorageUsage
 
 
 @pytest.fixture
@@ -34,6 +50,14 @@ def fake_container(mocker: MockerFixture):
     qdrant = mocker.MagicMock()
     qdrant.collection_exists.return_value = False
 
+    collections = mocker.MagicMock()
+    collections.rollback.return_value = 'context_docs_20240101000000'
+    collections.prune.return_value = ['context_docs_20230101000000']
+    collections.replaced_at.return_value = datetime(2024, 2, 1, tzinfo=UTC)
+
+    documents = mocker.MagicMock()
+    documents.unmark_indexed.return_value = 3
+
     retrieval = RetrievalScore(ndcg=0.1, mrr=0.23, keyword_coverage=20, saturation_at_k=0.4)
     fidelity = FidelityScore(accuracy=1, feedback='Nothing.', completeness=0.2, relevance=0.3)
 
@@ -41,12 +65,26 @@ def fake_container(mocker: MockerFixture):
         settings=lambda: settings,
         database=lambda: mongo,
         qdrant_client=lambda: qdrant,
+        qdrant_collections=lambda: collections,
+        document_repository=lambda: documents,
         data_extraction_use_case=lambda: mocker.MagicMock(),
+        quarantine_repository=lambda: mocker.MagicMock(find_all=lambda: []),
         data_embedding_use_case=lambda: mocker.MagicMock(),
         inference_use_case=lambda: mocker.MagicMock(return_value=mocker.Mock(answer='Answer', documents=[])),
         benchmark_use_case=lambda: mocker.MagicMock(
             return_value=BenchmarkScore(retrieval=retrieval, fidelity=fidelity)
         ),
+        storage_inspector=lambda: mocker.MagicMock(
+            inspect=lambda: [
+                StorageUsage('Dense vectors', 0, 3 * 1024**3),
+                StorageUsage('Payloads', 512, 0),
+            ]
+        ),
+        quantization_benchmark_use_case=lambda: mocker.MagicMock(
+            return_value=QuantizationScore(recall=0.95, quantized_latency_ms=4.25, original_latency_ms=12.5)
+        ),
+        dataset_snapshot_use_case=lambda: mocker.MagicMock(),
+        dataset_restore_use_case=lambda: mocker.MagicMock(),
     )
 
 
@@ -66,6 +104,40 @@ class TestCLICommands:
         assert result.exit_code == 0
         assert 'successfully pulled' in result.output.lower()
 
+    def test_dataset_download_incremental(self, mocker: MockerFixture, fake_container: SimpleNamespace):
+        """Test dataset:download --incremental runs its use case in incremental mode."""
+        use_case = mocker.MagicMock()
+        fake_container.data_extraction_use_case = lambda: use_case
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_download), ['--incremental'], obj=fake_container)
+        assert result.exit_code == 0
+        use_case.assert_called_once_with(incremental=True)
+
+    def test_dataset_quarantine_lists_documents(self, mocker: MockerFixture, fake_container: SimpleNamespace):
+        """Test dataset:quarantine prints the quarantined documents."""
+        document = QuarantinedDocument(
+            id='123',
+            title='Huge page',
+            size=2048,
+            error='Timed out',
+            modified_at=datetime(2024, 2, 15, 10, 30),
+            quarantined_at=datetime(2024, 2, 16, 8, 0),
+        )
+        fake_container.quarantine_repository = lambda: mocker.MagicMock(find_all=lambda: [document])
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_quarantine), obj=fake_container)
+        assert result.exit_code == 0
+        assert 'Huge page' in result.output
+        assert '2.0 KiB' in result.output
+        assert 'Timed out' in result.output
+
+    def test_dataset_quarantine_without_documents(self, fake_container: SimpleNamespace):
+        """Test dataset:quarantine reports an empty quarantine."""
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_quarantine), obj=fake_container)
+        assert result.exit_code == 0
+        assert 'No documents are quarantined.' in result.output
+
     def test_dataset_index_runs_successfully(self, fake_container: SimpleNamespace):
         """Test dataset:index calls its use case."""
         runner = CliRunner()
@@ -97,3 +169,115 @@ class TestCLICommands:
         assert 'Accuracy                       │           1.0' in result.output
         assert 'Completeness                   │           0.2' in result.output
         assert 'Relevance                      │           0.3' in result.output
+
+    def test_benchmark_quantization_runs_successfully(self, fake_container: SimpleNamespace):
+        """Test benchmark --quantization calls its use case."""
+        runner = CliRunner()
+        result = runner.invoke(
+            cast(Command, benchmark),
+            ['--dataset', 'tests/data/benchmark.mini.dataset.jsonl', '--quantization'],
+            obj=fake_container,
+        )
+
+        assert result.exit_code == 0
+        assert 'Recall' in result.output
+        assert '12.5' in result.output
+        assert 'Mean Reciprocal Rank' not in result.output
+
+    def test_dataset_stats_prints_resident_and_on_disk_bytes(self, fake_container: SimpleNamespace):
+        """Test dataset:stats prints the storage of every component along with the totals."""
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_stats), obj=fake_container)
+
+        assert result.exit_code == 0
+        assert 'Dense vectors' in result.output
+        assert '3.0 GiB' in result.output
+        assert '512 B' in result.output
+        assert 'Total' in result.output
+
+    def test_chat_filters_by_space_and_date(self, mocker: MockerFixture, fake_container: SimpleNamespace):
+        """Test chat --space --since restricts every question to the matching documents."""
+        mocker.patch('rebelist.revelations.handlers.commands.prompt', side_effect=['Who?', 'exit'])
+        use_case = mocker.MagicMock(return_value=mocker.Mock(answer='Answer', documents=[]))
+        fake_container.inference_use_case = lambda: use_case
+
+        runner = CliRunner()
+        result = runner.invoke(
+            cast(Command, chat), ['--space', 'DOCS', '--space', 'TEAM', '--since', '2024-01-01'], obj=fake_container
+        )
+
+        assert result.exit_code == 0
+        use_case.assert_called_once_with(
+            'Who?', ContextFilter(spaces=('DOCS', 'TEAM'), modified_after=datetime(2024, 1, 1))
+        )
+
+    def test_dataset_initialize_serves_collection(self, mocker: MockerFixture, fake_container: SimpleNamespace):
+        """Test dataset:initialize --drop drops the collections before serving a new one."""
+        mocker.patch('rebelist.revelations.handlers.commands.snapshot_download')
+        collections = fake_container.qdrant_collections()
+
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_initialize), ['--drop'], input='y\n', obj=fake_container)
+
+        assert result.exit_code == 0
+        collections.drop.assert_called_once_with()
+        collections.initialize.assert_called_once_with()
+
+    def test_dataset_index_rebuild(self, mocker: MockerFixture, fake_container: SimpleNamespace):
+        """Test dataset:index --rebuild runs its use case in rebuild mode."""
+        use_case = mocker.MagicMock()
+        fake_container.data_embedding_use_case = lambda: use_case
+
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_index), ['--rebuild'], obj=fake_container)
+
+        assert result.exit_code == 0
+        use_case.assert_called_once_with(full=False, bulk=False, rebuild=True)
+
+    def test_dataset_rollback_serves_previous_collection(self, fake_container: SimpleNamespace):
+        """Test dataset:rollback reports the collection served again."""
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_rollback), obj=fake_container)
+
+        assert result.exit_code == 0
+        assert 'context_docs_20240101000000' in result.output
+        fake_container.qdrant_collections().replaced_at.assert_called_once_with('context_docs_20240101000000')
+        fake_container.document_repository().unmark_indexed.assert_called_once_with(datetime(2024, 2, 1, tzinfo=UTC))
+        assert 'index again the 3 documents indexed since it was replaced' in result.output
+
+    def test_dataset_prune_keeps_requested_collections(self, fake_container: SimpleNamespace):
+        """Test dataset:prune passes the number of collections to keep."""
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_prune), ['--keep', '2'], obj=fake_container)
+
+        assert result.exit_code == 0
+        fake_container.qdrant_collections().prune.assert_called_once_with(2)
+        assert '1 collections have been deleted' in result.output
+
+    def test_dataset_snapshot_writes_archive(self, fake_container: SimpleNamespace, tmp_path: Path):
+        """Test dataset:snapshot passes the archive path to the use case."""
+        use_case = fake_container.dataset_snapshot_use_case()
+        fake_container.dataset_snapshot_use_case = lambda: use_case
+        archive = tmp_path / 'dataset.zip'
+
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_snapshot), ['--archive', str(archive)], obj=fake_container)
+
+        assert result.exit_code == 0
+        use_case.assert_called_once_with(archive)
+        assert 'successfully saved' in result.output
+
+    def test_dataset_restore_reports_errors(self, fake_container: SimpleNamespace, tmp_path: Path):
+        """Test dataset:restore reports a failed restore."""
+        use_case = fake_container.dataset_restore_use_case()
+        use_case.side_effect = ValueError('Unsupported dataset snapshot version: 2')
+        fake_container.dataset_restore_use_case = lambda: use_case
+        archive = tmp_path / 'dataset.zip'
+        archive.write_bytes(b'')
+
+        runner = CliRunner()
+        result = runner.invoke(cast(Command, dataset_restore), ['--archive', str(archive)], obj=fake_container)
+
+        assert result.exit_code == 0
+        use_case.assert_called_once_with(archive)
+        assert 'Error restoring the dataset snapshot' in result.output
@@ -1,4 +1,5 @@
 from datetime import datetime
+from threading import Event
 from typing import Any
 from unittest.mock import MagicMock, call
 
@@ -7,6 +8,7 @@ from atlassian import Confluence
 from pytest_mock import MockerFixture
 
 from rebelist.revelations.config.settings import ConfluenceSettings
+from rebelist.revelations.domain import SourceFormat, SyncCheckpoint
 from rebelist.revelations.infrastructure.confluence.adapters import ConfluenceGateway
 
 
@@ -49,16 +51,21 @@ class TestConfluenceGateway:
     def test_fetch_yields_transformed_documents(self, mock_client: MagicMock, document_fixtures: list[dict[str, Any]]):
         """Test fetch documents."""
         mock_logger = MagicMock()
-        settings = ConfluenceSettings(spaces=('DOCS',), throttle_delay_seconds=0)
+        settings = ConfluenceSettings(spaces=('DOCS',))
         gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
         results = list(gateway.fetch())
 
         assert len(results) == len(document_fixtures)
 
+        # Pages are yielded in completion order
+        results = sorted(results, key=lambda result: result['id'])
+
         for i, result in enumerate(results):
             expected = document_fixtures[i]
             assert result['id'] == expected['id']
             assert result['title'] == expected['title']
+            assert result['space'] == 'DOCS'
+            assert result['format'] == SourceFormat.PDF
             assert result['content'] == 'random'.encode('utf-8')
             assert result['url'] == mock_client.url + expected['_links']['tinyui']
             assert result['raw'] == expected
@@ -70,10 +77,24 @@ class TestConfluenceGateway:
             'DOCS', expand='body.export_view,history.lastUpdated', status='current'
         )
 
+    def test_fetch_html_space_uses_export_view(self, mock_client: MagicMock, document_fixtures: list[dict[str, Any]]):
+        """Test pages of HTML spaces carry their export view instead of being rendered as PDF."""
+        mock_logger = MagicMock()
+        settings = ConfluenceSettings(spaces=('DOCS',), html_spaces=('DOCS',))
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
+
+        results = sorted(gateway.fetch(), key=lambda result: result['id'])
+
+        assert [result['format'] for result in results] == [SourceFormat.HTML, SourceFormat.HTML]
+        assert [result['content'] for result in results] == [
+            document['body']['export_view']['value'] for document in document_fixtures
+        ]
+        mock_client.get_page_as_pdf.assert_not_called()
+
     def test_fetch_with_corrupted_document(self, mock_client: MagicMock):
         """Test fetch documents."""
         mock_logger = MagicMock()
-        settings = ConfluenceSettings(spaces=('DOCS',), throttle_delay_seconds=0)
+        settings = ConfluenceSettings(spaces=('DOCS',))
         gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
 
         documents = [
@@ -88,7 +109,7 @@ class TestConfluenceGateway:
 
         mock_client.get_all_pages_from_space_as_generator.return_value = documents
 
-        assert list(gateway.fetch()) == []
+        assert list(gateway.fetch()) == [{'id': '123', 'space': 'DOCS', 'error': "'title'"}]
 
         mock_client.get_page_as_pdf.assert_called_once_with('123')
         mock_client.get_all_pages_from_space_as_generator.assert_called_once_with(
@@ -96,3 +117,92 @@ class TestConfluenceGateway:
         )
 
         mock_logger.error.assert_called_once_with("Processing document failed [id=123] - 'title'")
+
+    def test_fetch_yields_pages_as_they_complete(self, mock_client: MagicMock, document_fixtures: list[dict[str, Any]]):
+        """Test a slow export does not hold back the pages queued after it."""
+        release = Event()
+
+        def get_page_as_pdf(page_id: str) -> bytes:
+            if page_id == '123':
+                assert release.wait(timeout=5)
+            return page_id.encode('utf-8')
+
+        mock_client.get_page_as_pdf.side_effect = get_page_as_pdf
+        settings = ConfluenceSettings(spaces=('DOCS',), max_workers=2)
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=MagicMock())
+
+        pages = gateway.fetch()
+
+        assert next(pages)['id'] == '456'
+        release.set()
+        assert next(pages)['id'] == '123'
+
+    def test_fetch_bounds_the_queued_pages(self, mock_client: MagicMock, document_fixtures: list[dict[str, Any]]):
+        """Test pages are streamed across spaces through the bounded queue."""
+        settings = ConfluenceSettings(spaces=('DOCS', 'TEAM'), batch_size=1)
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=MagicMock())
+
+        results = list(gateway.fetch())
+
+        assert [result['space'] for result in results] == ['DOCS', 'DOCS', 'TEAM', 'TEAM']
+        assert mock_client.get_page_as_pdf.call_count == 2 * len(document_fixtures)
+
+    def test_fetch_with_checkpoint_skips_unchanged_documents(self, mock_client: MagicMock):
+        """Test pages not newer than their stored version are not exported."""
+        mock_logger = MagicMock()
+        settings = ConfluenceSettings(spaces=('DOCS',))
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
+        checkpoint = SyncCheckpoint(
+            watermarks={}, versions={'123': datetime.fromisoformat('2020-11-12T09:04:47.054+01:00')}
+        )
+
+        results = list(gateway.fetch(checkpoint))
+
+        assert [result['id'] for result in results] == ['456']
+        mock_client.get_page_as_pdf.assert_called_once_with('456')
+        mock_logger.info.assert_called_once_with('Skipped 1 unchanged pages. [space=DOCS]')
+
+    def test_fetch_with_watermark_searches_modified_pages(
+        self, mock_client: MagicMock, document_fixtures: list[dict[str, Any]]
+    ):
+        """Test spaces with a watermark are queried with CQL instead of being enumerated."""
+        mock_logger = MagicMock()
+        settings = ConfluenceSettings(spaces=('DOCS',), delta_overlap_hours=1)
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
+        mock_client.cql.side_effect = [
+            {'results': [{'content': document_fixtures[0]}], '_links': {'next': '/rest/api/search?start=1'}},
+            {'results': [{'content': document_fixtures[1]}], '_links': {}},
+        ]
+        checkpoint = SyncCheckpoint(
+            watermarks={'DOCS': datetime.fromisoformat('2020-11-12T09:00:00+01:00')},
+            versions={'456': datetime.fromisoformat('2020-11-12T09:04:47.054+01:00')},
+        )
+
+        results = list(gateway.fetch(checkpoint))
+
+        assert [result['id'] for result in results] == ['123']
+        mock_client.get_all_pages_from_space_as_generator.assert_not_called()
+        mock_client.cql.assert_has_calls(
+            [
+                call(
+                    'space = "DOCS" and type = page and lastmodified > "2020-11-12 07:00"',
+                    start=start,
+                    limit=ConfluenceGateway.SEARCH_LIMIT,
+                    expand='content.history.lastUpdated',
+                    excerpt='none',
+                )
+                for start in (0, 1)
+            ]
+        )
+
+    def test_fetch_with_watermark_and_delta_query_disabled_enumerates_space(self, mock_client: MagicMock):
+        """Test the whole space is enumerated when the delta query is disabled."""
+        mock_logger = MagicMock()
+        settings = ConfluenceSettings(spaces=('DOCS',), delta_query=False)
+        gateway = ConfluenceGateway(client=mock_client, settings=settings, logger=mock_logger)
+        checkpoint = SyncCheckpoint(
+            watermarks={'DOCS': datetime.fromisoformat('2020-11-12T09:00:00+01:00')}, versions={}
+        )
+
+        assert len(list(gateway.fetch(checkpoint))) == 2
+        mock_client.cql.assert_not_called()
@@ -0,0 +1,147 @@
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from requests import Response, Session
+
+from rebelist.revelations.infrastructure.confluence.limiters import AdaptiveRateLimiter, RateLimitedSession
+
+
+def make_response(status_code: int, headers: dict[str, str] | None = None) -> Response:
+    """Builds a response with the given status and headers."""
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = BytesIO()
+    return response
+
+
+class TestAdaptiveRateLimiter:
+    """Tests for the AdaptiveRateLimiter class."""
+
+    @pytest.fixture
+    def clock(self, mocker: MockerFixture) -> MagicMock:
+        """Freezes the limiter clock and records its sleeps."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.confluence.limiters.time')
+        clock.monotonic.return_value = 100.0
+        return clock
+
+    def test_invalid_limits_raise(self) -> None:
+        """Test the rate must lie between the minimum and maximum rates."""
+        with pytest.raises(ValueError, match='Rate limits must satisfy'):
+            AdaptiveRateLimiter(rate=10, min_rate=1, max_rate=5)
+
+    def test_successful_responses_increase_the_rate(self, clock: MagicMock) -> None:
+        """Test the rate grows additively up to the maximum rate."""
+        limiter = AdaptiveRateLimiter(rate=1.0, min_rate=0.5, max_rate=1.15)
+
+        limiter.observe(make_response(200))
+        assert limiter.rate == pytest.approx(1.1)
+
+        limiter.observe(make_response(200))
+        assert limiter.rate == pytest.approx(1.15)
+
+    def test_overloaded_responses_decrease_the_rate(self, clock: MagicMock) -> None:
+        """Test the rate is cut multiplicatively down to the minimum rate."""
+        limiter = AdaptiveRateLimiter(rate=4.0, min_rate=1.5, max_rate=10.0)
+
+        limiter.observe(make_response(429))
+        assert limiter.rate == pytest.approx(2.0)
+
+        limiter.observe(make_response(200, {'X-RateLimit-NearLimit': 'true'}))
+        assert limiter.rate == pytest.approx(1.5)
+
+    def test_advertised_rate_caps_the_rate(self, clock: MagicMock) -> None:
+        """Test the fill rate advertised by the server bounds the rate."""
+        limiter = AdaptiveRateLimiter(rate=10.0, min_rate=0.5, max_rate=50.0)
+
+        limiter.observe(make_response(200, {'X-RateLimit-FillRate': '30', 'X-RateLimit-Interval-Seconds': '10'}))
+
+        assert limiter.rate == pytest.approx(3.0)
+
+    def test_retry_after_blocks_every_caller(self, clock: MagicMock) -> None:
+        """Test a Retry-After header pauses the callers until it has elapsed."""
+        limiter = AdaptiveRateLimiter(rate=1.0, min_rate=1.0, max_rate=1.0)
+
+        limiter.observe(make_response(429, {'Retry-After': '7'}))
+
+        def sleep(seconds: float) -> None:
+            clock.monotonic.return_value += seconds
+
+        clock.sleep.side_effect = sleep
+        limiter.acquire()
+
+        clock.sleep.assert_called_once_with(7.0)
+
+    def test_acquire_waits_for_a_token(self, clock: MagicMock) -> None:
+        """Test callers are paced at the current rate."""
+        limiter = AdaptiveRateLimiter(rate=2.0, min_rate=1.0, max_rate=2.0)
+
+        def sleep(seconds: float) -> None:
+            clock.monotonic.return_value += seconds
+
+        clock.sleep.side_effect = sleep
+        limiter.acquire()
+        limiter.acquire()
+
+        clock.sleep.assert_called_once_with(0.5)
+
+
+class TestRateLimitedSession:
+    """Tests for the RateLimitedSession class."""
+
+    def test_request_retries_overloaded_responses(self, mocker: MockerFixture) -> None:
+        """Test overloaded requests are retried through the limiter until they succeed."""
+        limiter = mocker.create_autospec(AdaptiveRateLimiter, instance=True)
+        responses = [make_response(429), make_response(200)]
+        send = mocker.patch.object(Session, 'request', side_effect=responses)
+
+        response = RateLimitedSession(limiter, max_retries=3).request('GET', 'https://example.com')
+
+        assert response is responses[1]
+        assert send.call_count == 2
+        assert limiter.acquire.call_count == 2
+        limiter.observe.assert_has_calls([mocker.call(responses[0]), mocker.call(responses[1])])
+
+    def test_request_gives_up_after_max_retries(self, mocker: MockerFixture) -> None:
+        """Test the last response is returned once the retries are exhausted."""
+        limiter = mocker.create_autospec(AdaptiveRateLimiter, instance=True)
+        mocker.patch.object(Session, 'request', side_effect=[make_response(503), make_response(503)])
+
+        response = RateLimitedSession(limiter, max_retries=1).request('GET', 'https://example.com')
+
+        assert response.status_code == 503
+        assert limiter.acquire.call_count == 2
+
+    def test_request_backs_off_on_server_errors(self, mocker: MockerFixture) -> None:
+        """Test server errors the limiter does not slow down on are retried after an exponential capped backoff."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.confluence.limiters.time')
+        limiter = mocker.create_autospec(AdaptiveRateLimiter, instance=True)
+        responses = [make_response(500) for _ in range(6)] + [make_response(200)]
+        mocker.patch.object(Session, 'request', side_effect=responses)
+
+        response = RateLimitedSession(limiter, max_retries=6).request('GET', 'https://example.com')
+
+        assert response.status_code == 200
+        assert [sleep.args[0] for sleep in clock.sleep.call_args_list] == [1.0, 2.0, 4.0, 8.0, 16.0, 30.0]
+
+    def test_request_does_not_back_off_on_overload(self, mocker: MockerFixture) -> None:
+        """Test overloaded requests are only paced by the limiter."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.confluence.limiters.time')
+        limiter = mocker.create_autospec(AdaptiveRateLimiter, instance=True)
+        mocker.patch.object(Session, 'request', side_effect=[make_response(503), make_response(200)])
+
+        RateLimitedSession(limiter, max_retries=3).request('GET', 'https://example.com')
+
+        clock.sleep.assert_not_called()
+
+    def test_request_too_large_is_not_retried(self, mocker: MockerFixture) -> None:
+        """Test a request too large for the server is returned at once."""
+        limiter = mocker.create_autospec(AdaptiveRateLimiter, instance=True)
+        send = mocker.patch.object(Session, 'request', side_effect=[make_response(413)])
+
+        response = RateLimitedSession(limiter, max_retries=3).request('GET', 'https://example.com')
+
+        assert response.status_code == 413
+        assert send.call_count == 1
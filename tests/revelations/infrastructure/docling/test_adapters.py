@@ -1,11 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
 from typing import Any
+from unittest.mock import call
 
+import pypdfium2 as pdfium
 import pytest
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode, TableStructureOptions
 from docling.document_converter import DocumentConverter as DoclingConverter
 from pytest_mock import MockerFixture
 
-from rebelist.revelations.domain.exceptions import DocumentConverterError
-from rebelist.revelations.infrastructure.docling.adapters import PdfConverter
+from rebelist.revelations.config.settings import DoclingSettings
+from rebelist.revelations.domain.exceptions import DocumentConversionAbortedError, DocumentConverterError
+from rebelist.revelations.domain.services import PdfConverterPort
+from rebelist.revelations.infrastructure.docling.adapters import (
+    HtmlConverter,
+    PdfConverter,
+    ProcessPoolPdfConverter,
+    _initialize_worker,  # pyright: ignore[reportPrivateUsage]
+    create_docling_converter,
+    create_pdf_converter,
+    split_pdf,
+)
+from rebelist.revelations.infrastructure.sqlite import SqliteCache
+
+
+class FakePdfConverter(PdfConverterPort):
+    """Converter that decodes the PDF bytes, failing on empty documents, hanging on slow ones and crashing on others."""
+
+    def pdf_to_markdown(self, data: bytes) -> str:
+        """Decodes the data as Markdown."""
+        if not data:
+            raise DocumentConverterError('Empty document')
+        if data == b'slow':
+            time.sleep(1)
+        if data == b'crash':
+            raise BrokenProcessPool('Worker died')
+        if data == b'oom':
+            raise MemoryError('Out of memory')
+        return data.decode('utf-8')
+
+
+class BrokenPdfConverter(PdfConverterPort):
+    """Converter that cannot be created."""
+
+    def __init__(self) -> None:
+        raise ImportError('Missing model')
+
+    def pdf_to_markdown(self, data: bytes) -> str:
+        """Never runs."""
+        return ''
+
+
+class PageCountPdfConverter(PdfConverterPort):
+    """Converter that describes a PDF document by its number of pages."""
+
+    def pdf_to_markdown(self, data: bytes) -> str:
+        """Counts the pages of the document."""
+        return f'{len(pdfium.PdfDocument(data))} pages'
 
 
 class TestPdfConverter:
@@ -41,3 +96,350 @@ class TestPdfConverter:
 
         assert 'Failed to convert PDF to Markdown' in str(excinfo.value)
         assert 'PDF data is corrupted' in str(excinfo.value)
+
+    def test_pdf_to_markdown_many_yields_results_and_errors(self, mocker: MockerFixture):
+        """Test the serial conversion yields every key with its Markdown or its error."""
+        docling = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        result = mocker.Mock()
+        result.document.export_to_markdown.return_value = '## Sample Markdown'
+        docling.convert.side_effect = [result, Exception('Corrupted')]
+
+        converter = PdfConverter(docling)
+        results = dict(converter.pdf_to_markdown_many([('a', b'1'), ('b', b'2')]))
+
+        assert results['a'] == '## Sample Markdown'
+        assert isinstance(results['b'], DocumentConverterError)
+
+    def test_empty_pages_are_converted_with_the_fallback(self, mocker: MockerFixture, mock_pdf_data: bytes):
+        """Test only the pages that look empty are converted again, grouped into consecutive ranges."""
+        fast_pages = {1: 'Page one text', 2: '', 3: ' ', 4: 'Page four text', 5: ''}
+        accurate_pages = {2: 'Scanned two', 3: 'Scanned three', 5: 'Scanned five'}
+
+        def page_markdown(pages: dict[int, str]) -> Any:
+            def export_to_markdown(page_no: int) -> str:
+                return pages[page_no]
+
+            document = mocker.Mock()
+            document.pages = dict.fromkeys(pages)
+            document.export_to_markdown.side_effect = export_to_markdown
+            return mocker.Mock(document=document)
+
+        fast = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        fast.convert.return_value = page_markdown(fast_pages)
+        accurate = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        accurate.convert.return_value = page_markdown(accurate_pages)
+
+        markdown = PdfConverter(fast, accurate, min_page_chars=5).pdf_to_markdown(mock_pdf_data)
+
+        assert markdown == 'Page one text\n\nScanned two\n\nScanned three\n\nPage four text\n\nScanned five'
+        assert [convert.kwargs['page_range'] for convert in accurate.convert.call_args_list] == [(2, 3), (5, 5)]
+
+    def test_fallback_is_skipped_when_no_page_is_empty(self, mocker: MockerFixture, mock_pdf_data: bytes):
+        """Test the fallback converter is never used when every page has enough text."""
+        fast = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        document = fast.convert.return_value.document
+        document.pages = {1: None}
+        document.export_to_markdown.return_value = '## Sample Markdown'
+        accurate = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+
+        assert PdfConverter(fast, accurate, min_page_chars=5).pdf_to_markdown(mock_pdf_data) == '## Sample Markdown'
+        accurate.convert.assert_not_called()
+
+
+class TestHtmlConverter:
+    """Tests for the HtmlConverter class."""
+
+    def test_html_to_markdown_success(self, mocker: MockerFixture):
+        """Test successful conversion of an HTML document to Markdown string."""
+        docling = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        result = mocker.Mock()
+        result.document.export_to_markdown.return_value = '## Sample Markdown\n'
+        docling.convert.return_value = result
+
+        markdown = HtmlConverter(docling).html_to_markdown('<h2>Sample Markdown</h2>')
+
+        assert markdown == '## Sample Markdown'
+        stream = docling.convert.call_args[0][0]
+        assert stream.name.endswith('.html')
+        assert stream.stream.getvalue() == b'<h2>Sample Markdown</h2>'
+
+    def test_html_to_markdown_failure(self, mocker: MockerFixture):
+        """Test that failure in conversion raises DocumentConverterError."""
+        docling = mocker.create_autospec(DoclingConverter, spec_set=True, instance=True)
+        docling.convert.side_effect = ValueError('Unsupported markup')
+
+        with pytest.raises(DocumentConverterError, match='Failed to convert HTML to Markdown: Unsupported markup'):
+            HtmlConverter(docling).html_to_markdown('<p>')
+
+
+class TestProcessPoolPdfConverter:
+    """Tests for the ProcessPoolPdfConverter class."""
+
+    @pytest.fixture(autouse=True)
+    def thread_pool(self, mocker: MockerFixture) -> None:
+        """Runs the workers in threads so the fake converter factory does not need to be importable by a new process."""
+
+        def create_executor(**kwargs: Any) -> ThreadPoolExecutor:
+            return ThreadPoolExecutor(
+                max_workers=kwargs['max_workers'], initializer=kwargs['initializer'], initargs=kwargs['initargs']
+            )
+
+        mocker.patch(
+            'rebelist.revelations.infrastructure.docling.adapters.ProcessPoolExecutor', side_effect=create_executor
+        )
+
+    def test_pdf_to_markdown_many_converts_every_document(self):
+        """Test every document is converted by the worker converters and keyed back."""
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=2, max_in_flight=1)
+        items = [(index, f'# Page {index}'.encode('utf-8')) for index in range(5)]
+
+        results = dict(converter.pdf_to_markdown_many(items))
+
+        assert results == {index: f'# Page {index}' for index in range(5)}
+
+    def test_pdf_to_markdown_many_yields_errors(self):
+        """Test failed conversions are yielded as converter errors."""
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=1, max_in_flight=2)
+
+        results = dict(converter.pdf_to_markdown_many([('ok', b'# Ok'), ('ko', b'')]))
+
+        assert results['ok'] == '# Ok'
+        assert isinstance(results['ko'], DocumentConverterError)
+        assert str(results['ko']) == 'Empty document'
+
+    def test_pdf_to_markdown(self):
+        """Test a single document is converted through the pool."""
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=1, max_in_flight=1)
+
+        assert converter.pdf_to_markdown(b'# Single') == '# Single'
+
+        with pytest.raises(DocumentConverterError, match='Empty document'):
+            converter.pdf_to_markdown(b'')
+
+    def test_conversions_past_the_timeout_are_aborted(self):
+        """Test a hanging conversion is aborted while the other documents are still converted."""
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=2, max_in_flight=2, timeout_seconds=0.3)
+
+        results = dict(converter.pdf_to_markdown_many([('slow', b'slow'), ('ok', b'# Ok'), ('next', b'# Next')]))
+
+        assert isinstance(results['slow'], DocumentConversionAbortedError)
+        assert str(results['slow']) == 'Conversion timed out after 0.3 seconds.'
+        assert results['ok'] == '# Ok'
+        assert results['next'] == '# Next'
+
+    def test_crashing_conversions_are_retried_then_aborted(self, mocker: MockerFixture):
+        """Test a part crashing its worker is retried once before being aborted."""
+        convert = mocker.spy(FakePdfConverter, 'pdf_to_markdown')
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=1, max_in_flight=1)
+
+        results = dict(converter.pdf_to_markdown_many([('crash', b'crash'), ('ok', b'# Ok')]))
+
+        assert isinstance(results['crash'], DocumentConversionAbortedError)
+        assert str(results['crash']) == 'The conversion worker crashed.'
+        assert results['ok'] == '# Ok'
+        assert convert.call_count == 3
+
+    def test_workers_failing_to_start_do_not_abort_the_documents(self):
+        """Test documents are failed without being aborted when the workers cannot create their converter."""
+        converter = ProcessPoolPdfConverter(BrokenPdfConverter, workers=1, max_in_flight=1)
+
+        results = dict(converter.pdf_to_markdown_many([('first', b'# First'), ('second', b'# Second')]))
+
+        for error in results.values():
+            assert type(error) is DocumentConverterError
+            assert str(error) == 'The conversion workers could not start.'
+
+    def test_out_of_memory_before_any_conversion_is_not_aborted(self):
+        """Test running out of memory before any success fails the document without aborting it."""
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=1, max_in_flight=1)
+
+        results = dict(converter.pdf_to_markdown_many([('oom', b'oom'), ('ok', b'# Ok'), ('later', b'oom')]))
+
+        assert type(results['oom']) is DocumentConverterError
+        assert results['ok'] == '# Ok'
+        assert isinstance(results['later'], DocumentConversionAbortedError)
+        assert str(results['later']) == 'Conversion worker ran out of memory: Out of memory'
+
+    def test_split_documents_are_stitched_in_order(self, mocker: MockerFixture):
+        """Test the parts of a split document are converted in parallel and joined back in page order."""
+
+        def split(data: bytes, threshold_pages: int, pages_per_part: int) -> list[bytes]:
+            return data.split(b'|')
+
+        split_pdf = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.split_pdf', side_effect=split)
+        converter = ProcessPoolPdfConverter(
+            FakePdfConverter, workers=3, max_in_flight=2, split_threshold_pages=100, split_pages=50
+        )
+
+        results = dict(converter.pdf_to_markdown_many([('big', b'# One|# Two|# Three'), ('small', b'# Small')]))
+
+        assert results == {'big': '# One\n\n# Two\n\n# Three', 'small': '# Small'}
+        split_pdf.assert_any_call(b'# Small', 100, 50)
+
+    def test_failed_part_fails_the_whole_document(self, mocker: MockerFixture):
+        """Test a document is yielded as an error when one of its parts fails."""
+
+        def split(data: bytes, threshold_pages: int, pages_per_part: int) -> list[bytes]:
+            return data.split(b'|')
+
+        mocker.patch('rebelist.revelations.infrastructure.docling.adapters.split_pdf', side_effect=split)
+        converter = ProcessPoolPdfConverter(FakePdfConverter, workers=2, max_in_flight=2)
+
+        results = dict(converter.pdf_to_markdown_many([('big', b'# One||# Three')]))
+
+        assert isinstance(results['big'], DocumentConverterError)
+
+    def test_identical_documents_are_converted_once(self, mocker: MockerFixture, tmp_path: Path):
+        """Test the Markdown of an already converted document is served from the cache."""
+        convert = mocker.spy(FakePdfConverter, 'pdf_to_markdown')
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024)
+        converter = ProcessPoolPdfConverter(FakePdfConverter, 1, 1, cache=cache, cache_fingerprint='docling=1')
+
+        assert converter.pdf_to_markdown(b'# Cached') == '# Cached'
+        assert converter.pdf_to_markdown(b'# Cached') == '# Cached'
+        assert convert.call_count == 1
+
+    def test_fingerprint_changes_invalidate_entries(self, mocker: MockerFixture, tmp_path: Path):
+        """Test documents are converted again when the conversion fingerprint changes."""
+        convert = mocker.spy(FakePdfConverter, 'pdf_to_markdown')
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024)
+
+        for fingerprint in ('docling=1', 'docling=2'):
+            converter = ProcessPoolPdfConverter(FakePdfConverter, 1, 1, cache=cache, cache_fingerprint=fingerprint)
+            assert converter.pdf_to_markdown(b'# Page') == '# Page'
+
+        assert convert.call_count == 2
+
+    def test_failed_conversions_are_not_cached(self, mocker: MockerFixture, tmp_path: Path):
+        """Test conversion errors are yielded and never stored."""
+        convert = mocker.spy(FakePdfConverter, 'pdf_to_markdown')
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024)
+        converter = ProcessPoolPdfConverter(FakePdfConverter, 1, 1, cache=cache, cache_fingerprint='docling=1')
+
+        for _ in range(2):
+            assert isinstance(dict(converter.pdf_to_markdown_many([('ko', b'')]))['ko'], DocumentConverterError)
+
+        assert convert.call_count == 2
+
+    def test_split_documents_are_cached_whole(self, mocker: MockerFixture, tmp_path: Path):
+        """Test a large PDF converted twice hits the cache, although its parts differ on every split."""
+        convert = mocker.spy(PageCountPdfConverter, 'pdf_to_markdown')
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024 * 1024)
+        converter = ProcessPoolPdfConverter(
+            PageCountPdfConverter, 2, 2, split_threshold_pages=5, split_pages=3, cache=cache, cache_fingerprint='a'
+        )
+        data = TestSplitPdf.make_pdf(7)
+
+        for _ in range(2):
+            assert converter.pdf_to_markdown(data) == '3 pages\n\n3 pages\n\n1 pages'
+
+        assert convert.call_count == 3
+
+
+class TestSplitPdf:
+    """Tests for the split_pdf function."""
+
+    @staticmethod
+    def make_pdf(page_count: int) -> bytes:
+        """Builds a blank PDF document with the given number of pages."""
+        document = pdfium.PdfDocument.new()
+        for _ in range(page_count):
+            document.new_page(100, 100)
+
+        buffer = BytesIO()
+        document.save(buffer)
+        document.close()
+        return buffer.getvalue()
+
+    def test_large_documents_are_split_into_parts(self):
+        """Test documents above the threshold are split into parts of the given number of pages."""
+        parts = split_pdf(self.make_pdf(7), threshold_pages=5, pages_per_part=3)
+
+        assert [len(pdfium.PdfDocument(part)) for part in parts] == [3, 3, 1]
+
+    def test_small_documents_are_kept_whole(self):
+        """Test documents up to the threshold are returned untouched."""
+        data = self.make_pdf(5)
+
+        assert split_pdf(data, threshold_pages=5, pages_per_part=3) == [data]
+        assert split_pdf(data, threshold_pages=0, pages_per_part=3) == [data]
+
+    def test_unreadable_documents_are_kept_whole(self):
+        """Test documents pdfium cannot read are left for the converter to report."""
+        assert split_pdf(b'garbage', threshold_pages=1, pages_per_part=1) == [b'garbage']
+
+
+class TestInitializeWorker:
+    """Tests for the conversion worker initializer."""
+
+    def test_memory_limit_is_applied(self, mocker: MockerFixture):
+        """Test the worker data segment is capped when a memory limit is given."""
+        resource = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.resource')
+
+        _initialize_worker(FakePdfConverter, memory_limit_mb=2)
+
+        resource.setrlimit.assert_called_once_with(resource.RLIMIT_DATA, (2 * 1024 * 1024, 2 * 1024 * 1024))
+
+    def test_memory_is_not_limited_by_default(self, mocker: MockerFixture):
+        """Test no limit is applied without a memory limit."""
+        resource = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.resource')
+
+        _initialize_worker(FakePdfConverter)
+
+        resource.setrlimit.assert_not_called()
+
+    def test_failure_is_reported_before_being_raised(self, mocker: MockerFixture):
+        """Test a worker failing to create its converter reports it to the pool."""
+        started = mocker.Mock()
+
+        with pytest.raises(ImportError, match='Missing model'):
+            _initialize_worker(BrokenPdfConverter, started=started)
+
+        started.put.assert_called_once_with(-1)
+
+
+class TestCreatePdfConverter:
+    """Tests for the create_pdf_converter factory."""
+
+    def test_creates_plain_converter(self, mocker: MockerFixture):
+        """Test the worker converter is never cached, the pool caching whole documents instead."""
+        mocker.patch('rebelist.revelations.infrastructure.docling.adapters.DocumentConverter')
+
+        assert isinstance(create_pdf_converter(DoclingSettings()), PdfConverter)
+
+    def test_fast_profile_falls_back_to_the_accurate_profile(self, mocker: MockerFixture):
+        """Test the fast profile builds a fast converter backed by an accurate fallback."""
+        create = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.create_docling_converter')
+        converter = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.PdfConverter')
+
+        create_pdf_converter(DoclingSettings(cache_max_size_mb=0, num_threads=2, fallback_min_chars=10))
+
+        create.assert_has_calls([call(True, 'accurate', 2), call(False, 'fast', 2)])
+        converter.assert_called_once_with(create.return_value, create.return_value, 10)
+
+    def test_accurate_profile_has_no_fallback(self, mocker: MockerFixture):
+        """Test the accurate profile builds a single accurate converter."""
+        create = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.create_docling_converter')
+        converter = mocker.patch('rebelist.revelations.infrastructure.docling.adapters.PdfConverter')
+
+        create_pdf_converter(DoclingSettings(cache_max_size_mb=0, profile='accurate'))
+
+        create.assert_called_once_with(True, 'accurate', 4)
+        converter.assert_called_once_with(create.return_value)
+
+
+class TestCreateDoclingConverter:
+    """Tests for the create_docling_converter factory."""
+
+    def test_pipeline_options_follow_the_profile(self):
+        """Test OCR, table mode, image generation and threads are set on the PDF pipeline."""
+        converter = create_docling_converter(ocr=False, table_mode='fast', num_threads=3)
+
+        options = converter.format_to_options[InputFormat.PDF].pipeline_options
+        assert isinstance(options, PdfPipelineOptions)
+        assert options.do_ocr is False
+        assert isinstance(options.table_structure_options, TableStructureOptions)
+        assert options.table_structure_options.mode == TableFormerMode.FAST
+        assert options.generate_page_images is False
+        assert options.generate_picture_images is False
+        assert options.accelerator_options.num_threads == 3
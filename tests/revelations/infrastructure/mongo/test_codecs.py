@@ -0,0 +1,71 @@
+from dataclasses import replace
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from rebelist.revelations.domain.models import Document
+from rebelist.revelations.infrastructure.mongo.codecs import DocumentCodec
+
+
+@pytest.fixture
+def document_fixture() -> Document:
+    """Provides a sample Document instance with a structured raw payload."""
+    raw: Any = {'id': '123', 'body': {'export_view': {'value': '<p>Hello</p>' * 100}}}
+    return Document(
+        id=123,
+        title='Test Title',
+        content='# Title\n\n' + 'This is the content. ' * 100,
+        modified_at=datetime(2024, 2, 15, 10, 30, 0),
+        raw=raw,
+        url='https://example.com/1',
+        space='DOCS',
+    )
+
+
+class TestDocumentCodec:
+    def test_plain_codec_stores_fields_as_is(self, document_fixture: Document) -> None:
+        """It should store the document unchanged when compression is disabled."""
+        codec = DocumentCodec()
+
+        item = codec.encode(document_fixture)
+
+        assert item['content'] == document_fixture.content
+        assert item['raw'] == document_fixture.raw
+        assert codec.decode(item) == replace(document_fixture, content_hash=item['content_hash'])
+
+    def test_content_hash_replaces_indexed_hash(self, document_fixture: Document) -> None:
+        """It should store the hash of the content and never the indexed hash, so saving does not overwrite it."""
+        item = DocumentCodec().encode(replace(document_fixture, content_hash='stale', indexed_hash='indexed'))
+
+        assert item['content_hash'] == DocumentCodec.hash_content(document_fixture.content)
+        assert 'indexed_hash' not in item
+        assert DocumentCodec().decode(item | {'indexed_hash': 'indexed'}).indexed_hash == 'indexed'
+
+    def test_compressed_fields_round_trip(self, document_fixture: Document) -> None:
+        """It should store raw and content as smaller binaries and restore them when decoding."""
+        codec = DocumentCodec(compress_raw=True, compress_content=True)
+
+        item = codec.encode(document_fixture)
+
+        assert isinstance(item['raw'], bytes)
+        assert isinstance(item['content'], bytes)
+        assert len(item['content']) < len(document_fixture.content)
+        assert codec.decode(item) == replace(document_fixture, content_hash=item['content_hash'])
+
+    def test_uncompressed_items_stay_readable(self, document_fixture: Document) -> None:
+        """It should decode items written before compression was enabled."""
+        codec = DocumentCodec(compress_raw=True, compress_content=True)
+
+        assert codec.decode(document_fixture.as_dict()) == document_fixture
+
+    def test_projected_items_are_not_decompressed(self, document_fixture: Document) -> None:
+        """It should leave the fields missing from a projection empty."""
+        codec = DocumentCodec(compress_raw=True)
+        item = codec.encode(document_fixture)
+        del item['raw']
+
+        document = codec.decode(item)
+
+        assert document.raw == ''
+        assert document.content == document_fixture.content
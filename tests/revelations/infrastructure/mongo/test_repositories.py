@@ -1,12 +1,21 @@
-from datetime import datetime
+from dataclasses import asdict, replace
+from datetime import UTC, datetime
+from io import BytesIO
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
 
 import pytest
+from pymongo import UpdateOne
 from pytest_mock.plugin import MockerFixture
 
-from rebelist.revelations.domain.models import Document
-from rebelist.revelations.infrastructure.mongo.repositories import MongoDocumentRepository
+from rebelist.revelations.domain.models import Document, QuarantinedDocument, Watermark
+from rebelist.revelations.infrastructure.mongo.codecs import DocumentCodec
+from rebelist.revelations.infrastructure.mongo.repositories import (
+    GridFsSourceArchiveRepository,
+    MongoDocumentRepository,
+    MongoQuarantineRepository,
+    MongoWatermarkRepository,
+)
 
 
 @pytest.fixture
@@ -37,18 +46,42 @@ def mock_database(mocker: MockerFixture, mock_collection: MagicMock) -> MagicMoc
 
 
 class TestMongoDocumentRepository:
-    def test_save_deletes_and_inserts_document(
+    def test_save_upserts_document_by_id(
         self,
         mock_database: MagicMock,
         mock_collection: MagicMock,
         document_fixture: Document,
     ) -> None:
-        """It should delete existing document and insert the new one."""
+        """It should replace the stored fields of the document or insert it in a single write."""
         repo = MongoDocumentRepository(mock_database, 'test-collection')
+
         repo.save(document_fixture)
 
-        mock_collection.delete_one.assert_called_once_with({'id': document_fixture.id})
-        mock_collection.insert_one.assert_called_once_with(document_fixture.as_dict())
+        mock_collection.update_one.assert_called_once_with(
+            {'id': document_fixture.id}, {'$set': DocumentCodec().encode(document_fixture)}, upsert=True
+        )
+
+    def test_save_many_bulk_upserts_documents_in_batches(
+        self,
+        mock_database: MagicMock,
+        mock_collection: MagicMock,
+        document_fixture: Document,
+    ) -> None:
+        """It should write the documents with unordered bulk upserts of the configured batch size."""
+        documents = [replace(document_fixture, id=index) for index in range(3)]
+        repo = MongoDocumentRepository(mock_database, 'test-collection', batch_size=2)
+
+        repo.save_many(documents)
+
+        assert mock_collection.bulk_write.call_count == 2
+        first_batch, second_batch = mock_collection.bulk_write.call_args_list
+        codec = DocumentCodec()
+        assert first_batch.args[0] == [
+            UpdateOne({'id': 0}, {'$set': codec.encode(documents[0])}, upsert=True),
+            UpdateOne({'id': 1}, {'$set': codec.encode(documents[1])}, upsert=True),
+        ]
+        assert second_batch.args[0] == [UpdateOne({'id': 2}, {'$set': codec.encode(documents[2])}, upsert=True)]
+        assert first_batch.kwargs == {'ordered': False}
 
     def test_find_all_yields_documents(
         self,
@@ -79,5 +112,270 @@ class TestMongoDocumentRepository:
         assert doc.modified_at == document_fixture.modified_at
         assert doc.raw == document_fixture.raw
 
-        mock_collection.find.assert_called_once_with({})
+        mock_collection.find.assert_called_once_with({}, None, batch_size=100)
         mock_cursor_obj.close.assert_called_once()
+
+    def test_find_all_filters_and_projects_on_the_server(
+        self,
+        mock_database: MagicMock,
+        mock_collection: MagicMock,
+        document_fixture: Document,
+        mocker: MockerFixture,
+    ) -> None:
+        """It should filter by date and ids and only load the requested fields."""
+        mock_cursor_obj = mocker.MagicMock()
+        mock_cursor_obj.__iter__.return_value = iter(
+            [{'id': document_fixture.id, 'title': document_fixture.title, 'content': document_fixture.content}]
+        )
+        mock_collection.find.return_value = mock_cursor_obj
+        modified_since = datetime(2024, 1, 1)
+
+        repo = MongoDocumentRepository(mock_database, 'test-collection', read_batch_size=25)
+        results = list(repo.find_all(modified_since=modified_since, ids=[123, 456], fields=('title', 'content')))
+
+        assert results[0].title == document_fixture.title
+        assert results[0].content == document_fixture.content
+        assert results[0].raw == ''
+        mock_collection.find.assert_called_once_with(
+            {'modified_at': {'$gt': modified_since}, 'id': {'$in': [123, 456]}},
+            {'_id': False, 'id': True, 'title': True, 'content': True},
+            batch_size=25,
+        )
+
+    def test_find_all_filters_unindexed_documents_on_the_server(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mocker: MockerFixture
+    ) -> None:
+        """It should only find the documents without content hash or whose content hash is not indexed."""
+        mock_collection.find.return_value = mocker.MagicMock()
+
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+        list(repo.find_all(unindexed=True))
+
+        mock_collection.find.assert_called_once_with(
+            {
+                '$or': [
+                    {'content_hash': {'$exists': False}},
+                    {'$expr': {'$ne': ['$content_hash', '$indexed_hash']}},
+                ]
+            },
+            None,
+            batch_size=100,
+        )
+
+    def test_mark_indexed_records_the_content_hash(
+        self, mock_database: MagicMock, mock_collection: MagicMock, document_fixture: Document
+    ) -> None:
+        """It should record the content hash of the document as its indexed hash."""
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+
+        repo.mark_indexed(replace(document_fixture, content_hash='abc'))
+
+        mock_collection.update_one.assert_called_once_with(
+            {'id': 123}, {'$set': {'indexed_hash': 'abc', 'indexed_at': ANY}}
+        )
+
+    def test_mark_indexed_hashes_documents_saved_without_hash(
+        self, mock_database: MagicMock, mock_collection: MagicMock, document_fixture: Document
+    ) -> None:
+        """It should store the hash of the indexed content for documents saved before content hashes existed."""
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+
+        repo.mark_indexed(document_fixture)
+
+        content_hash = DocumentCodec.hash_content(document_fixture.content)
+        mock_collection.update_one.assert_called_once_with(
+            {'id': 123, 'content_hash': {'$exists': False}},
+            {'$set': {'content_hash': content_hash, 'indexed_hash': content_hash, 'indexed_at': ANY}},
+        )
+
+    def test_unmark_indexed_forgets_documents_indexed_since_a_date(
+        self, mock_database: MagicMock, mock_collection: MagicMock
+    ) -> None:
+        """It should unset the indexed hash of the documents indexed since the date or at an unknown date."""
+        mock_collection.update_many.return_value.modified_count = 2
+        since = datetime(2024, 1, 1, tzinfo=UTC)
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+
+        assert repo.unmark_indexed(since) == 2
+
+        mock_collection.update_many.assert_called_once_with(
+            {
+                'indexed_hash': {'$exists': True},
+                '$or': [{'indexed_at': {'$gte': since}}, {'indexed_at': {'$exists': False}}],
+            },
+            {'$unset': {'indexed_hash': '', 'indexed_at': ''}},
+        )
+
+    def test_unmark_indexed_forgets_every_document_without_date(
+        self, mock_database: MagicMock, mock_collection: MagicMock
+    ) -> None:
+        """It should unset the indexed hash of every indexed document when no date is given."""
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+
+        repo.unmark_indexed()
+
+        mock_collection.update_many.assert_called_once_with(
+            {'indexed_hash': {'$exists': True}}, {'$unset': {'indexed_hash': '', 'indexed_at': ''}}
+        )
+
+    def test_find_versions_returns_modification_dates_by_id(
+        self,
+        mock_database: MagicMock,
+        mock_collection: MagicMock,
+        document_fixture: Document,
+        mocker: MockerFixture,
+    ) -> None:
+        """It should map every stored document id to its modification date using a projection."""
+        mock_cursor_obj = mocker.MagicMock()
+        mock_cursor_obj.__iter__.return_value = iter([{'id': 123, 'modified_at': document_fixture.modified_at}])
+        mock_collection.find.return_value = mock_cursor_obj
+
+        repo = MongoDocumentRepository(mock_database, 'test-collection')
+
+        assert repo.find_versions() == {'123': document_fixture.modified_at}
+        mock_collection.find.assert_called_once_with({}, {'_id': False, 'id': True, 'modified_at': True})
+        mock_cursor_obj.close.assert_called_once()
+
+
+class TestMongoWatermarkRepository:
+    def test_save_upserts_watermark_by_space(self, mock_database: MagicMock, mock_collection: MagicMock) -> None:
+        """It should replace the watermark of the same space or insert it."""
+        watermark = Watermark(space='DOCS', modified_at=datetime(2024, 2, 15, 10, 30, 0))
+
+        repo = MongoWatermarkRepository(mock_database, 'test-collection')
+        repo.save(watermark)
+
+        mock_collection.replace_one.assert_called_once_with(
+            {'space': 'DOCS'}, {'space': 'DOCS', 'modified_at': watermark.modified_at}, upsert=True
+        )
+
+    def test_find_all_yields_watermarks(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mocker: MockerFixture
+    ) -> None:
+        """It should yield Watermark objects retrieved from MongoDB."""
+        modified_at = datetime(2024, 2, 15, 10, 30, 0)
+        mock_cursor_obj = mocker.MagicMock()
+        mock_cursor_obj.__iter__.return_value = iter([{'_id': 'x', 'space': 'DOCS', 'modified_at': modified_at}])
+        mock_collection.find.return_value = mock_cursor_obj
+
+        repo = MongoWatermarkRepository(mock_database, 'test-collection')
+
+        assert list(repo.find_all()) == [Watermark(space='DOCS', modified_at=modified_at)]
+        mock_cursor_obj.close.assert_called_once()
+
+
+class TestMongoQuarantineRepository:
+    @pytest.fixture
+    def quarantined_fixture(self) -> QuarantinedDocument:
+        """Provides a sample QuarantinedDocument instance."""
+        return QuarantinedDocument(
+            id='123',
+            title='Test Title',
+            size=2048,
+            error='Conversion timed out after 600 seconds.',
+            modified_at=datetime(2024, 2, 15, 10, 30, 0),
+            quarantined_at=datetime(2024, 2, 16, 8, 0, 0),
+        )
+
+    def test_save_upserts_document_by_id(
+        self, mock_database: MagicMock, mock_collection: MagicMock, quarantined_fixture: QuarantinedDocument
+    ) -> None:
+        """It should replace the entry of the same document or insert it."""
+        repo = MongoQuarantineRepository(mock_database, 'test-collection')
+        repo.save(quarantined_fixture)
+
+        mock_collection.replace_one.assert_called_once_with({'id': '123'}, asdict(quarantined_fixture), upsert=True)
+
+    def test_find_all_yields_quarantined_documents(
+        self,
+        mock_database: MagicMock,
+        mock_collection: MagicMock,
+        mocker: MockerFixture,
+        quarantined_fixture: QuarantinedDocument,
+    ) -> None:
+        """It should yield QuarantinedDocument objects retrieved from MongoDB."""
+        mock_cursor_obj = mocker.MagicMock()
+        mock_cursor_obj.__iter__.return_value = iter([asdict(quarantined_fixture)])
+        mock_collection.find.return_value = mock_cursor_obj
+
+        repo = MongoQuarantineRepository(mock_database, 'test-collection')
+
+        assert list(repo.find_all()) == [quarantined_fixture]
+        mock_cursor_obj.close.assert_called_once()
+
+    def test_delete_removes_document_by_id(self, mock_database: MagicMock, mock_collection: MagicMock) -> None:
+        """It should delete the entry of the document."""
+        repo = MongoQuarantineRepository(mock_database, 'test-collection')
+        repo.delete('123')
+
+        mock_collection.delete_one.assert_called_once_with({'id': '123'})
+
+
+class TestGridFsSourceArchiveRepository:
+    @pytest.fixture
+    def mock_bucket(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the GridFS bucket created by the repository."""
+        return mocker.patch('rebelist.revelations.infrastructure.mongo.repositories.GridFSBucket').return_value
+
+    def test_find_downloads_archived_version(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mock_bucket: MagicMock
+    ) -> None:
+        """It should download the file archived for the document version."""
+        modified_at = datetime(2024, 2, 15, 10, 30, 0)
+        mock_collection.find_one.return_value = {'_id': 'file-1'}
+
+        def download(file_id: str, destination: BytesIO) -> None:
+            destination.write(b'%PDF')
+
+        mock_bucket.download_to_stream.side_effect = download
+
+        repo = GridFsSourceArchiveRepository(mock_database, 'archive')
+
+        assert repo.find(123, modified_at) == b'%PDF'
+        mock_database.get_collection.assert_called_once_with('archive.files')
+        mock_collection.find_one.assert_called_once_with(
+            {'metadata.id': '123', 'metadata.modified_at': modified_at}, {'_id': True}
+        )
+
+    def test_find_returns_none_without_archive(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mock_bucket: MagicMock
+    ) -> None:
+        """It should return None when the document version is not archived."""
+        mock_collection.find_one.return_value = None
+
+        repo = GridFsSourceArchiveRepository(mock_database, 'archive')
+
+        assert repo.find(123, datetime(2024, 2, 15, 10, 30, 0)) is None
+        mock_bucket.download_to_stream.assert_not_called()
+
+    def test_save_uploads_new_version_and_deletes_older_ones(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mock_bucket: MagicMock
+    ) -> None:
+        """It should upload the new version and delete the versions archived before it."""
+        modified_at = datetime(2024, 2, 15, 10, 30, 0)
+        mock_collection.find_one.return_value = None
+        mock_collection.find.return_value = [{'_id': 'file-0'}]
+
+        repo = GridFsSourceArchiveRepository(mock_database, 'archive')
+        repo.save(123, modified_at, b'%PDF')
+
+        mock_bucket.upload_from_stream.assert_called_once_with(
+            '123', b'%PDF', metadata={'id': '123', 'modified_at': modified_at}
+        )
+        mock_collection.find.assert_called_once_with(
+            {'metadata.id': '123', 'metadata.modified_at': {'$lt': modified_at}}, {'_id': True}
+        )
+        mock_bucket.delete.assert_called_once_with('file-0')
+
+    def test_save_skips_already_archived_version(
+        self, mock_database: MagicMock, mock_collection: MagicMock, mock_bucket: MagicMock
+    ) -> None:
+        """It should not upload a document version twice."""
+        mock_collection.find_one.return_value = {'_id': 'file-1'}
+        mock_collection.find.return_value = []
+
+        repo = GridFsSourceArchiveRepository(mock_database, 'archive')
+        repo.save(123, datetime(2024, 2, 15, 10, 30, 0), b'%PDF')
+
+        mock_bucket.upload_from_stream.assert_not_called()
+        mock_bucket.delete.assert_not_called()
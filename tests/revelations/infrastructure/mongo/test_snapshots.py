@@ -0,0 +1,51 @@
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import bson
+import pytest
+from pymongo import ReplaceOne
+from pytest_mock import MockerFixture
+
+from rebelist.revelations.infrastructure.mongo import MongoCollectionSnapshot
+
+
+@pytest.fixture
+def mock_collection(mocker: MockerFixture) -> MagicMock:
+    """Mocks a MongoDB collection."""
+    return mocker.MagicMock()
+
+
+@pytest.fixture
+def mock_database(mocker: MockerFixture, mock_collection: MagicMock) -> MagicMock:
+    """Mocks a MongoDB database returning the mocked collection."""
+    database = mocker.MagicMock()
+    database.__getitem__.return_value = mock_collection
+    return database
+
+
+class TestMongoCollectionSnapshot:
+    def test_export_writes_items_as_bson(self, mock_database: MagicMock, mock_collection: MagicMock) -> None:
+        """It should write every stored item, without its Mongo id, as consecutive BSON documents."""
+        items = [{'id': 1, 'title': 'One'}, {'id': 2, 'title': 'Two'}]
+        mock_collection.find.return_value = MagicMock(__iter__=lambda _: iter(items))
+        target = BytesIO()
+
+        MongoCollectionSnapshot(mock_database, 'documents').export(target)
+
+        mock_collection.find.assert_called_once_with({}, {'_id': False}, batch_size=1000)
+        assert list(bson.decode_all(target.getvalue())) == items
+
+    def test_restore_upserts_items_in_batches(self, mock_database: MagicMock, mock_collection: MagicMock) -> None:
+        """It should replace the stored items by id with unordered bulk writes of the configured batch size."""
+        items = [{'id': index} for index in range(3)]
+        source = BytesIO(b''.join(bson.encode(item) for item in items))
+
+        MongoCollectionSnapshot(mock_database, 'documents', batch_size=2).restore(source)
+
+        first_batch, second_batch = mock_collection.bulk_write.call_args_list
+        assert first_batch.args[0] == [
+            ReplaceOne({'id': 0}, {'id': 0}, upsert=True),
+            ReplaceOne({'id': 1}, {'id': 1}, upsert=True),
+        ]
+        assert second_batch.args[0] == [ReplaceOne({'id': 2}, {'id': 2}, upsert=True)]
+        assert first_batch.kwargs == {'ordered': False}
@@ -1,18 +1,39 @@
+from dataclasses import replace
 from datetime import datetime
+from pathlib import Path
 from typing import List
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock, call
+from uuid import UUID
 
 import pytest
+from langchain_core.documents import Document as InputDocument
 from langchain_qdrant import QdrantVectorStore
 from langchain_text_splitters import TextSplitter
 from pytest_mock import MockerFixture
+from qdrant_client.http.models import QueryResponse, ScoredPoint
+from qdrant_client.models import (
+    CollectionStatus,
+    DatetimeRange,
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    HasIdCondition,
+    MatchAny,
+    OptimizersConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    SparseVector,
+)
 from sentence_transformers import CrossEncoder
 
-from rebelist.revelations.domain import ContextDocument, Document
+from rebelist.revelations.domain import ContextDocument, ContextFilter, Document
+from rebelist.revelations.domain.services import LoggerPort
+from rebelist.revelations.infrastructure.qdrant import QdrantCollectionManager
 from rebelist.revelations.infrastructure.qdrant.adapters import (
     QdrantContextReader,
     QdrantContextWriter,
 )
+from rebelist.revelations.infrastructure.sqlite import SqliteCache
 
 
 @pytest.fixture
@@ -25,6 +46,7 @@ def sample_document() -> Document:
         modified_at=datetime(2024, 2, 15, 10, 30, 0),
         raw='',
         url=None,
+        space='DOCS',
     )
 
 
@@ -45,23 +67,337 @@ def sample_context_documents() -> List[ContextDocument]:
 class TestQdrantContextWriter:
     """Tests for QdrantContextWriter behavior."""
 
-    def test_add_splits_and_adds_documents(
+    @pytest.fixture
+    def mock_store(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the hybrid vector store of the context collection, embedding every text into its length."""
+        store = mocker.create_autospec(QdrantVectorStore, instance=True)
+        store.collection_name = 'context'
+        store.vector_name = 'dense'
+        store.sparse_vector_name = 'sparse'
+        store.content_payload_key = 'page_content'
+        store.metadata_payload_key = 'metadata'
+
+        def embed_dense(texts: List[str]) -> List[List[float]]:
+            return [[float(len(text))] for text in texts]
+
+        def embed_sparse(texts: List[str]) -> List[Mock]:
+            return [Mock(indices=[len(text)], values=[1.0]) for text in texts]
+
+        store.embeddings = mocker.Mock()
+        store.embeddings.embed_documents.side_effect = embed_dense
+        store.sparse_embeddings = mocker.Mock()
+        store.sparse_embeddings.embed_documents.side_effect = embed_sparse
+        return store
+
+    @pytest.fixture
+    def mock_splitter(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the splitter, cutting every document into one chunk per sentence."""
+        splitter = mocker.create_autospec(TextSplitter, spec_set=True, instance=True)
+
+        def split(documents: List[InputDocument]) -> List[InputDocument]:
+            return [
+                InputDocument(page_content=sentence, metadata=document.metadata)
+                for document in documents
+                for sentence in document.page_content.split('. ')
+            ]
+
+        splitter.split_documents.side_effect = split
+        return splitter
+
+    @pytest.fixture
+    def logger(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the logger."""
+        return mocker.create_autospec(LoggerPort, instance=True)
+
+    @staticmethod
+    def upserted(store: MagicMock) -> List[List[PointStruct]]:
+        """Returns the points of every upsert request, in request order."""
+        return [item.kwargs['points'] for item in store.client.upsert.call_args_list]
+
+    def test_add_splits_embeds_and_upserts_documents(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should split a Document into chunks and write them with their dense and sparse vectors."""
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+        writer.add(sample_document)
+
+        [points] = self.upserted(mock_store)
+        assert len(points) == 1
+        assert points[0].vector == {
+            'dense': [float(len(sample_document.content))],
+            'sparse': SparseVector(indices=[len(sample_document.content)], values=[1.0]),
+        }
+        assert points[0].payload is not None
+        assert points[0].payload['page_content'] == sample_document.content
+        assert points[0].payload['metadata']['id'] == '123'
+        assert points[0].payload['metadata']['space'] == 'DOCS'
+        mock_store.client.upsert.assert_called_once_with('context', points=points)
+
+    def test_add_raises_the_error_of_its_batch(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should raise the error that prevented writing the document."""
+        mock_store.embeddings.embed_documents.side_effect = Exception('Ollama error')
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+
+        with pytest.raises(Exception, match='Ollama error'):
+            writer.add(sample_document)
+        mock_store.client.upsert.assert_not_called()
+
+    def test_chunk_ids_are_deterministic(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should derive the same point ids for the same chunks, and new ones when the content changes."""
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+
+        writer.add(sample_document)
+        writer.add(sample_document)
+        writer.add(replace(sample_document, content='This is a new document.'))
+
+        first, second, changed = ([point.id for point in points] for points in self.upserted(mock_store))
+        assert first == second
+        assert first != changed
+        assert str(UUID(str(first[0]))) == first[0]
+
+    def test_stale_chunks_are_deleted_before_writing(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should delete the chunks of the documents that are not part of their current content."""
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+        writer.add(sample_document)
+
+        [points] = self.upserted(mock_store)
+        mock_store.client.delete.assert_called_once_with(
+            'context',
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[FieldCondition(key='metadata.id', match=MatchAny(any=['123']))],
+                    must_not=[HasIdCondition(has_id=[point.id for point in points])],
+                )
+            ),
+        )
+
+    def test_add_many_writes_chunks_of_several_documents_at_once(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should gather the chunks of several documents up to the chunk budget before embedding and writing them."""
+        documents = [
+            replace(sample_document, id=1, content='One. Two'),
+            replace(sample_document, id=2, content='Three'),
+            replace(sample_document, id=3, content='Four. Five'),
+        ]
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger, batch_chunks=3, split_workers=1)
+        results = list(writer.add_many(documents))
+
+        assert sorted(results, key=lambda result: result[0].id) == [(document, None) for document in documents]
+        batches = sorted(
+            [
+                [point.payload['page_content'] for point in points if point.payload]
+                for points in self.upserted(mock_store)
+            ]
+        )
+        assert batches == [['Four', 'Five'], ['One', 'Two', 'Three']]
+        assert mock_store.embeddings.embed_documents.call_count == 2
+        assert mock_store.sparse_embeddings.embed_documents.call_count == 2
+
+    def test_add_many_yields_the_error_of_a_failed_batch(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should yield every document of a batch with the error raised while writing it."""
+        error = Exception('Qdrant error')
+        mock_store.client.upsert.side_effect = error
+        documents = [replace(sample_document, id=index) for index in range(2)]
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+
+        assert list(writer.add_many(documents)) == [(documents[0], error), (documents[1], error)]
+        mock_store.client.upsert.assert_called_once()
+
+    def test_add_many_reports_stage_utilization(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should log how busy every stage of the pipeline was."""
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+
+        list(writer.add_many([sample_document]))
+
+        message: str = logger.info.call_args[0][0]
+        assert message.startswith('Indexing stage utilization. [read=')
+        for stage in ('split', 'batch', 'dense', 'sparse', 'upsert'):
+            assert f'{stage}=' in message
+
+    def test_cached_vectors_are_not_embedded_again(
+        self,
+        mock_store: MagicMock,
+        mock_splitter: MagicMock,
+        logger: MagicMock,
+        sample_document: Document,
+        tmp_path: Path,
+    ) -> None:
+        """Should reuse the cached dense vectors of the same model instead of calling the embedder."""
+        cache = SqliteCache(str(tmp_path / 'embeddings.sqlite3'), 1024 * 1024)
+
+        QdrantContextWriter(mock_store, mock_splitter, logger, cache=cache, cache_fingerprint='a').add(sample_document)
+        QdrantContextWriter(mock_store, mock_splitter, logger, cache=cache, cache_fingerprint='a').add(sample_document)
+
+        assert mock_store.embeddings.embed_documents.call_count == 1
+        first, second = self.upserted(mock_store)
+        assert first[0].vector == second[0].vector
+        logger.info.assert_called_with('Embedding cache hit rate: 100% [hits=1, misses=0]')
+
+    def test_cached_vectors_of_another_model_are_ignored(
+        self,
+        mock_store: MagicMock,
+        mock_splitter: MagicMock,
+        logger: MagicMock,
+        sample_document: Document,
+        tmp_path: Path,
+    ) -> None:
+        """Should embed the chunks again when the embedding model fingerprint changes."""
+        cache = SqliteCache(str(tmp_path / 'embeddings.sqlite3'), 1024 * 1024)
+
+        QdrantContextWriter(mock_store, mock_splitter, logger, cache=cache, cache_fingerprint='a').add(sample_document)
+        QdrantContextWriter(mock_store, mock_splitter, logger, cache=cache, cache_fingerprint='b').add(sample_document)
+
+        assert mock_store.embeddings.embed_documents.call_count == 2
+        logger.info.assert_called_with('Embedding cache hit rate: 0% [hits=0, misses=1]')
+
+    def test_bulk_defers_indexing_until_the_points_are_loaded(
+        self, mocker: MockerFixture, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should disable indexing during the bulk load, restore the threshold and wait for the index build."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.qdrant.adapters.time')
+        clock.perf_counter.side_effect = [10.0, 42.5]
+        clock.monotonic.return_value = 0.0
+        mock_store.client.get_collection.side_effect = [
+            Mock(config=Mock(optimizer_config=Mock(indexing_threshold=200))),
+            Mock(status=CollectionStatus.GREY),
+            Mock(status=CollectionStatus.YELLOW),
+            Mock(status=CollectionStatus.GREEN),
+        ]
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+        with writer.bulk():
+            mock_store.client.update_collection.assert_called_once_with(
+                'context', optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+            )
+
+        mock_store.client.update_collection.assert_has_calls(
+            [
+                call('context', optimizers_config=OptimizersConfigDiff(indexing_threshold=200)),
+                call('context', optimizers_config=OptimizersConfigDiff()),
+            ]
+        )
+        assert clock.sleep.call_count == 3
+        logger.info.assert_called_with('Index built in 32.5 seconds. [collection=context]')
+
+    def test_bulk_restores_indexing_when_loading_fails(
+        self, mocker: MockerFixture, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should restore the indexing threshold without waiting for the build when the load fails."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.qdrant.adapters.time')
+        mock_store.client.get_collection.return_value = Mock(config=Mock(optimizer_config=Mock(indexing_threshold=200)))
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+        with pytest.raises(RuntimeError, match='Load error'), writer.bulk():
+            raise RuntimeError('Load error')
+
+        mock_store.client.update_collection.assert_called_with(
+            'context', optimizers_config=OptimizersConfigDiff(indexing_threshold=200)
+        )
+        clock.sleep.assert_not_called()
+
+    def test_bulk_restores_default_threshold_when_unset(
+        self, mocker: MockerFixture, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should restore the default indexing threshold when the collection has none or has indexing disabled."""
+        mocker.patch('rebelist.revelations.infrastructure.qdrant.adapters.time')
+        for threshold in (None, 0):
+            mock_store.client.get_collection.return_value = Mock(
+                config=Mock(optimizer_config=Mock(indexing_threshold=threshold))
+            )
+
+            writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+            with pytest.raises(RuntimeError, match='Load error'), writer.bulk():
+                raise RuntimeError('Load error')
+
+            mock_store.client.update_collection.assert_called_with(
+                'context', optimizers_config=OptimizersConfigDiff(indexing_threshold=200)
+            )
+
+    def test_bulk_wait_logs_progress_then_times_out(
+        self, mocker: MockerFixture, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should log the build progress while waiting, and raise once the index is not built within the timeout."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.qdrant.adapters.time')
+        clock.monotonic.side_effect = [0.0, 40.0, 80.0, 120.0]
+        building = Mock(status=CollectionStatus.YELLOW, indexed_vectors_count=10, points_count=100)
+        mock_store.client.get_collection.side_effect = [
+            Mock(config=Mock(optimizer_config=Mock(indexing_threshold=200))),
+            building,
+            building,
+            building,
+        ]
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger, bulk_timeout_seconds=100)
+        with pytest.raises(RuntimeError, match='not built after 100 seconds'), writer.bulk():
+            pass
+
+        assert clock.sleep.call_count == 3
+        logger.info.assert_any_call(
+            'Waiting for the index build. [collection=context, status=yellow, indexed_vectors=10, points=100]'
+        )
+        assert logger.info.call_count == 3
+
+    def test_rebuild_writes_to_a_new_collection_then_serves_it(
         self,
         mocker: MockerFixture,
+        mock_store: MagicMock,
+        mock_splitter: MagicMock,
+        logger: MagicMock,
         sample_document: Document,
     ) -> None:
-        """Should convert a Document to InputDocument, split it, and add to vector store."""
-        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, spec_set=True, instance=True)
-        mock_splitter = mocker.create_autospec(TextSplitter, spec_set=True, instance=True)
+        """Should write to a new version of the collection, and switch the alias to it once the block exits."""
+        collections = mocker.create_autospec(QdrantCollectionManager, instance=True)
+        collections.create_version.return_value = 'context_20240101000000'
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger, collections=collections)
+        with writer.rebuild():
+            writer.add(sample_document)
+            collections.switch.assert_not_called()
 
-        mock_chunks = [Mock()]
-        mock_splitter.split_documents.return_value = mock_chunks
+        collections.switch.assert_called_once_with('context_20240101000000')
+        assert mock_store.client.upsert.call_args.args == ('context_20240101000000',)
+        assert mock_store.client.delete.call_args.args == ('context_20240101000000',)
 
-        writer = QdrantContextWriter(mock_qrant_vector_store, mock_splitter)
         writer.add(sample_document)
+        assert mock_store.client.upsert.call_args.args == ('context',)
 
-        mock_splitter.split_documents.assert_called_once()
-        mock_qrant_vector_store.add_documents.assert_called_once_with(mock_chunks)
+    def test_rebuild_deletes_the_new_collection_when_writing_fails(
+        self, mocker: MockerFixture, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should keep serving the current collection and delete the new one when the rebuild fails."""
+        collections = mocker.create_autospec(QdrantCollectionManager, instance=True)
+        collections.create_version.return_value = 'context_20240101000000'
+
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger, collections=collections)
+        with pytest.raises(RuntimeError, match='Write error'), writer.rebuild():
+            raise RuntimeError('Write error')
+
+        collections.delete_version.assert_called_once_with('context_20240101000000')
+        collections.switch.assert_not_called()
+
+    def test_rebuild_without_collection_manager_writes_in_place(
+        self, mock_store: MagicMock, mock_splitter: MagicMock, logger: MagicMock, sample_document: Document
+    ) -> None:
+        """Should write to the served collection when no collection manager is given."""
+        writer = QdrantContextWriter(mock_store, mock_splitter, logger)
+        with writer.rebuild():
+            writer.add(sample_document)
+
+        assert mock_store.client.upsert.call_args.args == ('context',)
 
 
 class TestQdrantContextReader:
@@ -92,6 +428,105 @@ class TestQdrantContextReader:
         assert mock_qrant_vector_store.similarity_search.call_count == 1
         assert mock_ranker.predict.call_count == 1
 
+    def test_search_requests_oversampling_and_rescoring(
+        self,
+        mocker: MockerFixture,
+        sample_context_documents: List[ContextDocument],
+    ) -> None:
+        """Should search the quantized vectors, oversampling the candidates rescored with the original vectors."""
+        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, spec_set=True, instance=True)
+        mock_qrant_vector_store.similarity_search.return_value = []
+        mock_ranker = mocker.create_autospec(CrossEncoder, spec_set=True, instance=True)
+
+        reader = QdrantContextReader(mock_qrant_vector_store, mock_ranker, oversampling=3.0, rescore=True)
+        reader.search('explain transformers', limit=2)
+
+        search_params = mock_qrant_vector_store.similarity_search.call_args.kwargs['search_params']
+        assert search_params.quantization == QuantizationSearchParams(ignore=False, rescore=True, oversampling=3.0)
+
+    def test_search_pushes_filter_down_to_qdrant(self, mocker: MockerFixture) -> None:
+        """Should convert the context filter into conditions on the indexed chunk metadata."""
+        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, instance=True)
+        mock_qrant_vector_store.metadata_payload_key = 'metadata'
+        mock_qrant_vector_store.similarity_search.return_value = []
+        mock_ranker = mocker.create_autospec(CrossEncoder, spec_set=True, instance=True)
+        since = datetime(2024, 1, 1)
+
+        reader = QdrantContextReader(mock_qrant_vector_store, mock_ranker)
+        reader.search(
+            'explain transformers', 2, ContextFilter(document_ids=(7,), spaces=('DOCS',), modified_after=since)
+        )
+
+        assert mock_qrant_vector_store.similarity_search.call_args.kwargs['filter'] == Filter(
+            must=[
+                FieldCondition(key='metadata.id', match=MatchAny(any=['7'])),
+                FieldCondition(key='metadata.space', match=MatchAny(any=['DOCS'])),
+                FieldCondition(key='metadata.modified_at', range=DatetimeRange(gt=since)),
+            ]
+        )
+
+    def test_search_without_conditions_is_not_filtered(self, mocker: MockerFixture) -> None:
+        """Should not filter the search when no filter or an empty one is given."""
+        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, instance=True)
+        mock_qrant_vector_store.metadata_payload_key = 'metadata'
+        mock_qrant_vector_store.similarity_search.return_value = []
+        mock_ranker = mocker.create_autospec(CrossEncoder, spec_set=True, instance=True)
+
+        reader = QdrantContextReader(mock_qrant_vector_store, mock_ranker)
+        reader.search('explain transformers', 2)
+        reader.search('explain transformers', 2, ContextFilter())
+
+        for search_call in mock_qrant_vector_store.similarity_search.call_args_list:
+            assert search_call.kwargs['filter'] is None
+
+    def test_retrieve_can_ignore_quantization_without_reranking(
+        self,
+        mocker: MockerFixture,
+        sample_context_documents: List[ContextDocument],
+    ) -> None:
+        """Should search the original vectors when quantization is disabled, and leave the order untouched."""
+        qdrant_docs = [
+            Mock(page_content=doc.content, metadata={'title': doc.title, 'modified_at': doc.modified_at.isoformat()})
+            for doc in sample_context_documents[:2]
+        ]
+        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, spec_set=True, instance=True)
+        mock_qrant_vector_store.similarity_search.return_value = qdrant_docs
+        mock_ranker = mocker.create_autospec(CrossEncoder, spec_set=True, instance=True)
+
+        reader = QdrantContextReader(mock_qrant_vector_store, mock_ranker)
+        results = reader.retrieve('explain transformers', limit=2, quantized=False)
+
+        search_params = mock_qrant_vector_store.similarity_search.call_args.kwargs['search_params']
+        assert search_params.quantization.ignore is True
+        assert [result.title for result in results] == ['1', '2']
+        mock_ranker.predict.assert_not_called()
+
+    def test_retrieve_dense_queries_the_dense_vectors_alone(self, mocker: MockerFixture) -> None:
+        """Should query the dense vectors with the given vector, without embedding the query again."""
+        mock_qrant_vector_store = mocker.create_autospec(QdrantVectorStore, instance=True)
+        mock_qrant_vector_store.collection_name = 'context'
+        mock_qrant_vector_store.vector_name = 'dense'
+        mock_qrant_vector_store.content_payload_key = 'page_content'
+        mock_qrant_vector_store.metadata_payload_key = 'metadata'
+        metadata = {'title': 'Title', 'url': 'https://example.com', 'modified_at': '2024-01-01T00:00:00'}
+        mock_qrant_vector_store.client.query_points.return_value = QueryResponse(
+            points=[ScoredPoint(id=1, version=0, score=0.9, payload={'page_content': 'Text', 'metadata': metadata})]
+        )
+        mock_ranker = mocker.create_autospec(CrossEncoder, spec_set=True, instance=True)
+
+        reader = QdrantContextReader(mock_qrant_vector_store, mock_ranker)
+        results = reader.retrieve_dense([0.1, 0.2], limit=2, quantized=False)
+
+        query = mock_qrant_vector_store.client.query_points.call_args
+        assert query.args == ('context',)
+        assert query.kwargs['query'] == [0.1, 0.2]
+        assert query.kwargs['using'] == 'dense'
+        assert query.kwargs['search_params'].quantization.ignore is True
+        assert results == [
+            ContextDocument(title='Title', content='Text', modified_at=datetime(2024, 1, 1), url='https://example.com')
+        ]
+        mock_qrant_vector_store.similarity_search.assert_not_called()
+
     def test_rerank_orders_documents_by_score(
         self,
         mocker: MockerFixture,
@@ -0,0 +1,178 @@
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    AliasDescription,
+    CollectionDescription,
+    CollectionsAliasesResponse,
+    CollectionsResponse,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PayloadSchemaType,
+)
+
+from rebelist.revelations.config.settings import QdrantSettings
+from rebelist.revelations.domain.services import LoggerPort
+from rebelist.revelations.infrastructure.qdrant import QdrantCollectionManager
+
+
+class TestQdrantCollectionManager:
+    """Tests for QdrantCollectionManager behavior."""
+
+    @pytest.fixture
+    def mock_client(self, mocker: MockerFixture) -> MagicMock:
+        """A client without aliases nor collections."""
+        client = mocker.create_autospec(QdrantClient, instance=True)
+        client.get_aliases.return_value = CollectionsAliasesResponse(aliases=[])
+        client.get_collections.return_value = CollectionsResponse(collections=[])
+        client.collection_exists.return_value = False
+        return client
+
+    @pytest.fixture
+    def logger(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the logger."""
+        return mocker.create_autospec(LoggerPort, instance=True)
+
+    @staticmethod
+    def serve(client: MagicMock, served: str | None, names: list[str]) -> None:
+        """Makes the client report the collections, and the one served under the alias if any."""
+        aliases = [AliasDescription(alias_name='context', collection_name=served)] if served else []
+        client.get_aliases.return_value = CollectionsAliasesResponse(aliases=aliases)
+        client.get_collections.return_value = CollectionsResponse(
+            collections=[CollectionDescription(name=name) for name in names]
+        )
+
+    @staticmethod
+    def manager(
+        client: MagicMock, logger: MagicMock, settings: QdrantSettings | None = None
+    ) -> QdrantCollectionManager:
+        """Creates a manager of the context alias, with the default settings unless given."""
+        return QdrantCollectionManager(client, settings or QdrantSettings(context_collection='context'), 768, logger)
+
+    def test_initialize_creates_and_serves_first_version(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should create a versioned collection with its payload indexes and serve it under the alias."""
+        self.manager(mock_client, logger).initialize()
+
+        name = mock_client.create_collection.call_args.kwargs['collection_name']
+        assert name.startswith('context_')
+        assert mock_client.create_collection.call_args.kwargs['vectors_config']['dense'].on_disk is False
+        mock_client.update_collection_aliases.assert_called_once_with(
+            [
+                DeleteAliasOperation(delete_alias=DeleteAlias(alias_name='context')),
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=name, alias_name='context')),
+            ]
+        )
+        indexes = {
+            index_call.args[1]: index_call.kwargs['field_schema']
+            for index_call in mock_client.create_payload_index.call_args_list
+        }
+        assert indexes == {
+            'metadata.id': PayloadSchemaType.KEYWORD,
+            'metadata.space': PayloadSchemaType.KEYWORD,
+            'metadata.modified_at': PayloadSchemaType.DATETIME,
+        }
+
+    def test_initialize_keeps_served_collection(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should only index the payloads of the collection already served."""
+        self.serve(mock_client, 'context_20240101000000', ['context_20240101000000'])
+
+        self.manager(mock_client, logger).initialize()
+
+        mock_client.create_collection.assert_not_called()
+        assert mock_client.create_payload_index.call_args.args[0] == 'context_20240101000000'
+
+    def test_create_version_quantizes_dense_vector(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should keep a scalar quantized copy in RAM and the original vectors on disk."""
+        settings = QdrantSettings(context_collection='context', quantization='scalar')
+        self.manager(mock_client, logger, settings).create_version()
+
+        vector_params = mock_client.create_collection.call_args.kwargs['vectors_config']['dense']
+        assert vector_params.on_disk is True
+        assert vector_params.quantization_config.scalar.always_ram is True
+
+    def test_create_version_applies_large_corpus_profile(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should memory-map the vectors, the HNSW graph and the payloads of large corpora."""
+        settings = QdrantSettings(context_collection='context', profile='large_corpus', memmap_threshold_kb=10000)
+        self.manager(mock_client, logger, settings).create_version()
+
+        kwargs = mock_client.create_collection.call_args.kwargs
+        assert kwargs['vectors_config']['dense'].on_disk is True
+        assert kwargs['vectors_config']['dense'].hnsw_config.on_disk is True
+        assert kwargs['optimizers_config'].memmap_threshold == 10000
+        assert kwargs['on_disk_payload'] is True
+
+    def test_switch_replaces_unversioned_collection(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should delete the collection named after the alias, created before versioning, to create the alias."""
+        mock_client.collection_exists.return_value = True
+
+        previous = self.manager(mock_client, logger).switch('context_20240101000000')
+
+        assert previous is None
+        mock_client.delete_collection.assert_called_once_with('context')
+        mock_client.update_collection_aliases.assert_called_once()
+        logger.warning.assert_called_once()
+
+    def test_switch_returns_previous_collection(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should serve the new version in one alias operation, keeping the previous one."""
+        self.serve(mock_client, 'context_20240101000000', ['context_20240101000000', 'context_20240201000000'])
+
+        previous = self.manager(mock_client, logger).switch('context_20240201000000')
+
+        assert previous == 'context_20240101000000'
+        mock_client.delete_collection.assert_not_called()
+
+    def test_rollback_serves_newest_older_version(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should serve the version preceding the served one."""
+        names = ['context_20240101000000', 'context_20240201000000', 'context_20240301000000', 'other']
+        self.serve(mock_client, 'context_20240301000000', names)
+
+        assert self.manager(mock_client, logger).rollback() == 'context_20240201000000'
+        operations = mock_client.update_collection_aliases.call_args.args[0]
+        assert operations[1].create_alias.collection_name == 'context_20240201000000'
+
+    def test_rollback_raises_without_older_version(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should raise when the served version is the oldest one."""
+        self.serve(mock_client, 'context_20240101000000', ['context_20240101000000'])
+
+        with pytest.raises(ValueError, match='No previous collection'):
+            self.manager(mock_client, logger).rollback()
+
+    def test_replaced_at_returns_creation_of_next_version(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should return when the version following the given one was created, None for the newest version."""
+        names = ['context_20240101000000', 'context_20240201123000', 'context_20240301000000']
+        self.serve(mock_client, 'context_20240101000000', names)
+        manager = self.manager(mock_client, logger)
+
+        assert manager.replaced_at('context_20240101000000') == datetime(2024, 2, 1, 12, 30, tzinfo=UTC)
+        assert manager.replaced_at('context_20240301000000') is None
+
+    def test_prune_keeps_newest_older_versions(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should delete the older versions beyond the ones kept, never the served nor the newer ones."""
+        names = ['context_20240101000000', 'context_20240201000000', 'context_20240301000000', 'context_20240401000000']
+        self.serve(mock_client, 'context_20240301000000', names)
+
+        pruned = self.manager(mock_client, logger).prune(keep=1)
+
+        assert pruned == ['context_20240101000000']
+        mock_client.delete_collection.assert_called_once_with('context_20240101000000')
+
+    def test_delete_version_refuses_served_collection(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should never delete the served collection."""
+        self.serve(mock_client, 'context_20240101000000', ['context_20240101000000'])
+
+        with pytest.raises(ValueError, match='served collection cannot be deleted'):
+            self.manager(mock_client, logger).delete_version('context_20240101000000')
+
+    def test_drop_deletes_alias_and_every_collection(self, mock_client: MagicMock, logger: MagicMock) -> None:
+        """Should delete the alias, every version and the unversioned collection."""
+        self.serve(mock_client, 'context_20240101000000', ['context_20240101000000', 'other'])
+
+        self.manager(mock_client, logger).drop()
+
+        deleted = [item.args[0] for item in mock_client.delete_collection.call_args_list]
+        assert deleted == ['context_20240101000000', 'context']
@@ -0,0 +1,88 @@
+import threading
+from typing import Iterator
+
+import pytest
+
+from rebelist.revelations.infrastructure.qdrant.pipelines import Pipeline, Stage
+
+
+class TestPipeline:
+    """Tests for the Pipeline class."""
+
+    def test_items_go_through_every_stage(self) -> None:
+        """Test every item is processed by the stages in order, whatever the number of workers."""
+
+        def double(item: int) -> list[int]:
+            return [item * 2]
+
+        def spread(item: int) -> list[int]:
+            return [item, item + 1]
+
+        pipeline = Pipeline([Stage('double', double, workers=3), Stage('spread', spread, workers=2)], queue_size=2)
+
+        assert sorted(pipeline.run(range(5))) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+    def test_flush_releases_the_items_held_by_a_stage(self) -> None:
+        """Test a stateful stage gets to release its held back items once the input is exhausted."""
+        held: list[int] = []
+
+        def hold(item: int) -> list[int]:
+            held.append(item)
+            return []
+
+        def flush() -> list[int]:
+            return [sum(held)]
+
+        pipeline = Pipeline([Stage('sum', hold, flush=flush)])
+
+        assert list(pipeline.run([1, 2, 3])) == [6]
+
+    def test_utilization_is_reported_by_stage(self) -> None:
+        """Test the share of time each stage worked is reported after a run, including the reading."""
+
+        def identity(item: int) -> list[int]:
+            return [item]
+
+        pipeline = Pipeline([Stage('identity', identity)])
+        list(pipeline.run([1, 2]))
+
+        assert set(pipeline.utilization) == {'read', 'identity'}
+        assert all(0.0 <= share <= 1.0 for share in pipeline.utilization.values())
+
+    def test_stage_errors_are_raised_to_the_consumer(self) -> None:
+        """Test an error raised by a stage stops the pipeline and reaches the consumer."""
+
+        def fail(item: int) -> list[int]:
+            raise ValueError('Broken stage')
+
+        pipeline = Pipeline([Stage('fail', fail, workers=2)])
+
+        with pytest.raises(ValueError, match='Broken stage'):
+            list(pipeline.run(range(10)))
+
+    def test_reading_errors_are_raised_to_the_consumer(self) -> None:
+        """Test an error raised while reading the input items reaches the consumer."""
+
+        def items() -> Iterator[int]:
+            yield 1
+            raise RuntimeError('Broken source')
+
+        def identity(item: int) -> list[int]:
+            return [item]
+
+        with pytest.raises(RuntimeError, match='Broken source'):
+            list(Pipeline([Stage('identity', identity)]).run(items()))
+
+    def test_stopping_early_stops_the_workers(self) -> None:
+        """Test the worker threads are stopped when the consumer stops reading the outputs."""
+
+        def identity(item: int) -> list[int]:
+            return [item]
+
+        threads = threading.active_count()
+        outputs = Pipeline([Stage('identity', identity, workers=2)], queue_size=1).run(range(1000))
+
+        next(outputs)
+        outputs.close()
+
+        assert threading.active_count() == threads
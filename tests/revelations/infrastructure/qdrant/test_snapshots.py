@@ -0,0 +1,108 @@
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from qdrant_client import QdrantClient
+from qdrant_client.models import SnapshotDescription
+
+from rebelist.revelations.domain.services import LoggerPort
+from rebelist.revelations.infrastructure.qdrant import QdrantCollectionManager, QdrantCollectionSnapshot
+
+
+class TestQdrantCollectionSnapshot:
+    """Tests for QdrantCollectionSnapshot behavior."""
+
+    @pytest.fixture
+    def mock_client(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the Qdrant client."""
+        return mocker.create_autospec(QdrantClient, instance=True)
+
+    @pytest.fixture
+    def mock_http(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the HTTP client of the Qdrant REST API, creating a fixed snapshot."""
+        http = mocker.create_autospec(httpx.Client, instance=True)
+        snapshot = SnapshotDescription(name='context.snapshot', size=6)
+        http.post.return_value.json.return_value = {'result': snapshot.model_dump(mode='json'), 'status': 'ok'}
+        return http
+
+    @pytest.fixture
+    def mock_collections(self, mocker: MockerFixture) -> MagicMock:
+        """A collection manager serving a single version."""
+        collections = mocker.create_autospec(QdrantCollectionManager, instance=True)
+        collections.resolve.return_value = 'context_20240101000000'
+        collections.version_name.return_value = 'context_20250101000000'
+        return collections
+
+    @pytest.fixture
+    def logger(self, mocker: MockerFixture) -> MagicMock:
+        """Mocks the logger."""
+        return mocker.create_autospec(LoggerPort, instance=True)
+
+    def test_export_streams_snapshot_of_served_collection(
+        self, mock_client: MagicMock, mock_http: MagicMock, mock_collections: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should stream the snapshot of the served version to the target, then delete it from the node."""
+        response = mock_http.stream.return_value.__enter__.return_value
+        response.iter_bytes.return_value = iter([b'con', b'tex', b't'])
+        target = BytesIO()
+
+        QdrantCollectionSnapshot(mock_client, mock_http, mock_collections, logger).export(target)
+
+        mock_http.post.assert_called_once_with('/collections/context_20240101000000/snapshots', params={'wait': 'true'})
+        mock_http.stream.assert_called_once_with(
+            'GET', '/collections/context_20240101000000/snapshots/context.snapshot'
+        )
+        assert target.getvalue() == b'context'
+        mock_client.delete_snapshot.assert_called_once_with('context_20240101000000', 'context.snapshot')
+
+    def test_export_fails_when_snapshot_is_not_created(
+        self, mock_client: MagicMock, mock_http: MagicMock, mock_collections: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should not download nor delete a snapshot that could not be created."""
+        mock_http.post.return_value.raise_for_status.side_effect = httpx.HTTPError('Timed out')
+
+        with pytest.raises(httpx.HTTPError):
+            QdrantCollectionSnapshot(mock_client, mock_http, mock_collections, logger).export(BytesIO())
+
+        mock_http.stream.assert_not_called()
+        mock_client.delete_snapshot.assert_not_called()
+
+    def test_export_deletes_snapshot_when_download_fails(
+        self, mock_client: MagicMock, mock_http: MagicMock, mock_collections: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should not leave the snapshot on the node when it cannot be downloaded."""
+        response = mock_http.stream.return_value.__enter__.return_value
+        response.raise_for_status.side_effect = httpx.HTTPError('Not found')
+
+        with pytest.raises(httpx.HTTPError):
+            QdrantCollectionSnapshot(mock_client, mock_http, mock_collections, logger).export(BytesIO())
+
+        mock_client.delete_snapshot.assert_called_once_with('context_20240101000000', 'context.snapshot')
+
+    def test_restore_uploads_new_version_and_serves_it(
+        self, mock_client: MagicMock, mock_http: MagicMock, mock_collections: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should upload the snapshot into a new version, then switch the alias to it."""
+        source = BytesIO(b'context')
+
+        QdrantCollectionSnapshot(mock_client, mock_http, mock_collections, logger).restore(source)
+
+        mock_http.post.assert_called_once_with(
+            '/collections/context_20250101000000/snapshots/upload',
+            params={'wait': 'true', 'priority': 'snapshot'},
+            files={'snapshot': ('context_20250101000000.snapshot', source)},
+        )
+        mock_collections.switch.assert_called_once_with('context_20250101000000')
+
+    def test_restore_keeps_served_version_when_upload_fails(
+        self, mock_client: MagicMock, mock_http: MagicMock, mock_collections: MagicMock, logger: MagicMock
+    ) -> None:
+        """Should not switch the alias when the upload is rejected."""
+        mock_http.post.return_value.raise_for_status.side_effect = httpx.HTTPError('Bad request')
+
+        with pytest.raises(httpx.HTTPError):
+            QdrantCollectionSnapshot(mock_client, mock_http, mock_collections, logger).restore(BytesIO())
+
+        mock_collections.switch.assert_not_called()
@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    CollectionConfig,
+    CollectionInfo,
+    CollectionParams,
+    CollectionStatus,
+    Distance,
+    HnswConfig,
+    HnswConfigDiff,
+    OptimizersConfig,
+    OptimizersStatusOneOf,
+    Record,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SparseIndexParams,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+    WalConfig,
+)
+
+from rebelist.revelations.infrastructure.qdrant import QdrantStorageInspector, StorageUsage
+
+
+def _collection_info(vector_params: VectorParams, points: int, on_disk_payload: bool) -> CollectionInfo:
+    """Builds the description of a collection with a dense and an on-disk sparse vector."""
+    return CollectionInfo(
+        status=CollectionStatus.GREEN,
+        optimizer_status=OptimizersStatusOneOf.OK,
+        points_count=points,
+        segments_count=1,
+        payload_schema={},
+        config=CollectionConfig(
+            params=CollectionParams(
+                vectors={'dense': vector_params},
+                sparse_vectors={'sparse': SparseVectorParams(index=SparseIndexParams(on_disk=True))},
+                on_disk_payload=on_disk_payload,
+            ),
+            hnsw_config=HnswConfig(m=16, ef_construct=100, full_scan_threshold=10000),
+            optimizer_config=OptimizersConfig(
+                deleted_threshold=0.2,
+                vacuum_min_vector_number=1000,
+                default_segment_number=0,
+                flush_interval_sec=5,
+            ),
+            wal_config=WalConfig(wal_capacity_mb=32, wal_segments_ahead=0),
+        ),
+    )
+
+
+class TestQdrantStorageInspector:
+    """Tests for QdrantStorageInspector behavior."""
+
+    @pytest.fixture
+    def mock_client(self, mocker: MockerFixture) -> MagicMock:
+        """A client returning two sampled points of 4 sparse entries each."""
+        client = mocker.create_autospec(QdrantClient, instance=True)
+        records = [
+            Record(
+                id=index,
+                payload={'page_content': 'x' * 100},
+                vector={'sparse': SparseVector(indices=[1, 2, 3, 4], values=[0.1, 0.2, 0.3, 0.4])},
+            )
+            for index in range(2)
+        ]
+        client.scroll.return_value = (records, None)
+        return client
+
+    def test_inspect_reports_in_memory_collection(self, mock_client: MagicMock) -> None:
+        """Should report the dense vectors, the graph and the payloads resident, and the sparse index on disk."""
+        vector_params = VectorParams(size=8, distance=Distance.COSINE)
+        mock_client.get_collection.return_value = _collection_info(vector_params, points=10, on_disk_payload=False)
+
+        usages = QdrantStorageInspector(mock_client, 'context', 'dense', 'sparse').inspect()
+
+        payload_bytes = len('{"page_content": "' + 'x' * 100 + '"}') * 10
+        assert usages == [
+            StorageUsage('Dense vectors', 10 * 8 * 4, 0),
+            StorageUsage('HNSW graph', 10 * 2 * 16 * 4, 0),
+            StorageUsage('Sparse vectors', 0, 10 * 4 * 8),
+            StorageUsage('Payloads', payload_bytes, 0),
+        ]
+        assert mock_client.scroll.call_args.kwargs['with_vectors'] == ['sparse']
+
+    def test_inspect_reports_memory_mapped_collection(self, mock_client: MagicMock) -> None:
+        """Should report memory-mapped storage on disk, and the quantized copy kept in RAM resident."""
+        vector_params = VectorParams(
+            size=8,
+            distance=Distance.COSINE,
+            on_disk=True,
+            hnsw_config=HnswConfigDiff(m=32, on_disk=True),
+            quantization_config=ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True)
+            ),
+        )
+        mock_client.get_collection.return_value = _collection_info(vector_params, points=10, on_disk_payload=True)
+
+        usages = {
+            usage.component: usage for usage in QdrantStorageInspector(mock_client, 'c', 'dense', 'sparse').inspect()
+        }
+
+        assert usages['Dense vectors'] == StorageUsage('Dense vectors', 0, 10 * 8 * 4)
+        assert usages['Quantized vectors'] == StorageUsage('Quantized vectors', 10 * 8, 0)
+        assert usages['HNSW graph'] == StorageUsage('HNSW graph', 0, 10 * 2 * 32 * 4)
+        assert usages['Payloads'].resident_bytes == 0
+
+    def test_inspect_skips_sampling_empty_collection(self, mock_client: MagicMock) -> None:
+        """Should not scroll an empty collection."""
+        vector_params = VectorParams(size=8, distance=Distance.COSINE)
+        mock_client.get_collection.return_value = _collection_info(vector_params, points=0, on_disk_payload=False)
+
+        usages = QdrantStorageInspector(mock_client, 'context', 'dense', 'sparse').inspect()
+
+        assert sum(usage.resident_bytes + usage.on_disk_bytes for usage in usages) == 0
+        mock_client.scroll.assert_not_called()
+
+    def test_inspect_raises_on_unknown_vector(self, mock_client: MagicMock) -> None:
+        """Should raise when the collection has no vector with the configured name."""
+        vector_params = VectorParams(size=8, distance=Distance.COSINE)
+        mock_client.get_collection.return_value = _collection_info(vector_params, points=1, on_disk_payload=False)
+
+        with pytest.raises(ValueError, match='Vector "other" not found'):
+            QdrantStorageInspector(mock_client, 'context', 'other', 'sparse').inspect()
@@ -0,0 +1,103 @@
+import sqlite3
+from itertools import count
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from rebelist.revelations.infrastructure.sqlite.caches import SqliteCache
+
+
+class TestSqliteCache:
+    """Tests for the SqliteCache class."""
+
+    def test_set_and_get(self, tmp_path: Path) -> None:
+        """Test stored values are found by key and missing keys return None."""
+        cache = SqliteCache(str(tmp_path / 'cache' / 'test.sqlite3'), max_size_bytes=1024)
+
+        cache.set('a', b'value')
+
+        assert cache.get('a') == b'value'
+        assert cache.get('b') is None
+        cache.close()
+
+    def test_entries_are_shared_across_connections(self, tmp_path: Path) -> None:
+        """Test the values stored by one connection are visible to another one."""
+        path = str(tmp_path / 'test.sqlite3')
+        writer = SqliteCache(path, max_size_bytes=1024)
+        reader = SqliteCache(path, max_size_bytes=1024)
+
+        writer.set('a', b'value')
+
+        assert reader.get('a') == b'value'
+        writer.close()
+        reader.close()
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        """Test the oldest accessed entries are evicted once the maximum size is exceeded."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.sqlite.caches.time')
+        clock.time.side_effect = count(1.0)
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=10)
+
+        cache.set('a', b'aaaa')
+        cache.set('b', b'bbbb')
+        assert cache.get('a') == b'aaaa'
+        cache.set('c', b'cccc')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == b'aaaa'
+        assert cache.get('c') == b'cccc'
+        cache.close()
+
+    def test_many_values_are_stored_and_found_at_once(self, tmp_path: Path) -> None:
+        """Test values stored in one write are found in one read, missing keys being left out."""
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024)
+
+        cache.set_many({'a': b'aaaa', 'b': b'bbbb'})
+
+        assert cache.get_many(['a', 'b', 'c']) == {'a': b'aaaa', 'b': b'bbbb'}
+        cache.close()
+
+    def test_total_size_is_kept_across_connections(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        """Test replaced values and other connections are accounted for when evicting."""
+        clock = mocker.patch('rebelist.revelations.infrastructure.sqlite.caches.time')
+        clock.time.side_effect = count(1.0)
+        path = str(tmp_path / 'test.sqlite3')
+        first = SqliteCache(path, max_size_bytes=10)
+        first.set('a', b'aaaaaaaa')
+        first.set('a', b'aa')
+        second = SqliteCache(path, max_size_bytes=10)
+
+        second.set_many({'b': b'bbbb', 'c': b'cccc'})
+        first.set('d', b'dd')
+
+        assert first.get_many(['a', 'b', 'c', 'd']) == {'b': b'bbbb', 'c': b'cccc', 'd': b'dd'}
+        first.close()
+        second.close()
+
+    def test_set_cost_stays_flat_as_the_store_grows(self, tmp_path: Path, mocker: MockerFixture) -> None:
+        """Test a write runs as many SQLite instructions with a thousand entries as with twenty times more."""
+        connect = mocker.spy(sqlite3, 'connect')
+        cache = SqliteCache(str(tmp_path / 'test.sqlite3'), max_size_bytes=1024**3)
+        connection: sqlite3.Connection = connect.spy_return
+        keys = count()
+
+        def measure_set() -> int:
+            instructions = [0]
+
+            def step() -> int:
+                instructions[0] += 1
+                return 0
+
+            connection.set_progress_handler(step, 1)
+            cache.set(f'measured-{next(keys)}', b'x' * 64)
+            connection.set_progress_handler(None, 1)
+
+            return instructions[0]
+
+        cache.set_many({f'key-{index}': b'x' * 64 for index in range(1_000)})
+        small = measure_set()
+        cache.set_many({f'key-{index}': b'x' * 64 for index in range(1_000, 20_000)})
+        large = measure_set()
+
+        assert large <= small * 1.2
+        cache.close()